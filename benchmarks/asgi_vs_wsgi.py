@@ -0,0 +1,84 @@
+"""
+Load benchmark: sync views under gunicorn (WSGI) vs async views under uvicorn (ASGI).
+
+Both servers get the same number of worker processes. gunicorn uses threaded
+sync workers; uvicorn serves ``tasks.async_views`` (``TASK_ASYNC_VIEWS=True``).
+Each scenario runs twice: with fast clients, and with slow clients that read
+the response in small pieces, which is where a thread per request hurts.
+
+Usage:
+    python manage.py migrate
+    python -m benchmarks.asgi_vs_wsgi --concurrency 50 --requests 1000 --slow-read-delay 0.01
+"""
+
+import argparse
+import asyncio
+import sys
+
+from .common import (
+    format_row, free_port, percentiles, run_load, seed, session_cookie, setup_django,
+    start_server, stop_server,
+)
+
+
+def servers(workers, threads):
+    """``(name, command, env)`` for each server under test."""
+    wsgi_port, asgi_port = free_port(), free_port()
+    return [
+        (
+            f'gunicorn wsgi ({workers}x{threads} threads)', wsgi_port,
+            [sys.executable, '-m', 'gunicorn', 'task_management.wsgi:application',
+             '--bind', f'127.0.0.1:{wsgi_port}', '--workers', str(workers),
+             '--threads', str(threads), '--worker-class', 'gthread'],
+            {'TASK_ASYNC_VIEWS': 'False'},
+        ),
+        (
+            f'uvicorn asgi ({workers} workers)', asgi_port,
+            [sys.executable, '-m', 'uvicorn', 'task_management.asgi:application',
+             '--host', '127.0.0.1', '--port', str(asgi_port), '--workers', str(workers),
+             '--no-access-log'],
+            {'TASK_ASYNC_VIEWS': 'True'},
+        ),
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--tasks', type=int, default=1000, help='Tasks for the benchmark user.')
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=4, help='Threads per gunicorn worker.')
+    parser.add_argument('--slow-read-delay', type=float, default=0.01,
+                        help='Seconds slow clients wait between 1KB reads.')
+    args = parser.parse_args(argv)
+
+    setup_django()
+    from tasks.models import Task
+
+    user = seed(1, args.tasks)[0]
+    cookie = session_cookie(user)
+    task_id = Task.objects.filter(user=user).values_list('id', flat=True).first()
+    paths = [
+        '/api/tasks/',
+        '/api/tasks/?page_size=100&fields=id,title,status',
+        f'/api/tasks/{task_id}/',
+        '/dashboard/',
+    ]
+
+    for name, port, command, env in servers(args.workers, args.threads):
+        process = start_server(command, port, env)
+        try:
+            asyncio.run(run_load('127.0.0.1', port, paths, cookie, 5, 20))  # warm up
+            for label, delay in (('fast clients', 0.0), ('slow clients', args.slow_read_delay)):
+                latencies, errors, elapsed = asyncio.run(run_load(
+                    '127.0.0.1', port, paths, cookie, args.concurrency, args.requests, delay,
+                ))
+                print(format_row(f'{name}, {label}', percentiles(latencies), elapsed)
+                      + (f' errors={errors}' if errors else ''))
+        finally:
+            stop_server(process)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,222 @@
+"""
+Helpers shared by the benchmark scripts in this package.
+
+Scripts run outside the test runner against the database configured by
+``DATABASE_URL`` (SQLite ``db.sqlite3`` by default), so run
+``python manage.py migrate`` first. Seeded users are named ``bench-<n>`` and
+are reused between runs.
+"""
+
+import asyncio
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from datetime import timedelta
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+def setup_django():
+    """Configure Django for a standalone script."""
+    if str(BASE_DIR) not in sys.path:
+        sys.path.insert(0, str(BASE_DIR))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'task_management.settings')
+    import django
+
+    django.setup()
+
+
+# Realistic mix for seeded tasks: (value, weight)
+STATUS_WEIGHTS = [('pending', 45), ('in_progress', 20), ('completed', 35)]
+PRIORITY_WEIGHTS = [('low', 50), ('medium', 35), ('high', 15)]
+# Share of tasks with a due date, and the range it falls in (days from now)
+DUE_DATE_SHARE = 0.6
+DUE_DATE_DAYS = (-30, 60)
+TITLE_WORDS = ['Review', 'Write', 'Plan', 'Fix', 'Call', 'Prepare', 'Update', 'Send', 'Check', 'Book']
+TITLE_OBJECTS = ['report', 'invoice', 'meeting notes', 'release', 'budget', 'slides', 'contract', 'backlog']
+
+
+def _weighted(rng, weights):
+    return rng.choices([value for value, _ in weights], [weight for _, weight in weights])[0]
+
+
+def seed(users=1, tasks_per_user=1000, prefix='bench'):
+    """
+    Create ``users`` users with ``tasks_per_user`` tasks each (idempotent).
+
+    Statuses, priorities and due dates follow ``STATUS_WEIGHTS``,
+    ``PRIORITY_WEIGHTS`` and ``DUE_DATE_SHARE``/``DUE_DATE_DAYS``; the data is
+    generated from a fixed random seed per user, so runs are reproducible.
+
+    Returns:
+        list: The seeded User instances
+    """
+    from django.contrib.auth.models import User
+    from django.utils import timezone
+    from tasks.models import Task
+
+    now = timezone.now()
+    seeded = []
+    for n in range(users):
+        user, created = User.objects.get_or_create(username=f'{prefix}-{n}')
+        if created:
+            user.set_password('bench-password')
+            user.save(update_fields=['password'])
+        existing = Task.objects.filter(user=user).count()
+        rng = random.Random(f'{prefix}-{n}-{existing}')
+        tasks = []
+        for i in range(existing, tasks_per_user):
+            due_date = None
+            if rng.random() < DUE_DATE_SHARE:
+                due_date = now + timedelta(days=rng.uniform(*DUE_DATE_DAYS))
+            tasks.append(Task(
+                user=user,
+                title=f'{rng.choice(TITLE_WORDS)} {rng.choice(TITLE_OBJECTS)} #{i}',
+                description='Seeded by benchmarks.common.seed',
+                priority=_weighted(rng, PRIORITY_WEIGHTS),
+                status=_weighted(rng, STATUS_WEIGHTS),
+                due_date=due_date,
+            ))
+        if tasks:
+            Task.objects.bulk_create(tasks, batch_size=1000)
+        seeded.append(user)
+    return seeded
+
+
+def session_cookie(user):
+    """Log ``user`` in and return a ``Cookie`` header value for the session."""
+    from django.conf import settings
+    from django.test import Client
+
+    client = Client()
+    client.force_login(user)
+    return f'{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}'
+
+
+def percentiles(samples):
+    """Summarise latencies (seconds) as milliseconds."""
+    if not samples:
+        return {'count': 0}
+    ordered = sorted(samples)
+
+    def pick(q):
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+    return {
+        'count': len(ordered),
+        'mean': statistics.fmean(ordered) * 1000,
+        'p50': pick(0.50),
+        'p90': pick(0.90),
+        'p99': pick(0.99),
+        'max': ordered[-1] * 1000,
+    }
+
+
+def format_row(name, summary, elapsed=None):
+    """One aligned line of benchmark output."""
+    if not summary.get('count'):
+        return f'{name:<48} no samples'
+    line = (
+        f"{name:<48} n={summary['count']:<6} mean={summary['mean']:8.2f}ms "
+        f"p50={summary['p50']:8.2f}ms p90={summary['p90']:8.2f}ms p99={summary['p99']:8.2f}ms"
+    )
+    if elapsed:
+        line += f" {summary['count'] / elapsed:8.1f} req/s"
+    return line
+
+
+async def http_get(host, port, path, cookie='', read_delay=0.0, read_size=1024):
+    """
+    Issue one ``GET`` over a fresh connection and read the whole response.
+
+    ``read_delay`` simulates a slow client: the body is read ``read_size``
+    bytes at a time with a pause between reads.
+
+    Returns:
+        tuple: ``(status code, latency in seconds)``
+    """
+    started = time.perf_counter()
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(
+        f'GET {path} HTTP/1.1\r\nHost: {host}:{port}\r\nCookie: {cookie}\r\n'
+        f'Accept: application/json\r\nConnection: close\r\n\r\n'.encode()
+    )
+    await writer.drain()
+    status_line = await reader.readline()
+    while await reader.read(read_size):
+        if read_delay:
+            await asyncio.sleep(read_delay)
+    writer.close()
+    await writer.wait_closed()
+    return int(status_line.split()[1]), time.perf_counter() - started
+
+
+async def run_load(host, port, paths, cookie='', concurrency=10, requests=200, read_delay=0.0):
+    """
+    Send ``requests`` GETs cycling through ``paths`` with ``concurrency``
+    clients in flight. ``cookie`` may be a list to spread requests over
+    several sessions.
+
+    Returns:
+        tuple: ``(latencies, errors, elapsed seconds)``
+    """
+    latencies, errors = [], 0
+    counter = iter(range(requests))
+    cookies = [cookie] if isinstance(cookie, str) else cookie
+
+    async def client():
+        nonlocal errors
+        for n in counter:
+            try:
+                status, latency = await http_get(
+                    host, port, paths[n % len(paths)], cookies[n % len(cookies)], read_delay,
+                )
+            except OSError:
+                errors += 1
+                continue
+            if status >= 400:
+                errors += 1
+            else:
+                latencies.append(latency)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - started
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(command, port, env=None, timeout=30):
+    """Start a server process and wait until it accepts connections."""
+    process = subprocess.Popen(
+        command, cwd=BASE_DIR, env={**os.environ, **(env or {})},
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'{command[0]} exited with status {process.returncode}')
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f'{command[0]} did not start listening on port {port}')
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
@@ -0,0 +1,88 @@
+"""
+Render-time benchmark for the HTML task pages.
+
+Requests ``tasks()``, ``dashboard()`` and ``task_details()`` through Django's
+test client (no network) under three rendering setups:
+
+* ``before``: templates re-read and re-parsed on every request, template
+  debug on, no fragment caching
+* ``cached loader``: compiled templates kept in memory, debug off
+* ``cached loader + fragments``: as above, with warm task-card/dashboard
+  fragments (the steady state between edits)
+
+Conditional GET is not exercised: every request renders a full page.
+
+Usage:
+    python manage.py migrate
+    python -m benchmarks.render --tasks 500 --requests 200
+"""
+
+import argparse
+import copy
+import time
+
+from .common import format_row, percentiles, seed, setup_django
+
+UNCACHED_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
+
+def templates_setting(base, cached_loader, debug):
+    templates = copy.deepcopy(base)
+    options = templates[0]['OPTIONS']
+    options['debug'] = debug
+    if not cached_loader:
+        options['loaders'] = UNCACHED_LOADERS
+    return templates
+
+
+def measure(client, paths, requests):
+    samples = []
+    for n in range(requests):
+        started = time.perf_counter()
+        response = client.get(paths[n % len(paths)])
+        samples.append(time.perf_counter() - started)
+        assert response.status_code == 200, response.status_code
+    return samples
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--tasks', type=int, default=500, help='Tasks for the benchmark user.')
+    parser.add_argument('--requests', type=int, default=200, help='Requests per page and scenario.')
+    args = parser.parse_args(argv)
+
+    setup_django()
+    from django.conf import settings
+    from django.core.cache import cache
+    from django.test import Client
+    from django.test.utils import override_settings
+    from tasks.models import Task
+
+    user = seed(1, args.tasks)[0]
+    client = Client(HTTP_HOST='localhost')
+    client.force_login(user)
+    task_id = Task.objects.filter(user=user).values_list('id', flat=True).first()
+    pages = {
+        'tasks': ['/tasks/', '/tasks/?order_by=title', '/tasks/?priority=high'],
+        'dashboard': ['/dashboard/'],
+        'task_details': [f'/tasks/{task_id}'],
+    }
+    scenarios = [
+        ('before', templates_setting(settings.TEMPLATES, False, True), 0),
+        ('cached loader', templates_setting(settings.TEMPLATES, True, False), 0),
+        ('cached loader + fragments', templates_setting(settings.TEMPLATES, True, False), 600),
+    ]
+
+    for label, templates, fragment_timeout in scenarios:
+        with override_settings(TEMPLATES=templates, TASK_FRAGMENT_CACHE_TIMEOUT=fragment_timeout):
+            cache.clear()
+            for page, paths in pages.items():
+                measure(client, paths, len(paths))  # warm up
+                print(format_row(f'{page}, {label}', percentiles(measure(client, paths, args.requests))))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,208 @@
+"""
+Benchmark suite for the task pages, the task API and the status toggle.
+
+Seeds ``--users`` users with ``--tasks`` tasks each (see ``common.seed`` for the
+status/priority/due date mix), then requests every scenario in ``SCENARIOS``
+for all of them:
+
+* through Django's test client, in process, recording latency percentiles,
+  throughput and database queries per request
+* through a local server (``--server gunicorn`` or ``uvicorn``; ``none`` to
+  skip), recording latency percentiles and throughput over HTTP
+
+Results can be stored as a baseline and later runs compared against it: a
+scenario regresses when it runs more queries per request than the baseline,
+or (unless ``--queries-only``) when its p90 latency grows by more than
+``--tolerance``. Query counts do not depend on the machine, so they are the
+safest check on shared CI runners. The exit status is 1 on regressions.
+
+Usage:
+    python manage.py migrate
+    python -m benchmarks.suite --save-baseline
+    python -m benchmarks.suite --compare --queries-only
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+from .common import (
+    BASE_DIR, format_row, free_port, percentiles, run_load, seed, session_cookie, setup_django,
+    start_server, stop_server,
+)
+
+BASELINE_PATH = BASE_DIR / 'benchmarks' / 'baselines.json'
+
+# (name, path); {task_id} is replaced with one of the user's tasks. The toggle
+# runs last because it invalidates the user's caches.
+SCENARIOS = [
+    ('tasks', '/tasks/'),
+    ('tasks, filtered', '/tasks/?status=pending&priority=high&order_by=priority'),
+    ('tasks, search', '/tasks/?q=report'),
+    ('dashboard', '/dashboard/'),
+    ('agenda', '/tasks/agenda/'),
+    ('task_list_api', '/api/tasks/'),
+    ('task_list_api, 100 rows', '/api/tasks/?page_size=100'),
+    ('task_detail_api', '/api/tasks/{task_id}/'),
+    ('toggle_task_status', '/tasks/{task_id}/toggle'),
+]
+
+# Tasks per user the {task_id} scenarios cycle through
+TASK_SAMPLE = 50
+
+
+def scenario_paths(path, task_ids, requests):
+    """``(user index, path)`` for each request, cycling through users and tasks."""
+    users = len(task_ids)
+    return [
+        (n % users, path.format(task_id=task_ids[n % users][(n // users) % len(task_ids[n % users])]))
+        for n in range(requests)
+    ]
+
+
+def run_client(clients, task_ids, requests):
+    """Run every scenario through the test client; return ``{name: summary}``."""
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    results = {}
+    for name, path in SCENARIOS:
+        # Warm up once per user (sessions, caches)
+        for user, url in scenario_paths(path, task_ids, len(clients)):
+            clients[user].get(url)
+        samples, queries = [], []
+        started = time.perf_counter()
+        for user, url in scenario_paths(path, task_ids, requests):
+            request_started = time.perf_counter()
+            with CaptureQueriesContext(connection) as ctx:
+                response = clients[user].get(url)
+            samples.append(time.perf_counter() - request_started)
+            queries.append(len(ctx.captured_queries))
+            assert response.status_code < 400, (url, response.status_code)
+        elapsed = time.perf_counter() - started
+        results[name] = summarize(samples, elapsed, queries)
+        print(format_row(f'client, {name}', percentiles(samples), elapsed)
+              + f' queries={max(queries)}')
+    return results
+
+
+def server_command(server, port, workers):
+    if server == 'gunicorn':
+        return [sys.executable, '-m', 'gunicorn', 'task_management.wsgi:application',
+                '--bind', f'127.0.0.1:{port}', '--workers', str(workers), '--threads', '4',
+                '--worker-class', 'gthread']
+    return [sys.executable, '-m', 'uvicorn', 'task_management.asgi:application',
+            '--host', '127.0.0.1', '--port', str(port), '--workers', str(workers), '--no-access-log']
+
+
+def run_server(server, cookies, task_ids, requests, concurrency, workers):
+    """Run every scenario against a local server; return ``{name: summary}``."""
+    port = free_port()
+    env = {'TASK_ASYNC_VIEWS': str(server == 'uvicorn')}
+    process = start_server(server_command(server, port, workers), port, env)
+    results = {}
+    try:
+        for name, path in SCENARIOS:
+            pairs = scenario_paths(path, task_ids, len(cookies) * TASK_SAMPLE)
+            paths = [url for _, url in pairs]
+            session_cookies = [cookies[user] for user, _ in pairs]
+            asyncio.run(run_load('127.0.0.1', port, paths, session_cookies, len(cookies), len(cookies)))
+            latencies, errors, elapsed = asyncio.run(run_load(
+                '127.0.0.1', port, paths, session_cookies, concurrency, requests,
+            ))
+            results[name] = summarize(latencies, elapsed)
+            print(format_row(f'{server}, {name}', percentiles(latencies), elapsed)
+                  + (f' errors={errors}' if errors else ''))
+    finally:
+        stop_server(process)
+    return results
+
+
+def summarize(samples, elapsed, queries=None):
+    summary = percentiles(samples)
+    result = {key: round(summary[key], 2) for key in ('p50', 'p90', 'p99')}
+    result['rps'] = round(len(samples) / elapsed, 1) if elapsed else 0
+    if queries is not None:
+        result['queries'] = max(queries)
+    return result
+
+
+def compare(results, baseline, tolerance, queries_only=False):
+    """List the regressions of ``results`` against ``baseline``."""
+    regressions = []
+    for mode, scenarios in results.items():
+        for name, current in scenarios.items():
+            previous = baseline.get(mode, {}).get(name)
+            if previous is None:
+                continue
+            if 'queries' in current and current['queries'] > previous.get('queries', current['queries']):
+                regressions.append(f'{mode}, {name}: {current["queries"]} queries (baseline {previous["queries"]})')
+            if not queries_only and current['p90'] > previous['p90'] * (1 + tolerance):
+                regressions.append(f'{mode}, {name}: p90 {current["p90"]}ms (baseline {previous["p90"]}ms)')
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--users', type=int, default=5, help='Seeded users.')
+    parser.add_argument('--tasks', type=int, default=1000, help='Tasks per user.')
+    parser.add_argument('--requests', type=int, default=200, help='Requests per scenario.')
+    parser.add_argument('--server', choices=['gunicorn', 'uvicorn', 'none'], default='gunicorn')
+    parser.add_argument('--concurrency', type=int, default=10, help='Clients in flight against the server.')
+    parser.add_argument('--workers', type=int, default=2, help='Server worker processes.')
+    parser.add_argument('--baseline', default=str(BASELINE_PATH), help='Baseline file.')
+    parser.add_argument('--save-baseline', action='store_true', help='Store these results as the baseline.')
+    parser.add_argument('--compare', action='store_true', help='Fail on regressions against the baseline.')
+    parser.add_argument('--tolerance', type=float, default=0.5,
+                        help='Allowed p90 latency growth as a fraction (default 0.5 = 50%%).')
+    parser.add_argument('--queries-only', action='store_true',
+                        help='Only compare queries per request, not latency.')
+    args = parser.parse_args(argv)
+
+    setup_django()
+    from django.db import connection
+    from django.test import Client
+    from tasks.models import Task
+
+    users = seed(args.users, args.tasks)
+    task_ids = [
+        list(Task.objects.filter(user=user).order_by('pk').values_list('pk', flat=True)[:TASK_SAMPLE])
+        for user in users
+    ]
+    clients = []
+    for user in users:
+        client = Client(HTTP_HOST='localhost')
+        client.force_login(user)
+        clients.append(client)
+
+    meta = {'users': args.users, 'tasks': args.tasks, 'requests': args.requests, 'database': connection.vendor}
+    results = {'client': run_client(clients, task_ids, args.requests)}
+    if args.server != 'none':
+        cookies = [session_cookie(user) for user in users]
+        results[args.server] = run_server(
+            args.server, cookies, task_ids, args.requests, args.concurrency, args.workers,
+        )
+
+    status = 0
+    if args.compare:
+        with open(args.baseline) as handle:
+            baseline = json.load(handle)
+        if baseline.get('meta') != meta:
+            print(f'warning: baseline was recorded with {baseline.get("meta")}, this run used {meta}')
+        regressions = compare(results, baseline, args.tolerance, args.queries_only)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        print(f'{len(regressions)} regressions against {args.baseline}')
+        status = 1 if regressions else 0
+    if args.save_baseline:
+        with open(args.baseline, 'w') as handle:
+            json.dump({'meta': meta, **results}, handle, indent=2, sort_keys=True)
+            handle.write('\n')
+        print(f'Saved baseline to {args.baseline}')
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -13,7 +13,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 from pathlib import Path
 import os
 import dj_database_url
-from decouple import config
+from decouple import Csv, config
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -25,9 +25,14 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # SECURITY WARNING: keep the secret key used in production secret!
 SECRET_KEY = config('SECRET_KEY', default='django-insecure-fallback-key')
 
+# Settings profile: 'development' (default) or 'production'. Production turns
+# off DEBUG (which also stops Django keeping every SQL query in memory) and
+# enables persistent database connections with health checks.
+DJANGO_PROFILE = config('DJANGO_PROFILE', default='development')
+PRODUCTION = DJANGO_PROFILE == 'production'
+
 # SECURITY WARNING: don't run with debug turned on in production!
-#DEBUG = config('DEBUG', default=False, cast=bool)
-DEBUG = True
+DEBUG = config('DEBUG', default=not PRODUCTION, cast=bool)
 
 ALLOWED_HOSTS = ['localhost', '127.0.0.1']
 RENDER_EXTERNAL_HOSTNAME = config('RENDER_EXTERNAL_HOSTNAME', default='')
@@ -48,11 +53,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'tasks.metrics.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'tasks.authentication.BearerTokenMiddleware',
+    'tasks.routers.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
@@ -60,16 +68,29 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'task_management.urls'
 
+# Compiled templates are kept in memory by the cached loader. Template debug
+# info (only used by error pages) follows DEBUG unless TEMPLATE_DEBUG is set
+TEMPLATE_DEBUG = config('TEMPLATE_DEBUG', default=DEBUG, cast=bool)
+
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates that also reports render time to tasks.metrics
+        'BACKEND': 'tasks.metrics.TimedDjangoTemplates',
         'DIRS': [],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'debug': TEMPLATE_DEBUG,
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'tasks.context_processors.task_events',
+                'tasks.context_processors.task_fragments',
             ],
         },
     },
@@ -81,12 +102,91 @@ WSGI_APPLICATION = 'task_management.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Connections are reused for DB_CONN_MAX_AGE seconds (0 closes them after
+# every request) and checked before reuse when DB_CONN_HEALTH_CHECKS is on.
+DB_CONN_MAX_AGE = config('DB_CONN_MAX_AGE', default=600 if PRODUCTION else 0, cast=int)
+DB_CONN_HEALTH_CHECKS = config('DB_CONN_HEALTH_CHECKS', default=PRODUCTION, cast=bool)
+
 DATABASES = {
     'default': dj_database_url.config(
-        default='sqlite:///' + str(BASE_DIR / 'db.sqlite3')
+        default='sqlite:///' + str(BASE_DIR / 'db.sqlite3'),
+        conn_max_age=DB_CONN_MAX_AGE,
+        conn_health_checks=DB_CONN_HEALTH_CHECKS,
     )
 }
 
+# Read replicas (comma-separated URLs), added as replica_1, replica_2...
+# GETs of the task pages and API read from a random replica unless the user
+# wrote in the last TASK_REPLICA_PIN_SECONDS (see tasks.routers). Tests run
+# replicas as mirrors of the default test database.
+for number, url in enumerate(config('DATABASE_REPLICA_URLS', default='', cast=Csv()), 1):
+    DATABASES[f'replica_{number}'] = {
+        **dj_database_url.parse(url, conn_max_age=DB_CONN_MAX_AGE, conn_health_checks=DB_CONN_HEALTH_CHECKS),
+        'TEST': {'MIRROR': 'default'},
+    }
+TASK_READ_REPLICAS = [alias for alias in DATABASES if alias.startswith('replica_')]
+TASK_REPLICA_PIN_SECONDS = config('TASK_REPLICA_PIN_SECONDS', default=10, cast=int)
+DATABASE_ROUTERS = ['tasks.routers.ReplicaRouter']
+
+# Set DB_PGBOUNCER when DATABASE_URL points at PgBouncer in transaction
+# pooling mode: server-side cursors (used by QuerySet.iterator(), e.g. the
+# task export) do not survive across pooled transactions. The LISTEN
+# connection of tasks.events.PostgresEventBackend needs session pooling.
+if config('DB_PGBOUNCER', default=False, cast=bool):
+    for database in DATABASES.values():
+        database['DISABLE_SERVER_SIDE_CURSORS'] = True
+
+# Applied to every new SQLite connection (see tasks.db). WAL lets readers
+# run alongside the single writer, synchronous=NORMAL is safe with WAL and
+# skips an fsync per commit, and busy_timeout waits for the write lock
+# instead of failing with "database is locked".
+SQLITE_PRAGMAS = {
+    'journal_mode': config('SQLITE_JOURNAL_MODE', default='WAL'),
+    'synchronous': config('SQLITE_SYNCHRONOUS', default='NORMAL'),
+    'busy_timeout': config('SQLITE_BUSY_TIMEOUT_MS', default=5000, cast=int),
+}
+if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    # File-backed test database: concurrent tests then wait on locks (busy
+    # timeout) instead of failing as they do on a shared in-memory database
+    DATABASES['default']['TEST'] = {'NAME': str(BASE_DIR / 'test_db.sqlite3')}
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Local memory by default; use a file or database cache (or another shared
+# backend) when running several worker processes so they see the same data.
+
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='task-management'),
+    }
+}
+
+# Sessions and the logged-in user are read from the cache, which saves the
+# session and user queries on every page (tasks.authentication). Other workers
+# must see logouts and password changes, so in production this needs a cache
+# shared by all of them (CACHE_BACKEND: Redis, Memcached). cached_db keeps
+# writing sessions to the database: sessions created with the db engine stay
+# valid after switching, and switching back logs nobody out either.
+SHARED_CACHE = 'locmem' not in CACHES['default']['BACKEND'].lower()
+CACHED_AUTH = config('CACHED_AUTH', default=SHARED_CACHE or not PRODUCTION, cast=bool)
+SESSION_ENGINE = config(
+    'SESSION_ENGINE',
+    default='django.contrib.sessions.backends.cached_db' if CACHED_AUTH else 'django.contrib.sessions.backends.db',
+)
+TASK_USER_CACHE_TIMEOUT = config('TASK_USER_CACHE_TIMEOUT', default=300 if CACHED_AUTH else 0, cast=int)
+
+AUTHENTICATION_BACKENDS = [
+    'tasks.authentication.CachedModelBackend',
+    # Sessions created before CachedModelBackend name this backend; they keep
+    # working (with an uncached user) until the user logs in again
+    'django.contrib.auth.backends.ModelBackend',
+]
+
+# Seconds the per-user dashboard statistics stay cached (see tasks.stats)
+TASK_STATS_TIMEOUT = config('TASK_STATS_TIMEOUT', default=60 * 60 * 24, cast=int)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -139,6 +239,72 @@ REST_FRAMEWORK = {
         # 'rest_framework.permissions.AllowAny',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
+        # API clients: "Authorization: Bearer <token>", no session or CSRF
+        'tasks.authentication.BearerTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
+    # Token buckets in the cache (tasks.throttling): "N/period" allows bursts
+    # of N requests and refills N per period. 'user'/'anon' cover the whole
+    # API per client; the task_* scopes are per user and endpoint.
+    'DEFAULT_THROTTLE_CLASSES': [
+        'tasks.throttling.UserTokenBucketThrottle',
+        'tasks.throttling.ScopedTokenBucketThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'user': config('TASK_API_USER_RATE', default='1200/min'),
+        'anon': config('TASK_API_ANON_RATE', default='60/min'),
+        'task_list': config('TASK_API_LIST_RATE', default='300/min'),
+        'task_detail': '600/min',
+        'task_agenda': '120/min',
+        'task_sync': '120/min',
+        'task_bulk': '30/min',
+        'task_export': '10/min',
+        'task_import': '10/min',
+    },
 }
+
+# Users resolved from API tokens are cached in process (tasks.authentication);
+# the TTL bounds how long a revoked token keeps working in other workers
+TASK_API_TOKEN_CACHE_SIZE = config('TASK_API_TOKEN_CACHE_SIZE', default=1024, cast=int)
+TASK_API_TOKEN_CACHE_TTL = config('TASK_API_TOKEN_CACHE_TTL', default=60, cast=int)
+
+# Serve the task list/detail API, toggle and dashboard with async views
+# (tasks.async_views); enable only when running under ASGI (uvicorn)
+TASK_ASYNC_VIEWS = config('TASK_ASYNC_VIEWS', default=False, cast=bool)
+
+# Server-Sent Events for live task updates (api/tasks/events/, ASGI only).
+# Pages open the stream only when enabled. Use
+# tasks.events.PostgresEventBackend when running several worker processes.
+TASK_EVENTS_ENABLED = config('TASK_EVENTS_ENABLED', default=False, cast=bool)
+TASK_EVENTS_BACKEND = config('TASK_EVENTS_BACKEND', default='tasks.events.LocalEventBackend')
+TASK_EVENTS_HEARTBEAT = config('TASK_EVENTS_HEARTBEAT', default=15, cast=int)
+TASK_EVENTS_MAX_AGE = config('TASK_EVENTS_MAX_AGE', default=300, cast=int)
+
+# Seconds rendered task cards / dashboard blocks stay in the cache. Fragments
+# are keyed on the user's collection version, so edits never serve stale HTML.
+TASK_FRAGMENT_CACHE_TIMEOUT = config('TASK_FRAGMENT_CACHE_TIMEOUT', default=600, cast=int)
+
+# Fraction of requests measured by tasks.metrics (Server-Timing header and
+# the staff-only metrics/ endpoint in Prometheus format); 0 disables it
+TASK_METRICS_SAMPLE_RATE = config('TASK_METRICS_SAMPLE_RATE', default=0.05 if PRODUCTION else 1.0, cast=float)
+
+# Overdue tasks listed by the agenda page/API (the count is always exact)
+TASK_AGENDA_MAX_OVERDUE = config('TASK_AGENDA_MAX_OVERDUE', default=50, cast=int)
+
+# Due-date reminders (manage.py run_task_reminders): seconds between reads of
+# the task change feed, and tasks per task_reminders_due signal
+TASK_REMINDER_POLL_INTERVAL = config('TASK_REMINDER_POLL_INTERVAL', default=10, cast=int)
+TASK_REMINDER_BATCH_SIZE = config('TASK_REMINDER_BATCH_SIZE', default=500, cast=int)
+
+# Maximum number of create/update/delete items per request to api/tasks/bulk/
+TASK_BULK_MAX_ITEMS = config('TASK_BULK_MAX_ITEMS', default=1000, cast=int)
+
+# Rows fetched per database round trip when streaming api/tasks/export/
+TASK_EXPORT_CHUNK_SIZE = config('TASK_EXPORT_CHUNK_SIZE', default=2000, cast=int)
+
+# Rows inserted per bulk_create batch (and transaction) by task imports
+TASK_IMPORT_BATCH_SIZE = config('TASK_IMPORT_BATCH_SIZE', default=1000, cast=int)
+
+# Days deleted-task tombstones are kept for api/tasks/sync/; older sync
+# tokens get 410 Gone and clients must do a full sync
+TASK_TOMBSTONE_RETENTION_DAYS = config('TASK_TOMBSTONE_RETENTION_DAYS', default=30, cast=int)
@@ -1,7 +1,25 @@
 from django.contrib import admin
-from .models import Task
+from .models import APIToken, Task
 
 class TaskAdmin(admin.ModelAdmin):
     readonly_fields = ('created_at', 'updated_at')
     
-admin.site.register(Task, TaskAdmin)
\ No newline at end of file
+admin.site.register(Task, TaskAdmin)
+
+
+class APITokenAdmin(admin.ModelAdmin):
+    # Tokens are issued with manage.py create_api_token (the key is shown once)
+    list_display = ('prefix', 'name', 'user', 'created_at', 'expires_at', 'revoked_at')
+    list_filter = ('revoked_at',)
+    readonly_fields = ('prefix', 'user', 'created_at', 'revoked_at')
+    actions = ['revoke_tokens']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    @admin.action(description='Revoke selected tokens')
+    def revoke_tokens(self, request, queryset):
+        for token in queryset:
+            token.revoke()
+
+admin.site.register(APIToken, APITokenAdmin)
@@ -0,0 +1,55 @@
+"""
+Agenda of a user's open tasks: what is overdue and what is due in the next
+few days, grouped by (local) day.
+
+Every query goes through ``TaskQuerySet.scheduled()``, which matches the
+partial index on ``(user, due_date)`` for non-completed tasks, so the agenda
+reads only the rows it shows, however many tasks the user has.
+"""
+
+import datetime
+from itertools import groupby
+
+from django.conf import settings
+from django.utils import timezone
+
+MAX_DAYS = 31
+
+
+def _start_of_day(day):
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+
+
+def build_agenda(queryset, days=7, now=None):
+    """
+    Group open tasks by due day.
+
+    Args:
+        queryset: Task queryset, usually ``Task.objects.filter(user=...)``
+        days (int): Number of days to cover, starting today (at most ``MAX_DAYS``)
+        now (datetime): Current time (defaults to ``timezone.now()``)
+
+    Returns:
+        dict: ``overdue_count``, ``overdue`` (oldest first, at most
+        ``TASK_AGENDA_MAX_OVERDUE``) and ``days``, a list of
+        ``{"date": date, "tasks": [...]}`` for every day in the window
+    """
+    now = now or timezone.now()
+    days = min(max(days, 1), MAX_DAYS)
+    today = timezone.localdate(now)
+    window = [today + datetime.timedelta(days=offset) for offset in range(days)]
+    scheduled = queryset.scheduled()
+
+    overdue = scheduled.overdue(now)
+    max_overdue = getattr(settings, 'TASK_AGENDA_MAX_OVERDUE', 50)
+    upcoming = scheduled.due_between(now, _start_of_day(window[-1] + datetime.timedelta(days=1)))
+
+    by_day = {
+        day: list(tasks)
+        for day, tasks in groupby(upcoming.order_by('due_date', 'id'), key=lambda task: timezone.localdate(task.due_date))
+    }
+    return {
+        'overdue_count': overdue.count(),
+        'overdue': list(overdue.order_by('due_date', 'id')[:max_overdue]),
+        'days': [{'date': day, 'tasks': by_day.get(day, [])} for day in window],
+    }
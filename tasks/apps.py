@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class TasksConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'tasks'
+
+    def ready(self):
+        from . import db, metrics, signals  # noqa: F401
+
+        connection_created.connect(db.configure_sqlite, dispatch_uid='tasks.db.configure_sqlite')
+        connection_created.connect(metrics.install_query_timer, dispatch_uid='tasks.metrics.install_query_timer')
@@ -0,0 +1,266 @@
+"""
+Async (ASGI-native) versions of the busiest task endpoints.
+
+Enabled per deployment with ``TASK_ASYNC_VIEWS=True`` (see ``tasks.urls``);
+only worth it when the project is served by an ASGI server such as uvicorn.
+Under WSGI Django would run each async view in its own event loop, which is
+slower than the regular views.
+
+The GET paths of the task list and detail APIs and the dashboard use the
+async ORM (``aget``, ``aaggregate``, ``async for``) and the async cache API
+(versions and stats), so a request that is waiting on the database or on a
+slow client does not hold a worker thread.
+They reuse the DRF views' querysets, serializers and pagination, so responses
+are identical to the sync views.
+
+API throttles (``tasks.throttling``) and list request coalescing
+(``tasks.coalescing``) apply as in the sync views. Other methods
+(POST/PUT/PATCH/DELETE) are delegated to the sync DRF views.
+Django 4.2 has no async session, auth, template or signal API, so these
+still run through ``sync_to_async``: the session/user lookup (bearer tokens go
+through the same lazy ``request.user``, see ``tasks.authentication``), the
+dashboard's flash messages and template rendering, and the status toggle
+(``TaskQuerySet.atoggle_status``: its ``UPDATE ... RETURNING`` needs a raw
+cursor, and its ``task_status_toggled`` receivers use the database). In 4.2
+the async ORM and cache methods themselves still run each call in a thread;
+only the request stays in the event loop.
+
+``task_events`` (the Server-Sent Events stream, see ``tasks.events``) is always
+routed and needs ASGI regardless of ``TASK_ASYNC_VIEWS``.
+"""
+
+import math
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.auth.views import redirect_to_login
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.shortcuts import redirect, render
+from django.utils.cache import get_conditional_response
+from rest_framework.exceptions import NotFound, Throttled, ValidationError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from . import coalescing
+from .authentication import BearerTokenAuthentication, get_bearer_token
+from . import events as task_events_backend
+from . import stats as task_stats
+from .conditional import aget_version, dashboard_etag, is_overdue, make_etag, not_modified, set_validators
+from .models import Task
+from .routers import replica_reads
+from .views import TaskDetailAPIView, TaskListAPIView
+
+_sync_list_api = TaskListAPIView.as_view()
+_sync_detail_api = TaskDetailAPIView.as_view()
+
+
+def _load_user(request):
+    # Evaluates the lazy request.user (session + user queries)
+    request.user.is_authenticated
+    return request.user
+
+
+async def _aget_user(request):
+    return await sync_to_async(_load_user)(request)
+
+
+def _load_page_state(request):
+    # The session (user and flash messages) can only be read synchronously
+    _load_user(request)
+    return request.user, bool(len(messages.get_messages(request)))
+
+
+def _not_authenticated(request):
+    # Same status, header and body as DRF with BearerTokenAuthentication first
+    if get_bearer_token(request) is not None:
+        detail = 'Invalid, expired or revoked token.'
+    else:
+        detail = 'Authentication credentials were not provided.'
+    response = JsonResponse({'detail': detail}, status=401)
+    response['WWW-Authenticate'] = BearerTokenAuthentication().authenticate_header(request)
+    return response
+
+
+def _json(data, status=200):
+    return HttpResponse(JSONRenderer().render(data), content_type='application/json', status=status)
+
+
+def _check_throttles(view):
+    """Apply the DRF view's throttles; return the 429 response if throttled."""
+    try:
+        view.check_throttles(view.request)
+    except Throttled as exc:
+        response = _json({'detail': exc.detail}, status=429)
+        if exc.wait is not None:
+            response.headers['Retry-After'] = str(math.ceil(exc.wait))
+        return response
+    return None
+
+
+def _api_view(view_class, request, user, **kwargs):
+    """Instantiate a DRF view around ``request`` without dispatching it."""
+    api_request = Request(request)
+    api_request.user = user
+    return view_class(request=api_request, args=(), kwargs=kwargs, format_kwarg=None)
+
+
+@replica_reads
+async def task_list_api(request):
+    """Async GET for ``api/tasks/`` (same parameters as TaskListAPIView)."""
+    if request.method != 'GET':
+        return await sync_to_async(_sync_list_api)(request)
+    user = await _aget_user(request)
+    if not user.is_authenticated:
+        return _not_authenticated(request)
+
+    token, _ = await aget_version(user.pk)
+    overdue = (await task_stats.aget_stats(user.pk))['overdue']
+    etag = make_etag('list', token, overdue, user.pk, request.get_full_path(), 'json')
+    response = not_modified(request, etag)
+    if response is not None:
+        return response
+
+    view = _api_view(TaskListAPIView, request, user)
+    response = await sync_to_async(_check_throttles)(view)
+    if response is not None:
+        return response
+
+    async def load():
+        page = await view.paginator.apaginate_queryset(view.get_queryset(), view.request, view)
+        return view.paginator.get_paginated_response(view.get_serializer(page, many=True).data).data
+
+    # Identical concurrent requests share one query (see tasks.coalescing)
+    key = (user.pk, token, request.build_absolute_uri(), 'json')
+    try:
+        data, _ = await coalescing.task_lists.ado(key, load)
+    except ValidationError as exc:
+        return _json(exc.detail, status=400)
+    except NotFound as exc:
+        return _json({'detail': exc.detail}, status=404)
+    return set_validators(_json(data), etag)
+
+
+@replica_reads
+async def task_detail_api(request, id):
+    """Async GET for ``api/tasks/<id>/`` (other methods use TaskDetailAPIView)."""
+    if request.method != 'GET':
+        return await sync_to_async(_sync_detail_api)(request, id=id)
+    user = await _aget_user(request)
+    if not user.is_authenticated:
+        return _not_authenticated(request)
+
+    view = _api_view(TaskDetailAPIView, request, user, id=id)
+    response = await sync_to_async(_check_throttles)(view)
+    if response is not None:
+        return response
+    try:
+        task = await view.get_queryset().aget(id=id)
+    except Task.DoesNotExist:
+        return _json({'detail': 'Not found.'}, status=404)
+
+    etag = make_etag('detail', {'id': id}, task.updated_at.isoformat(), is_overdue(task.due_date, task.status),
+                     request.get_full_path(), 'json')
+    response = not_modified(request, etag)
+    if response is None:
+        response = set_validators(_json(view.get_serializer(task).data), etag)
+    return response
+
+
+# DRF views are CSRF-exempt and enforce CSRF in SessionAuthentication; the
+# delegated writes keep doing so. csrf_exempt() cannot wrap async views in 4.2.
+task_list_api.csrf_exempt = True
+task_detail_api.csrf_exempt = True
+
+
+async def toggle_task_status(request, id):
+    """Async version of ``views.toggle_task_status``."""
+    user = await _aget_user(request)
+    if not user.is_authenticated:
+        return redirect_to_login(request.get_full_path())
+    if not await Task.objects.atoggle_status(user, id):
+        raise Http404('No Task matches the given query.')
+    return redirect('tasks')
+
+
+@replica_reads
+async def dashboard(request):
+    """Async version of ``views.dashboard``."""
+    user, has_messages = await sync_to_async(_load_page_state)(request)
+    if not user.is_authenticated:
+        return await sync_to_async(render)(request, 'dashboard.html')
+
+    token, _ = await aget_version(user.pk)
+    stats = await task_stats.aget_stats(user.pk)
+    # Pending flash messages must be rendered, so never answer 304
+    etag = None if has_messages else dashboard_etag(request, token, stats)
+    if etag is not None:
+        response = get_conditional_response(request, etag=etag)
+        if response is not None:
+            return response
+
+    # Templates are sync: rendered in a thread, so the lazy queryset only runs
+    # on a fragment miss
+    recent_tasks = Task.objects.filter(user=user).order_by('-created_at')[:5]
+    response = await sync_to_async(render)(request, 'dashboard.html', {
+        'fragment_version': token,
+        'total_tasks': stats['total'],
+        'pending_tasks': stats['pending'],
+        'in_progress_tasks': stats['in_progress'],
+        'completed_tasks': stats['completed'],
+        'overdue_tasks': stats['overdue'],
+        'recent_tasks': recent_tasks,
+    })
+    if etag is not None:
+        response.headers.setdefault('ETag', etag)
+    return response
+
+
+async def _event_stream(user_id, heartbeat, max_age):
+    yield 'retry: 3000\n\n'
+    yield task_events_backend.format_sse({'type': 'ready'})
+    subscription = task_events_backend.get_backend().subscribe(user_id, timeout=heartbeat)
+    deadline = time.monotonic() + max_age
+    try:
+        async for event in subscription:
+            if event is None:
+                yield task_events_backend.format_sse(comment='keepalive')
+            else:
+                yield task_events_backend.format_sse(event)
+            if time.monotonic() >= deadline:
+                # Django 4.2 does not notice client disconnects while streaming,
+                # so streams end periodically and EventSource reconnects
+                return
+    finally:
+        await subscription.aclose()
+
+
+async def task_events(request):
+    """
+    Server-Sent Events stream of the current user's task changes.
+
+    Sends ``ready`` on connect (clients refetch after a reconnect), then one
+    event per task change (see ``tasks.events``) and a keepalive comment
+    every ``TASK_EVENTS_HEARTBEAT`` seconds.
+    """
+    user = await _aget_user(request)
+    if not user.is_authenticated:
+        return _not_authenticated(request)
+    if not isinstance(request, ASGIRequest):
+        # Under WSGI an endless stream would pin a worker thread
+        return _json({'detail': 'Event stream requires the ASGI server.'}, status=501)
+
+    response = StreamingHttpResponse(
+        _event_stream(
+            user.pk,
+            getattr(settings, 'TASK_EVENTS_HEARTBEAT', 15),
+            getattr(settings, 'TASK_EVENTS_MAX_AGE', 300),
+        ),
+        content_type='text/event-stream',
+    )
+    response.headers['Cache-Control'] = 'no-cache'
+    # Disable proxy buffering (nginx) so events are delivered immediately
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,196 @@
+"""
+Cached authentication: bearer tokens for API clients and a cached user lookup
+for session logins.
+
+Machine clients send ``Authorization: Bearer <token>`` (tokens are issued
+with ``manage.py create_api_token``) instead of a session cookie and CSRF
+token. On ``api/`` routes :class:`BearerTokenMiddleware` replaces the
+session-backed ``request.user`` with the token's user, so the session row is
+never loaded, and :class:`BearerTokenAuthentication` authenticates DRF views
+before ``SessionAuthentication`` gets to enforce CSRF.
+
+Tokens are looked up by SHA-256 hash. Resolved users are kept in an
+in-process LRU cache (``TASK_API_TOKEN_CACHE_SIZE`` entries for
+``TASK_API_TOKEN_CACHE_TTL`` seconds), so the hot path runs no query.
+Revoking or deleting a token evicts it from the cache of the process that did
+it at once; other processes drop it when their entry expires, so the TTL is
+the longest a revoked token keeps working.
+
+Browser sessions use :class:`CachedModelBackend`, which keeps the logged-in
+user in Django's cache for ``TASK_USER_CACHE_TIMEOUT`` seconds (dropped by
+``tasks.signals`` whenever the user is saved or deleted). With the
+``cached_db`` session engine an authenticated page then runs neither the
+session nor the user query; ``AuthenticationMiddleware`` already keeps the
+user for the rest of the request.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
+from rest_framework.authentication import BaseAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+from .models import APIToken
+
+KEYWORD = 'Bearer'
+API_PREFIX = '/api/'
+
+
+class TokenCache:
+    """Thread-safe LRU of token hash -> (user, token expiry) with a TTL."""
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key_hash):
+        with self._lock:
+            entry = self._entries.get(key_hash)
+            if entry is None:
+                return None
+            user, expires_at, cached_until = entry
+            if cached_until <= time.monotonic() or (expires_at is not None and expires_at <= timezone.now()):
+                del self._entries[key_hash]
+                return None
+            self._entries.move_to_end(key_hash)
+            return user
+
+    def set(self, key_hash, user, expires_at):
+        ttl = getattr(settings, 'TASK_API_TOKEN_CACHE_TTL', 60)
+        with self._lock:
+            self._entries[key_hash] = (user, expires_at, time.monotonic() + ttl)
+            self._entries.move_to_end(key_hash)
+            while len(self._entries) > getattr(settings, 'TASK_API_TOKEN_CACHE_SIZE', 1024):
+                self._entries.popitem(last=False)
+
+    def discard(self, key_hash):
+        with self._lock:
+            self._entries.pop(key_hash, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenCache()
+
+
+def get_bearer_token(request):
+    """
+    The token in a Django request's ``Authorization`` header.
+
+    Returns:
+        str: The token, '' if the header is malformed, or None without a
+        bearer header
+    """
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    keyword, _, token = header.partition(' ')
+    if keyword != KEYWORD:
+        return None
+    token = token.strip()
+    return token if token and ' ' not in token else ''
+
+
+def authenticate_token(key):
+    """Return the active user owning the usable token ``key``, or None."""
+    if not key:
+        return None
+    key_hash = APIToken.hash_key(key)
+    user = token_cache.get(key_hash)
+    if user is not None:
+        return user
+    token = APIToken.objects.select_related('user').filter(key_hash=key_hash).first()
+    if token is None or not token.is_usable or not token.user.is_active:
+        return None
+    token_cache.set(key_hash, token.user, token.expires_at)
+    return token.user
+
+
+class BearerTokenAuthentication(BaseAuthentication):
+    """DRF authentication for ``Authorization: Bearer <token>``."""
+
+    def authenticate(self, request):
+        key = get_bearer_token(request._request)
+        if key is None:
+            return None
+        user = authenticate_token(key)
+        if user is None:
+            raise AuthenticationFailed('Invalid, expired or revoked token.')
+        return user, None
+
+    def authenticate_header(self, request):
+        return f'{KEYWORD} realm="api"'
+
+
+class BearerTokenMiddleware:
+    """
+    Resolve ``request.user`` from the bearer token on ``api/`` routes.
+
+    Place it after ``AuthenticationMiddleware``. An invalid token makes the
+    request anonymous rather than falling back to the session.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        self.process_request(request)
+        return self.get_response(request)
+
+    def process_request(self, request):
+        if not request.path_info.startswith(API_PREFIX):
+            return
+        key = get_bearer_token(request)
+        if key is not None:
+            # Lazy, like the session user: resolved in a thread by async views
+            request.user = SimpleLazyObject(lambda: authenticate_token(key) or AnonymousUser())
+
+
+def user_cache_timeout():
+    """Seconds a session user stays cached (0 turns the cache off)."""
+    return getattr(settings, 'TASK_USER_CACHE_TIMEOUT', 300)
+
+
+def _user_key(user_id):
+    return f'tasks:user:{user_id}'
+
+
+def forget_user(user_id):
+    cache.delete(_user_key(user_id))
+
+
+class CachedModelBackend(ModelBackend):
+    """``ModelBackend`` whose per-request ``get_user()`` reads the cache first."""
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        user = super().authenticate(request, username=username, password=password, **kwargs)
+        if user is None and password is not None:
+            # Stop here: the ModelBackend listed after this one (kept for
+            # sessions created before it) would only hash the password again
+            raise PermissionDenied
+        return user
+
+    def get_user(self, user_id):
+        timeout = user_cache_timeout()
+        if not timeout:
+            return super().get_user(user_id)
+        key = _user_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(key, user, timeout)
+        return user
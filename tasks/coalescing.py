@@ -0,0 +1,112 @@
+"""
+Request coalescing ("single flight") for hot read endpoints.
+
+When several identical requests arrive together (a client retrying, a page
+open in many tabs, a dashboard polling from several devices), only the first
+one runs the query and serialisation; the others wait for it and reuse its
+result. Keys include the user's collection version (``tasks.conditional``),
+so a request that starts after a write never receives data read before it.
+
+Coalescing is per process: threads share one :class:`SingleFlight` under
+WSGI, and coroutines on the same event loop share it under ASGI.
+"""
+
+import asyncio
+import threading
+
+from rest_framework.response import Response
+
+from .conditional import get_version
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Run at most one call per key at a time and share its result."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._futures = {}
+
+    def do(self, key, function):
+        """
+        Return ``function()``, or the result of an identical call in flight.
+
+        Returns:
+            tuple: ``(result, shared)``; ``shared`` is True when another
+            caller ran ``function``. Its exception is re-raised to every caller.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+        try:
+            call.result = function()
+        except Exception as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    async def ado(self, key, function):
+        """Async version of :meth:`do`; ``function`` returns an awaitable."""
+        key = (id(asyncio.get_running_loop()), key)
+        with self._lock:
+            future = self._futures.get(key)
+            leader = future is None
+            if leader:
+                future = self._futures[key] = asyncio.get_running_loop().create_future()
+        if not leader:
+            # shield: a cancelled follower must not cancel the shared result
+            return await asyncio.shield(future), True
+        try:
+            result = await function()
+        except Exception as exc:
+            future.set_exception(exc)
+            # Mark it retrieved when nobody else was waiting
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                del self._futures[key]
+
+
+task_lists = SingleFlight()
+
+
+def list_key(request):
+    """Key shared by identical list requests of one user at one collection version."""
+    user_id = request.user.pk
+    # The absolute URL, since pagination links are built from it
+    return (user_id, get_version(user_id)[0], request.build_absolute_uri(), request.accepted_renderer.format)
+
+
+class CoalescedListMixin:
+    """
+    Coalesce identical concurrent ``list()`` calls of a DRF view.
+
+    Place it after ``ConditionalGetMixin`` so 304 answers stay per request.
+    """
+
+    def list(self, request, *args, **kwargs):
+        load = super().list
+        data, _ = task_lists.do(list_key(request), lambda: load(request, *args, **kwargs).data)
+        return Response(data)
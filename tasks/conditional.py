@@ -0,0 +1,195 @@
+"""
+Conditional GET support (ETag) for task pages and the API.
+
+Collection responses are validated against a per-user version stored in the
+cache and replaced on every write to that user's tasks (see
+``tasks.signals``). Computing the validator is a single cache read, so an
+unchanged list is answered with ``304 Not Modified`` without touching the
+database or running a serializer.
+
+Single tasks are validated against ``Task.updated_at``.
+
+``is_overdue`` changes with the clock and not through a write, so validators
+also include the user's overdue count (lists and pages, from ``tasks.stats``)
+or the task's own overdue state (details). For the same reason these
+responses send no Last-Modified: neither the version timestamp nor
+``updated_at`` moves when a due date passes, so a client revalidating with
+only If-Modified-Since would get a stale 304.
+"""
+
+import hashlib
+import time
+import uuid
+
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+
+def _version_key(user_id):
+    return f'task_version:{user_id}'
+
+
+def _new_version():
+    return (uuid.uuid4().hex, time.time())
+
+
+def get_version(user_id):
+    """
+    Return the current collection version for a user.
+
+    Returns:
+        tuple: ``(token, timestamp)`` where ``timestamp`` is when the version
+        was created
+    """
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        # Unknown (cold cache): start a new version so clients refetch once
+        cache.add(key, _new_version(), None)
+        version = cache.get(key) or _new_version()
+    return version
+
+
+async def aget_version(user_id):
+    """Async version of :func:`get_version` for ``tasks.async_views``."""
+    key = _version_key(user_id)
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, _new_version(), None)
+        version = await cache.aget(key) or _new_version()
+    return version
+
+
+def bump_version(user_id):
+    """Start a new collection version after a user's tasks changed."""
+    cache.set(_version_key(user_id), _new_version(), None)
+
+
+def overdue_count(user_id):
+    """The user's overdue count; it grows as due dates pass without writes."""
+    from . import stats
+
+    return stats.get_stats(user_id)['overdue']
+
+
+def is_overdue(due_date, status):
+    return bool(due_date and due_date < timezone.now() and status != 'completed')
+
+
+def make_etag(*parts):
+    """Hash arbitrary parts into a quoted ETag value."""
+    digest = hashlib.sha1('\x1f'.join(str(part) for part in parts).encode()).hexdigest()
+    return quote_etag(digest)
+
+
+def not_modified(request, etag=None, last_modified=None):
+    """
+    Return a 304 response if the request's validators still match.
+
+    Args:
+        request: Django or DRF request
+        etag (str): Quoted ETag of the current representation
+        last_modified (float): Unix timestamp of the last change
+
+    Returns:
+        HttpResponse or None: ``304 Not Modified`` response, or None if the
+        full response must be built
+    """
+    response = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=int(last_modified) if last_modified is not None else None,
+    )
+    if response is not None:
+        return set_validators(response, etag, last_modified)
+    return None
+
+
+def set_validators(response, etag=None, last_modified=None):
+    """Attach ETag/Last-Modified and require clients to revalidate."""
+    if etag is not None:
+        response.headers['ETag'] = etag
+    if last_modified is not None:
+        response.headers['Last-Modified'] = http_date(int(last_modified))
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def _page_identity(request):
+    """
+    Values that change what an HTML page renders for the same data: the
+    session (login/logout) and the CSRF cookie embedded in forms.
+    """
+    return (
+        request.user.pk,
+        request.session.session_key,
+        request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+        request.get_full_path(),
+    )
+
+
+def tasks_page_etag(request, *args, **kwargs):
+    """ETag for the ``tasks()`` HTML page."""
+    if not request.user.is_authenticated or len(messages.get_messages(request)):
+        # Pending flash messages must be rendered, so never answer 304
+        return None
+    token, _ = get_version(request.user.pk)
+    return make_etag('tasks', token, overdue_count(request.user.pk), *_page_identity(request))
+
+
+def dashboard_page_etag(request, *args, **kwargs):
+    """ETag for the ``dashboard()`` HTML page (includes the cached stats)."""
+    if not request.user.is_authenticated or len(messages.get_messages(request)):
+        return None
+    from . import stats
+
+    token, _ = get_version(request.user.pk)
+    return dashboard_etag(request, token, stats.get_stats(request.user.pk))
+
+
+def dashboard_etag(request, token, counts):
+    """ETag of the dashboard at collection version ``token`` with stats ``counts``."""
+    return make_etag('dashboard', token, sorted(counts.items()), *_page_identity(request))
+
+
+class ConditionalGetMixin:
+    """
+    Answer unchanged GETs on DRF list/detail views with ``304 Not Modified``.
+
+    List responses use the per-user collection version and overdue count;
+    detail responses use the task's ``updated_at`` and overdue state. ETags
+    also depend on the query string and the negotiated renderer, so different
+    representations never share one. No Last-Modified is sent (see the module
+    docstring).
+    """
+
+    def list(self, request, *args, **kwargs):
+        token, _ = get_version(request.user.pk)
+        etag = make_etag('list', token, overdue_count(request.user.pk), request.user.pk,
+                         request.get_full_path(), request.accepted_renderer.format)
+        response = not_modified(request, etag)
+        if response is None:
+            response = set_validators(super().list(request, *args, **kwargs), etag)
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        row = (
+            self.get_queryset()
+            .filter(**{self.lookup_field: kwargs[self.lookup_url_kwarg or self.lookup_field]})
+            .values_list('updated_at', 'due_date', 'status')
+            .first()
+        )
+        if row is None:
+            # Missing task: let the regular lookup produce the 404
+            return super().retrieve(request, *args, **kwargs)
+        updated_at, due_date, status = row
+        etag = make_etag('detail', kwargs, updated_at.isoformat(), is_overdue(due_date, status),
+                         request.get_full_path(), request.accepted_renderer.format)
+        response = not_modified(request, etag)
+        if response is None:
+            response = set_validators(super().retrieve(request, *args, **kwargs), etag)
+        return response
@@ -0,0 +1,11 @@
+from django.conf import settings
+
+
+def task_events(request):
+    """Expose whether pages should subscribe to the live task event stream."""
+    return {'task_events_enabled': getattr(settings, 'TASK_EVENTS_ENABLED', False)}
+
+
+def task_fragments(request):
+    """Timeout for the ``{% cache %}`` fragments in the task templates."""
+    return {'fragment_timeout': getattr(settings, 'TASK_FRAGMENT_CACHE_TIMEOUT', 600)}
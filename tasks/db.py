@@ -0,0 +1,20 @@
+"""
+Per-connection database tuning.
+
+Django 4.2 has no setting for SQLite PRAGMAs, so ``configure_sqlite`` is
+connected to ``connection_created`` in ``TasksConfig.ready()`` and applies
+``SQLITE_PRAGMAS`` to each new connection. With persistent connections
+(``DB_CONN_MAX_AGE``) this runs once per connection, not per request.
+"""
+
+from django.conf import settings
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """Apply ``SQLITE_PRAGMAS`` to a newly opened SQLite connection."""
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', {})
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
@@ -0,0 +1,219 @@
+"""
+Per-user task change events for the Server-Sent Events stream.
+
+Signal handlers in ``tasks.signals`` publish a small event after every
+committed task write::
+
+    {"type": "created" | "updated" | "deleted", "id": 42, "status": "completed"}
+    {"type": "changed"}   # bulk writes: refetch the collection
+    {"type": "due", "id": 42, "status": "pending"}   # reminder: now overdue
+
+``tasks.async_views.task_events`` subscribes the connected browser to its
+user's events. Toggling a task is an update, so it arrives as ``updated`` with
+the new ``status``. ``due`` events come from the reminder scheduler
+(``tasks.reminders``); they reach browsers only when the scheduler and the
+web workers share a backend such as :class:`PostgresEventBackend`.
+
+Delivery goes through the backend named by ``TASK_EVENTS_BACKEND``:
+
+* :class:`LocalEventBackend` fans events out to subscribers in the same
+  process. It is the default, and what tests use; enough for a single ASGI
+  worker.
+* :class:`PostgresEventBackend` sends events through ``NOTIFY`` so every
+  worker process (each running a ``LISTEN`` thread) delivers them to its own
+  subscribers.
+
+Events are hints, not a log: a subscriber that falls too far behind gets a
+``resync`` event instead of the backlog and should refetch.
+"""
+
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+from collections import defaultdict
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+RESYNC = {'type': 'resync'}
+
+
+class _Subscription:
+    def __init__(self, loop, max_queue):
+        self.loop = loop
+        self.queue = asyncio.Queue(max_queue)
+
+    def put(self, event):
+        # Runs on the subscriber's event loop
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Too far behind: replace the backlog with a single resync
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+
+
+class BaseEventBackend:
+    """Interface for event backends."""
+
+    def publish(self, user_id, event):
+        """Deliver ``event`` to every subscriber of ``user_id``."""
+        raise NotImplementedError
+
+    def subscribe(self, user_id, timeout=None):
+        """
+        Return an async iterator of events for ``user_id``.
+
+        If ``timeout`` is given, None is yielded whenever that many seconds
+        pass without an event, so callers can send heartbeats.
+        """
+        raise NotImplementedError
+
+
+class LocalEventBackend(BaseEventBackend):
+    """
+    In-process pub/sub.
+
+    ``publish`` may be called from any thread (sync views run in a thread
+    pool under ASGI); events are handed to each subscriber's event loop with
+    ``call_soon_threadsafe``.
+
+    Args:
+        max_queue (int): Events buffered per subscriber before it is sent
+            ``resync`` instead
+    """
+
+    def __init__(self, max_queue=100):
+        self.max_queue = max_queue
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def publish(self, user_id, event):
+        self.dispatch(user_id, event)
+
+    def dispatch(self, user_id, event):
+        """Hand ``event`` to this process's subscribers of ``user_id``."""
+        with self._lock:
+            subscriptions = list(self._subscribers.get(user_id, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, event)
+            except RuntimeError:
+                # Event loop already closed; the subscription is going away
+                pass
+
+    def subscriber_count(self, user_id):
+        with self._lock:
+            return len(self._subscribers.get(user_id, ()))
+
+    async def subscribe(self, user_id, timeout=None):
+        subscription = _Subscription(asyncio.get_running_loop(), self.max_queue)
+        with self._lock:
+            self._subscribers[user_id].add(subscription)
+        try:
+            while True:
+                try:
+                    yield await asyncio.wait_for(subscription.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            with self._lock:
+                self._subscribers[user_id].discard(subscription)
+                if not self._subscribers[user_id]:
+                    del self._subscribers[user_id]
+
+
+class PostgresEventBackend(LocalEventBackend):
+    """
+    Cross-process delivery with PostgreSQL ``LISTEN``/``NOTIFY``.
+
+    ``publish`` runs ``pg_notify`` on the default connection. Each process
+    starts one daemon thread on its first subscriber; the thread keeps a
+    dedicated connection listening on ``channel`` and dispatches notifications
+    to local subscribers.
+    """
+    channel = 'task_events'
+    reconnect_delay = 5
+
+    def __init__(self, max_queue=100):
+        super().__init__(max_queue)
+        self._listener = None
+
+    def publish(self, user_id, event):
+        payload = json.dumps({'user': user_id, 'event': event}, separators=(',', ':'))
+        with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [self.channel, payload])
+
+    async def subscribe(self, user_id, timeout=None):
+        self._ensure_listener()
+        async for event in super().subscribe(user_id, timeout):
+            yield event
+
+    def _ensure_listener(self):
+        with self._lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(target=self._listen, name='task-events-listener', daemon=True)
+                self._listener.start()
+
+    def _listen(self):
+        import psycopg2
+        import psycopg2.extensions
+
+        params = connections[DEFAULT_DB_ALIAS].get_connection_params()
+        while True:
+            connection = None
+            try:
+                connection = psycopg2.connect(**params)
+                connection.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                with connection.cursor() as cursor:
+                    cursor.execute(f'LISTEN {self.channel}')
+                while True:
+                    if select.select([connection], [], [], 30) == ([], [], []):
+                        continue
+                    connection.poll()
+                    while connection.notifies:
+                        notify = connection.notifies.pop(0)
+                        message = json.loads(notify.payload)
+                        self.dispatch(message['user'], message['event'])
+            except Exception:
+                logger.exception('Task event listener failed; reconnecting')
+                if connection is not None:
+                    connection.close()
+                time.sleep(self.reconnect_delay)
+
+
+@lru_cache(maxsize=None)
+def get_backend():
+    """The backend configured by ``TASK_EVENTS_BACKEND`` (one per process)."""
+    path = getattr(settings, 'TASK_EVENTS_BACKEND', 'tasks.events.LocalEventBackend')
+    return import_string(path)()
+
+
+def publish(user_id, event):
+    """Publish ``event`` to ``user_id`` once the current transaction commits."""
+    if user_id is None:
+        return
+
+    def send():
+        try:
+            get_backend().publish(user_id, event)
+        except Exception:
+            # Events are best-effort; never fail the write that caused them
+            logger.exception('Could not publish task event')
+
+    transaction.on_commit(send)
+
+
+def format_sse(event=None, comment=None):
+    """Encode one Server-Sent Events frame."""
+    if comment is not None:
+        return f': {comment}\n\n'
+    return f"event: {event['type']}\ndata: {json.dumps(event, separators=(',', ':'))}\n\n"
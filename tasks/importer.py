@@ -0,0 +1,168 @@
+"""
+Bulk import of tasks from CSV or NDJSON files.
+
+Files are parsed as a stream, one row at a time, and every row goes through
+``TaskCreateUpdateSerializer`` validation (non-empty title, valid priority and
+status choices, parseable due date). A single serializer instance is reused
+for every row so per-row cost stays small.
+
+Valid rows are inserted with ``bulk_create`` in batches of
+``TASK_IMPORT_BATCH_SIZE``, one transaction per batch, so memory is bounded by
+the batch size and a failure only rolls back the batch in progress. Rejected
+rows are skipped and reported by line number. A file that stops parsing
+midway (bad CSV or UTF-8) raises :class:`ImportFormatError`; batches flushed
+before that point stay written and are counted in the error's ``report``.
+
+The CSV layout is the one written by ``tasks.export``; unknown columns (``id``,
+``created_at``...) are ignored.
+"""
+
+import csv
+import io
+import json
+import time
+
+from django.conf import settings
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+
+from .models import Task
+from .serializers import TaskCreateUpdateSerializer
+from .signals import bulk_tasks_changed
+
+FORMATS = ('csv', 'ndjson')
+
+# Rejected rows kept in the report; the count always covers all of them
+MAX_REPORTED_ERRORS = 100
+
+
+class ImportFormatError(Exception):
+    """
+    Raised when a file cannot be parsed in the requested format.
+
+    ``report`` is the :func:`import_tasks` report up to the failure (None
+    when raised by a parser); its ``created`` rows were already written.
+    """
+
+    def __init__(self, message, report=None):
+        super().__init__(message)
+        self.report = report
+
+
+def batch_size():
+    """Rows inserted per ``bulk_create`` call and transaction."""
+    return getattr(settings, 'TASK_IMPORT_BATCH_SIZE', 1000)
+
+
+def guess_format(filename):
+    """Pick ``ndjson`` for ``.ndjson``/``.jsonl`` files and ``csv`` otherwise."""
+    return 'ndjson' if filename.lower().endswith(('.ndjson', '.jsonl')) else 'csv'
+
+
+def parse_csv(binary_file):
+    """
+    Yield ``(line, row)`` pairs from a CSV file with a header row.
+
+    Empty cells are treated as missing so defaults apply (except for the
+    title, which must be present).
+    """
+    text = io.TextIOWrapper(binary_file, encoding='utf-8-sig', newline='')
+    reader = csv.DictReader(text)
+    try:
+        if reader.fieldnames is None:
+            return
+        for row in reader:
+            yield reader.line_num, {
+                key: value for key, value in row.items()
+                if key is not None and (value != '' or key == 'title')
+            }
+    except (csv.Error, UnicodeDecodeError) as exc:
+        raise ImportFormatError(f'Line {reader.line_num}: {exc}')
+    finally:
+        # Leave the underlying file open for the caller
+        text.detach()
+
+
+def parse_ndjson(binary_file):
+    """Yield ``(line, row)`` pairs from a newline-delimited JSON file."""
+    for line_number, line in enumerate(binary_file, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except (ValueError, UnicodeDecodeError):
+            row = None
+        # Non-object lines are reported as rejected rows, not fatal errors
+        yield line_number, row
+
+
+PARSERS = {
+    'csv': parse_csv,
+    'ndjson': parse_ndjson,
+}
+
+
+def import_tasks(user, binary_file, import_format='csv', size=None, dry_run=False):
+    """
+    Validate and insert every row of ``binary_file`` as a task for ``user``.
+
+    Args:
+        user: Owner of the imported tasks
+        binary_file: File object opened in binary mode
+        import_format (str): ``csv`` or ``ndjson``
+        size (int): Rows per batch (defaults to ``TASK_IMPORT_BATCH_SIZE``)
+        dry_run (bool): Validate only, without writing anything
+
+    Returns:
+        dict: ``created``, ``rejected``, ``errors`` (first rejected rows as
+        ``{"line", "errors"}``), ``seconds`` and ``rows_per_second``
+
+    Raises:
+        ImportFormatError: If the file is not valid CSV/UTF-8; its ``report``
+            holds the rows created and rejected before the failure
+    """
+    size = size or batch_size()
+    serializer = TaskCreateUpdateSerializer()
+    started = time.perf_counter()
+    report = {'created': 0, 'rejected': 0, 'errors': []}
+    batch = []
+
+    def flush():
+        if not dry_run:
+            with transaction.atomic():
+                Task.objects.bulk_create(batch)
+        report['created'] += len(batch)
+        batch.clear()
+
+    try:
+        for line, row in PARSERS[import_format](binary_file):
+            try:
+                if not isinstance(row, dict):
+                    raise ValidationError({'non_field_errors': ['Expected a JSON object.']})
+                data = serializer.run_validation(row)
+            except ValidationError as exc:
+                report['rejected'] += 1
+                if len(report['errors']) < MAX_REPORTED_ERRORS:
+                    report['errors'].append({'line': line, 'errors': exc.detail})
+                continue
+            batch.append(Task(user=user, **data))
+            if len(batch) >= size:
+                flush()
+        if batch:
+            flush()
+    except ImportFormatError as exc:
+        # Rows still in ``batch`` were never written
+        raise ImportFormatError(str(exc), _finish(report, started))
+    finally:
+        if report['created'] and not dry_run:
+            # bulk_create bypasses the model signals
+            bulk_tasks_changed.send(sender=Task, user_id=user.pk)
+    return _finish(report, started)
+
+
+def _finish(report, started):
+    seconds = time.perf_counter() - started
+    report['seconds'] = round(seconds, 3)
+    processed = report['created'] + report['rejected']
+    report['rows_per_second'] = round(processed / seconds) if seconds else processed
+    return report
@@ -0,0 +1,27 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from tasks.models import APIToken
+
+
+class Command(BaseCommand):
+    help = 'Issue an API bearer token for a user and print it (it is not stored and cannot be shown again).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('--name', default='', help='Label to tell the token apart, e.g. the client using it.')
+        parser.add_argument('--expires-days', type=int, default=None,
+                            help='Days until the token expires (default: never).')
+
+    def handle(self, *args, username, name='', expires_days=None, **options):
+        try:
+            user = User.objects.get(username=username)
+        except User.DoesNotExist:
+            raise CommandError(f'User "{username}" does not exist.')
+        expires_at = timezone.now() + timedelta(days=expires_days) if expires_days else None
+        token, key = APIToken.issue(user, name=name, expires_at=expires_at)
+        self.stderr.write(f'Created token {token.prefix}... for {user}; send it as "Authorization: Bearer <token>".')
+        self.stdout.write(key)
@@ -0,0 +1,34 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from tasks import export
+from tasks.models import Task
+
+
+class Command(BaseCommand):
+    help = "Stream a user's tasks as CSV or NDJSON to a file or stdout."
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help='Owner of the tasks to export.')
+        parser.add_argument('--format', dest='export_format', choices=sorted(export.EXPORTERS), default='csv',
+                            help='Output format (default: csv).')
+        parser.add_argument('--output', '-o', help='File to write to. Defaults to stdout.')
+        parser.add_argument('--chunk-size', type=int, default=None,
+                            help='Rows fetched per database round trip (default: TASK_EXPORT_CHUNK_SIZE).')
+
+    def handle(self, *args, username, export_format='csv', output=None, chunk_size=None, **options):
+        try:
+            user = User.objects.get(username=username)
+        except User.DoesNotExist:
+            raise CommandError(f'User "{username}" does not exist.')
+
+        chunks = export.stream(Task.objects.filter(user=user), export_format, chunk_size)
+        if output is None:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+            return
+
+        with open(output, 'w', encoding='utf-8', newline='') as handle:
+            for chunk in chunks:
+                handle.write(chunk)
+        self.stderr.write(self.style.SUCCESS(f'Exported tasks for {username} to {output}.'))
@@ -0,0 +1,50 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from tasks import importer
+
+
+class Command(BaseCommand):
+    help = 'Bulk import tasks for a user from a CSV or NDJSON file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help='Owner of the imported tasks.')
+        parser.add_argument('path', help='CSV (with header row) or NDJSON file to import.')
+        parser.add_argument('--format', dest='import_format', choices=importer.FORMATS,
+                            help='File format. Guessed from the extension by default.')
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Rows per bulk_create batch (default: TASK_IMPORT_BATCH_SIZE).')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Validate the file without writing anything.')
+
+    def handle(self, *args, username, path, import_format=None, batch_size=None, dry_run=False, **options):
+        try:
+            user = User.objects.get(username=username)
+        except User.DoesNotExist:
+            raise CommandError(f'User "{username}" does not exist.')
+
+        try:
+            with open(path, 'rb') as handle:
+                report = importer.import_tasks(
+                    user, handle, import_format or importer.guess_format(path), batch_size, dry_run,
+                )
+        except OSError as exc:
+            raise CommandError(str(exc))
+        except importer.ImportFormatError as exc:
+            if exc.report and exc.report['created'] and not dry_run:
+                raise CommandError(
+                    f"Could not parse {path}: {exc} ({exc.report['created']} tasks were already imported)"
+                )
+            raise CommandError(f'Could not parse {path}: {exc}')
+
+        for error in report['errors']:
+            self.stdout.write(self.style.WARNING(f"line {error['line']}: {error['errors']}"))
+        if report['rejected'] > len(report['errors']):
+            self.stdout.write(self.style.WARNING(
+                f"... and {report['rejected'] - len(report['errors'])} more rejected rows"
+            ))
+        action = 'Validated' if dry_run else 'Imported'
+        self.stdout.write(self.style.SUCCESS(
+            f"{action} {report['created']} tasks, rejected {report['rejected']} rows "
+            f"in {report['seconds']}s ({report['rows_per_second']} rows/s)."
+        ))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from tasks import sync
+from tasks.models import TaskTombstone
+
+
+class Command(BaseCommand):
+    help = 'Delete task tombstones older than TASK_TOMBSTONE_RETENTION_DAYS.'
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - sync.retention()
+        deleted, _ = TaskTombstone.objects.filter(deleted_at__lt=cutoff).delete()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} tombstones older than {cutoff:%Y-%m-%d %H:%M}.'))
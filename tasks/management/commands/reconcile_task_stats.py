@@ -0,0 +1,42 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from tasks import stats
+
+
+class Command(BaseCommand):
+    help = 'Compare cached dashboard statistics with the database and repair any drift.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', action='append', dest='usernames', metavar='USERNAME',
+                            help='Only reconcile these users (repeatable). Defaults to all users.')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report drift without updating the cache.')
+
+    def handle(self, *args, usernames=None, dry_run=False, **options):
+        users = User.objects.order_by('pk')
+        if usernames:
+            users = users.filter(username__in=usernames)
+
+        checked = drifted = 0
+        for user_id, username in users.values_list('pk', 'username').iterator():
+            checked += 1
+            cached = stats.get_cached_stats(user_id)
+            if cached is None:
+                # Nothing cached: the next dashboard load computes fresh numbers
+                continue
+            actual = stats.compute_stats(user_id)
+            diffs = [
+                f'{field} cached={cached[field]} actual={actual[field]}'
+                for field in stats.STAT_FIELDS
+                if cached[field] != actual[field]
+            ]
+            if not diffs:
+                continue
+            drifted += 1
+            self.stdout.write(self.style.WARNING(f'{username}: ' + ', '.join(diffs)))
+            if not dry_run:
+                stats.refresh(user_id)
+
+        action = 'found' if dry_run else 'repaired'
+        self.stdout.write(self.style.SUCCESS(f'Checked {checked} users, {action} drift for {drifted}.'))
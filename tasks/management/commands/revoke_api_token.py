@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from tasks.models import APIToken
+
+
+class Command(BaseCommand):
+    help = 'Revoke API tokens by token, by prefix, or all tokens of a user.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('token', nargs='?', help='The token, or the prefix shown in the admin.')
+        parser.add_argument('--user', help='Revoke every token of this username instead.')
+
+    def handle(self, *args, token=None, user=None, **options):
+        tokens = APIToken.objects.filter(revoked_at__isnull=True)
+        if user:
+            tokens = tokens.filter(user__username=user)
+        elif token and token.startswith(APIToken.PREFIX) and len(token) > 12:
+            tokens = tokens.filter(key_hash=APIToken.hash_key(token))
+        elif token:
+            tokens = tokens.filter(prefix=token)
+        else:
+            raise CommandError('Pass a token or --user.')
+        revoked = 0
+        # save() per token (not update()) so post_save receivers run
+        for api_token in tokens:
+            api_token.revoke()
+            revoked += 1
+        self.stdout.write(self.style.SUCCESS(f'Revoked {revoked} tokens.'))
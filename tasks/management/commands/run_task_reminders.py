@@ -0,0 +1,34 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from tasks.reminders import ReminderScheduler
+
+
+class Command(BaseCommand):
+    help = 'Fire task_reminders_due for tasks as their due date passes (runs until interrupted).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=int, default=None,
+                            help='Seconds between reads of the task change feed '
+                                 '(default: TASK_REMINDER_POLL_INTERVAL).')
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Tasks per task_reminders_due signal (default: TASK_REMINDER_BATCH_SIZE).')
+        parser.add_argument('--catch-up', type=int, default=0, metavar='SECONDS',
+                            help='Also fire reminders that came due this many seconds before startup.')
+        parser.add_argument('--once', action='store_true',
+                            help='Fire the reminders due now and exit.')
+
+    def handle(self, *args, interval=None, batch_size=None, catch_up=0, once=False, **options):
+        scheduler = ReminderScheduler(batch_size)
+        queued = scheduler.load(since=timezone.now() - timedelta(seconds=catch_up))
+        self.stdout.write(f'Queued {queued} reminders.')
+        if once:
+            fired = scheduler.tick()
+            self.stdout.write(self.style.SUCCESS(f'Fired {fired} reminders.'))
+            return
+        try:
+            scheduler.run(interval)
+        except KeyboardInterrupt:
+            self.stdout.write('Stopped.')
@@ -0,0 +1,271 @@
+"""
+Per-view performance metrics: latency, database, template and serializer time.
+
+:class:`RequestMetricsMiddleware` samples ``TASK_METRICS_SAMPLE_RATE`` of the
+requests. For a sampled request it collects, in a context variable that also
+follows the request into ``sync_to_async`` threads:
+
+* ``db``: query count and time, from an execute wrapper that
+  :func:`install_query_timer` adds to every database connection
+* ``render``: template rendering (:class:`TimedDjangoTemplates` backend)
+* ``serialize``: DRF serializer ``.data`` (``tasks.serializers``)
+* ``stats``: dashboard statistics (``tasks.stats.get_stats``)
+* ``total``: the whole request, as seen by the middleware
+
+Phases can overlap (``stats`` includes its ``db`` time). Each sampled response
+gets a ``Server-Timing`` header and the numbers are added to in-process
+histograms labelled by URL name, exported in the Prometheus text format by the
+staff-only ``metrics/`` view. Histograms are per process; scrape every worker
+or aggregate in Prometheus.
+
+Requests that are not sampled pay for one random number and one context
+variable lookup per query.
+"""
+
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.template import TemplateDoesNotExist
+from django.template.backends import django as django_backend
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+_current = ContextVar('task_request_timing', default=None)
+
+
+class Histogram:
+    """
+    Thread-safe Prometheus-style histogram with one series per label set.
+
+    Args:
+        name (str): Metric name
+        documentation (str): ``# HELP`` text
+        labels (tuple): Label names
+        buckets (tuple): Ascending upper bounds (``+Inf`` is implied)
+    """
+
+    def __init__(self, name, documentation, labels, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                # Per-bucket counts (last one is +Inf), then sum and count
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0, 0]
+            series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def snapshot(self):
+        """``{label values: (cumulative bucket counts, sum, count)}``."""
+        with self._lock:
+            series = {labels: list(values) for labels, values in self._series.items()}
+        result = {}
+        for labels, values in series.items():
+            counts, total = [], 0
+            for count in values[:-2]:
+                total += count
+                counts.append(total)
+            result[labels] = (counts, values[-2], values[-1])
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def collect(self):
+        """Lines of the Prometheus text format for this histogram."""
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        for label_values, (counts, total, count) in sorted(self.snapshot().items()):
+            labels = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(self.labels, label_values))
+            prefix = labels + ',' if labels else ''
+            for bound, cumulative in zip([*self.buckets, '+Inf'], counts):
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{labels}}} {total:.6f}')
+            lines.append(f'{self.name}_count{{{labels}}} {count}')
+        return lines
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+REQUEST_SECONDS = Histogram(
+    'task_request_duration_seconds', 'Request latency by view.', ('view', 'method'), SECONDS_BUCKETS,
+)
+PHASE_SECONDS = Histogram(
+    'task_request_phase_seconds', 'Time spent per request in db, render, serialize and stats.',
+    ('view', 'phase'), SECONDS_BUCKETS,
+)
+QUERIES = Histogram(
+    'task_request_db_queries', 'Database queries per request by view.', ('view',), QUERY_BUCKETS,
+)
+HISTOGRAMS = (REQUEST_SECONDS, PHASE_SECONDS, QUERIES)
+
+
+def render_prometheus():
+    """All histograms in the Prometheus text exposition format."""
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.collect())
+    return '\n'.join(lines) + '\n'
+
+
+def reset():
+    """Clear every histogram (tests)."""
+    for histogram in HISTOGRAMS:
+        histogram.reset()
+
+
+class RequestTiming:
+    """Measurements of one sampled request."""
+
+    def __init__(self):
+        self.phases = {}
+        self.queries = 0
+
+    def add(self, phase, seconds):
+        self.phases[phase] = self.phases.get(phase, 0) + seconds
+
+
+@contextmanager
+def timed(phase):
+    """Add the time spent in the block to ``phase`` of the current sampled request."""
+    timing = _current.get()
+    if timing is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing.add(phase, time.perf_counter() - started)
+
+
+def _time_query(execute, sql, params, many, context):
+    timing = _current.get()
+    if timing is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timing.add('db', time.perf_counter() - started)
+        timing.queries += 1
+
+
+def install_query_timer(sender, connection, **kwargs):
+    """
+    ``connection_created`` receiver adding the query timer to ``connection``.
+
+    Installed on the connection itself rather than around each request so it
+    also sees queries that async views run in ``sync_to_async`` threads.
+    """
+    if _time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_time_query)
+
+
+class Template(django_backend.Template):
+    def render(self, context=None, request=None):
+        with timed('render'):
+            return super().render(context, request)
+
+
+class TimedDjangoTemplates(django_backend.DjangoTemplates):
+    """``DjangoTemplates`` whose templates report their render time."""
+
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return Template(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            django_backend.reraise(exc, self)
+
+
+def sample_rate():
+    """Fraction of requests measured (``TASK_METRICS_SAMPLE_RATE``)."""
+    return getattr(settings, 'TASK_METRICS_SAMPLE_RATE', 1.0)
+
+
+def server_timing(timing, total):
+    """``Server-Timing`` header value for a finished request."""
+    entries = []
+    for phase, seconds in timing.phases.items():
+        entry = f'{phase};dur={seconds * 1000:.1f}'
+        if phase == 'db':
+            entry += f';desc="{timing.queries} queries"'
+        entries.append(entry)
+    entries.append(f'total;dur={total * 1000:.1f}')
+    return ', '.join(entries)
+
+
+class RequestMetricsMiddleware:
+    """
+    Measure a sample of requests (see module docstring).
+
+    Place it first in ``MIDDLEWARE`` so ``total`` covers the other middleware.
+    Works with both sync and async views.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self._sampled():
+            return self.get_response(request)
+        timing, started = RequestTiming(), time.perf_counter()
+        token = _current.set(timing)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._record(request, response, timing, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        if not self._sampled():
+            return await self.get_response(request)
+        timing, started = RequestTiming(), time.perf_counter()
+        token = _current.set(timing)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._record(request, response, timing, time.perf_counter() - started)
+
+    def _sampled(self):
+        rate = sample_rate()
+        return rate >= 1 or (rate > 0 and random.random() < rate)
+
+    def _record(self, request, response, timing, total):
+        match = request.resolver_match
+        view = match.view_name if match is not None and match.view_name else 'unmatched'
+        REQUEST_SECONDS.observe(total, view, request.method)
+        QUERIES.observe(timing.queries, view)
+        for phase, seconds in timing.phases.items():
+            PHASE_SECONDS.observe(seconds, view, phase)
+        response.headers['Server-Timing'] = server_timing(timing, total)
+        return response
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.23 on 2026-10-18 17:48
+
+from django.db import migrations, models
+
+
+PRIORITY_RANKS = {'low': 1, 'medium': 2, 'high': 3}
+
+
+def backfill_priority_rank(apps, schema_editor):
+    Task = apps.get_model('tasks', 'Task')
+    Task.objects.using(schema_editor.connection.alias).update(
+        priority_rank=models.Case(
+            *[models.When(priority=priority, then=models.Value(rank)) for priority, rank in PRIORITY_RANKS.items()],
+            default=models.Value(0),
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0003_task_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='task',
+            name='task_user_priority_idx',
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='priority_rank',
+            field=models.PositiveSmallIntegerField(default=1, editable=False),
+        ),
+        migrations.RunPython(backfill_priority_rank, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['user', 'priority_rank', 'id'], name='task_user_priority_rank_idx'),
+        ),
+    ]
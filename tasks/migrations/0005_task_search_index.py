@@ -0,0 +1,37 @@
+# Generated by Django 4.2.23 on 2026-10-18 18:05
+
+from django.db import migrations
+
+from tasks import search
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    with schema_editor.connection.cursor() as cursor:
+        if vendor == 'sqlite':
+            search.create_sqlite_index(cursor)
+        elif vendor == 'postgresql':
+            for sql in search.POSTGRESQL_INDEX_SQL:
+                cursor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    statements = {
+        'sqlite': search.SQLITE_DROP_SQL,
+        'postgresql': search.POSTGRESQL_DROP_SQL,
+    }.get(vendor, [])
+    with schema_editor.connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0004_task_priority_rank'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -1,7 +1,189 @@
-from django.db import models
+import hashlib
+import secrets
+
+from asgiref.sync import sync_to_async
+from django.db import connections, models, router, transaction
+from django.db.models import sql
+from django.db.models.functions import Now
+from django.db.models.lookups import Exact
 from django.contrib.auth.models import User
 from django.utils import timezone
 
+
+def _toggled_status():
+    """CASE flipping a task between completed and pending."""
+    return models.Case(
+        models.When(status=Task.Status.COMPLETED, then=models.Value(Task.Status.PENDING)),
+        default=models.Value(Task.Status.COMPLETED),
+    )
+
+
+class TaskQuerySet(models.QuerySet):
+    """
+    QuerySet that keeps ``priority_rank`` in sync on bulk writes, which
+    bypass ``Task.save()``, and leaves tombstones for deleted tasks.
+    """
+
+    def delete(self):
+        with transaction.atomic(using=self.db):
+            TaskTombstone.objects.using(self.db).bulk_create([
+                TaskTombstone(task_id=task_id, user_id=user_id)
+                for task_id, user_id in self.values_list('id', 'user_id')
+                if user_id is not None
+            ])
+            return super().delete()
+
+    def update(self, **kwargs):
+        if 'priority' in kwargs and 'priority_rank' not in kwargs:
+            kwargs['priority_rank'] = Task.priority_rank_for(kwargs['priority'])
+        return super().update(**kwargs)
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for obj in objs:
+            obj.sync_priority_rank()
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        if 'priority' in fields and 'priority_rank' not in fields:
+            fields = [*fields, 'priority_rank']
+            for obj in objs:
+                obj.sync_priority_rank()
+        return super().bulk_update(objs, fields, *args, **kwargs)
+
+    def for_serialization(self, fields=None):
+        """
+        Annotate everything ``TaskSerializer`` reads from outside the row so a
+        list of any size serialises from a single query: the owner's username
+        and whether the task is overdue, computed by the database.
+        
+        Args:
+            fields: Serializer fields that will be rendered; annotations for
+                fields left out are skipped. None means all fields.
+        """
+        annotations = {}
+        if fields is None or 'user' in fields:
+            annotations['owner_username'] = models.F('user__username')
+        if fields is None or 'is_overdue' in fields:
+            annotations['is_overdue_db'] = models.Case(
+                models.When(
+                    models.Q(due_date__lt=Now()) & ~models.Q(status='completed'),
+                    then=models.Value(True),
+                ),
+                default=models.Value(False),
+                output_field=models.BooleanField(),
+            )
+        return self.annotate(**annotations)
+
+    def scheduled(self):
+        """
+        Open tasks that have a due date: the rows covered by the partial index
+        ``task_user_open_due_idx``, so due-date lookups on them stay indexed.
+        """
+        return self.filter(due_date__isnull=False).exclude(status=Task.Status.COMPLETED)
+
+    def overdue(self, now=None):
+        """Open tasks whose due date has passed (computed by the database)."""
+        return self.scheduled().filter(due_date__lt=now or timezone.now())
+
+    def due_between(self, start, end):
+        """Open tasks due in ``[start, end)``."""
+        return self.scheduled().filter(due_date__gte=start, due_date__lt=end)
+
+    def update_returning(self, values, fields):
+        """
+        ``update(**values)`` that also returns ``fields`` of the updated row.
+
+        One ``UPDATE ... RETURNING`` statement (PostgreSQL, SQLite 3.35+);
+        meant for querysets matching at most one row.
+
+        Returns:
+            list: Values of ``fields`` (converted like ORM reads), or None if
+            no row matched
+        """
+        db = router.db_for_write(self.model, **self._hints)
+        connection = connections[db]
+        query = self.query.chain(sql.UpdateQuery)
+        query.add_update_values(values)
+        compiler = query.get_compiler(db)
+        compiler.pre_sql_setup()
+        update_sql, params = compiler.as_sql()
+        columns = [self.model._meta.get_field(name).get_col(self.model._meta.db_table) for name in fields]
+        returning = ', '.join(connection.ops.quote_name(column.target.column) for column in columns)
+        with transaction.mark_for_rollback_on_error(using=db), connection.cursor() as cursor:
+            cursor.execute(f'{update_sql} RETURNING {returning}', params)
+            row = cursor.fetchone()
+        if row is None:
+            return None
+        result = []
+        for value, column in zip(row, columns):
+            for converter in connection.ops.get_db_converters(column) + column.get_db_converters(connection):
+                value = converter(value, column, connection)
+            result.append(value)
+        return result
+
+    def toggle_status(self, user, pk):
+        """
+        Flip a task of ``user`` between completed and pending with one UPDATE.
+
+        The new status is computed by the database (``CASE``) and returned
+        with the due date (``RETURNING``), so nothing is read first and
+        concurrent toggles never lose a flip. The UPDATE only matches pending
+        and completed tasks, which the CASE swaps, so the new status also
+        tells the old one; in-progress tasks take a second UPDATE that only
+        matches them. Bypasses ``save()``, so ``task_status_toggled`` is sent
+        with the exact change for derived data.
+
+        Args:
+            user: Owner of the task; other users' tasks never match
+            pk: Primary key of the task
+
+        Returns:
+            str: The new status, or None if no task matched
+        """
+        from .signals import task_status_toggled
+
+        swapped = (Task.Status.PENDING, Task.Status.COMPLETED)
+        values = {'status': _toggled_status(), 'updated_at': timezone.now()}
+        # The last try catches an in-progress task changed by another request
+        # between the first two
+        for old_statuses in (swapped, (Task.Status.IN_PROGRESS,), swapped):
+            row = self.filter(user=user, pk=pk, status__in=old_statuses).update_returning(
+                values, ['status', 'due_date'],
+            )
+            if row is not None:
+                break
+        else:
+            return None
+        status, due_date = row
+        if old_statuses == swapped:
+            old_status = Task.Status.PENDING if status == Task.Status.COMPLETED else Task.Status.COMPLETED
+        else:
+            old_status = Task.Status.IN_PROGRESS
+        task_status_toggled.send(
+            sender=Task, task_id=pk, user_id=user.pk, status=status,
+            old=(user.pk, old_status, due_date), new=(user.pk, status, due_date),
+        )
+        return status
+
+    async def atoggle_status(self, user, pk):
+        """
+        Async version of :meth:`toggle_status`.
+
+        Runs in one ``sync_to_async`` hop: the raw cursor behind RETURNING and
+        the receivers (on_commit, NOTIFY) are sync-only in Django 4.2, whose
+        ``aupdate`` is itself ``update`` in a thread.
+        """
+        return await sync_to_async(self.toggle_status)(user, pk)
+
+    def filter_priority(self, priority):
+        """Filter by priority through the indexed integer rank."""
+        if priority in Task.PRIORITY_RANKS:
+            return self.filter(priority_rank=Task.PRIORITY_RANKS[priority])
+        return self.filter(priority=priority)
+
+
 class Task(models.Model):
     class Priority(models.TextChoices):
         HIGH = 'high', 'High'
@@ -13,6 +195,13 @@ class Task(models.Model):
         IN_PROGRESS = 'in_progress', 'In Progress'
         PENDING = 'pending', 'Pending'
     
+    # Semantic sort order for priorities (ascending = low to high)
+    PRIORITY_RANKS = {
+        Priority.LOW: 1,
+        Priority.MEDIUM: 2,
+        Priority.HIGH: 3,
+    }
+    
     title = models.CharField(max_length=200)
     description = models.TextField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -21,6 +210,70 @@ class Task(models.Model):
     priority = models.CharField(max_length=10, choices=Priority.choices, default=Priority.LOW)
     status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
     user = models.ForeignKey(User, on_delete=models.CASCADE, blank= True, null=True)
+    # Denormalised from priority so sorting is by meaning, not alphabetically
+    priority_rank = models.PositiveSmallIntegerField(default=1, editable=False)
+    
+    objects = TaskQuerySet.as_manager()
+    
+    class Meta:
+        # Every hot query is scoped to one user, so each index leads with it
+        indexes = [
+            models.Index(fields=['user', 'created_at', 'id'], name='task_user_created_idx'),
+            models.Index(fields=['user', 'updated_at', 'id'], name='task_user_updated_idx'),
+            models.Index(fields=['user', 'title', 'id'], name='task_user_title_idx'),
+            models.Index(fields=['user', 'status'], name='task_user_status_idx'),
+            models.Index(fields=['user', 'priority_rank', 'id'], name='task_user_priority_rank_idx'),
+            models.Index(
+                fields=['user', 'due_date'],
+                name='task_user_open_due_idx',
+                condition=models.Q(due_date__isnull=False) & ~models.Q(status='completed'),
+            ),
+            # Across all users, for the reminder scheduler (tasks.reminders)
+            models.Index(fields=['updated_at', 'id'], name='task_updated_idx'),
+            models.Index(
+                fields=['due_date'],
+                name='task_open_due_idx',
+                condition=models.Q(due_date__isnull=False) & ~models.Q(status='completed'),
+            ),
+        ]
+    
+    def save(self, *args, **kwargs):
+        self.sync_priority_rank()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'priority' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'priority_rank'}
+        super().save(*args, **kwargs)
+    
+    def delete(self, *args, **kwargs):
+        # Leave a tombstone so sync clients learn about the deletion
+        using = kwargs.get('using') or self._state.db
+        with transaction.atomic(using=using):
+            if self.user_id is not None:
+                TaskTombstone.objects.using(using).create(task_id=self.pk, user_id=self.user_id)
+            return super().delete(*args, **kwargs)
+    
+    def sync_priority_rank(self):
+        """Recompute ``priority_rank`` from ``priority``."""
+        self.priority_rank = self.PRIORITY_RANKS.get(self.priority, 0)
+    
+    @classmethod
+    def priority_rank_for(cls, priority):
+        """
+        Return the rank for a priority value or expression.
+        
+        Literal values map straight to their rank; expressions (e.g. ``F()``)
+        become a ``CASE`` so ``QuerySet.update()`` stays a single statement.
+        """
+        if isinstance(priority, str):
+            return cls.PRIORITY_RANKS.get(priority, 0)
+        return models.Case(
+            *[
+                models.When(Exact(priority, models.Value(value)), then=models.Value(rank))
+                for value, rank in cls.PRIORITY_RANKS.items()
+            ],
+            default=models.Value(0),
+            output_field=models.PositiveSmallIntegerField(),
+        )
     
     def __str__(self):
         return f"{self.title} by: {self.user.username}"
@@ -28,4 +281,71 @@ class Task(models.Model):
     @property
     def is_overdue(self):
         return (self.due_date and self.due_date <  timezone.now() and self.status != 'completed')
+
+
+class TaskTombstone(models.Model):
+    """
+    Marker left behind when a task is deleted, so the sync API can report
+    deletions. Not created when the owning user is deleted.
+    """
+    task_id = models.BigIntegerField()
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    deleted_at = models.DateTimeField(auto_now_add=True)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'deleted_at', 'id'], name='tombstone_user_deleted_idx'),
+            models.Index(fields=['deleted_at'], name='tombstone_deleted_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Deleted task {self.task_id} of user {self.user_id}"
+
+
+class APIToken(models.Model):
+    """
+    Bearer token for API clients (see tasks.authentication).
+
+    Only a SHA-256 hash of the token is stored: the token itself is shown
+    once, when it is issued. Revoked tokens are kept for reference.
+    """
+    PREFIX = 'tm_'
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='api_tokens')
+    name = models.CharField(max_length=100, blank=True)
+    # First characters of the token, to tell tokens apart in listings
+    prefix = models.CharField(max_length=12, editable=False)
+    key_hash = models.CharField(max_length=64, unique=True, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(null=True, blank=True)
+    revoked_at = models.DateTimeField(null=True, blank=True)
+    
+    @staticmethod
+    def hash_key(key):
+        return hashlib.sha256(key.encode()).hexdigest()
+    
+    @classmethod
+    def issue(cls, user, name='', expires_at=None):
+        """
+        Create a token for ``user``.
+        
+        Returns:
+            tuple: ``(APIToken, key)``; the key cannot be recovered later
+        """
+        key = cls.PREFIX + secrets.token_urlsafe(32)
+        token = cls.objects.create(
+            user=user, name=name, prefix=key[:12], key_hash=cls.hash_key(key), expires_at=expires_at,
+        )
+        return token, key
+    
+    def revoke(self):
+        if self.revoked_at is None:
+            self.revoked_at = timezone.now()
+            self.save(update_fields=['revoked_at'])
+    
+    @property
+    def is_usable(self):
+        return self.revoked_at is None and (self.expires_at is None or self.expires_at > timezone.now())
+    
+    def __str__(self):
+        return f"{self.prefix}... ({self.name or 'API token'}) of {self.user}"
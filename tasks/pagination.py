@@ -0,0 +1,313 @@
+"""
+Keyset (cursor) pagination for task listings.
+
+Offset pagination has to count and skip every row before the requested page,
+so deep pages get slower as a user's task list grows. Keyset pagination seeks
+directly to the last row the client saw using the ``(sort key, id)`` pair, so
+every page costs the same indexed range scan as the first one.
+
+Cursors are opaque, URL-safe strings. They encode the sort value and primary
+key of the boundary row plus the direction of travel.
+"""
+
+import base64
+import binascii
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from .search import RELEVANCE
+
+# Public ``order_by`` values mapped to the database ordering they stand for.
+ORDERINGS = {
+    '-created_at': '-created_at',
+    'created_at': 'created_at',
+    'priority': 'priority_rank',
+    '-priority': '-priority_rank',
+    'title': 'title',
+    RELEVANCE: '-search_rank',
+}
+DEFAULT_ORDERING = '-created_at'
+
+
+def resolve_ordering(order_by, searching=False):
+    """
+    Validate a user supplied ``order_by`` value.
+
+    Args:
+        order_by (str): Raw ``order_by`` query parameter
+        searching (bool): Whether the results come from a full-text search,
+            which makes ``relevance`` available and the default
+
+    Returns:
+        str: ``order_by`` if it is an allowed key, otherwise the default
+    """
+    if order_by in ORDERINGS and (order_by != RELEVANCE or searching):
+        return order_by
+    return RELEVANCE if searching else DEFAULT_ORDERING
+
+
+class InvalidCursor(Exception):
+    """Raised when a cursor cannot be decoded."""
+
+
+class KeysetPage:
+    """
+    A single page of results produced by :class:`KeysetPaginator`.
+
+    Mirrors the parts of Django's ``Page`` API used by templates
+    (iteration, ``has_next``, ``has_previous``, ``has_other_pages``).
+    """
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None,
+                 total=None, total_is_exact=True):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.total = total
+        self.total_is_exact = total_is_exact
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """
+    Paginate a queryset by seeking on ``(ordering field, pk)``.
+
+    The primary key is appended as a tie-breaker so the ordering is total and
+    rows sharing the same sort value are neither skipped nor repeated.
+
+    Args:
+        queryset: Unordered queryset to paginate
+        ordering (str): Field name, optionally prefixed with ``-``
+        per_page (int): Number of rows per page
+        count_limit (int): If given, count at most this many rows and report
+            the total as approximate when the limit is exceeded
+    """
+
+    def __init__(self, queryset, ordering=DEFAULT_ORDERING, per_page=6, count_limit=None):
+        self.queryset = queryset
+        self.descending = ordering.startswith('-')
+        self.field_name = ordering.lstrip('-')
+        self.per_page = per_page
+        self.count_limit = count_limit
+
+    def get_page(self, cursor=None):
+        """
+        Return the page that follows (or precedes) ``cursor``.
+
+        Args:
+            cursor (str): Opaque cursor from a previous page, or None for the
+                first page
+
+        Returns:
+            KeysetPage: The requested page
+
+        Raises:
+            InvalidCursor: If the cursor is malformed
+        """
+        position, queryset = self._page_queryset(cursor)
+        rows = list(queryset)
+        total, total_is_exact = self.count() if self.count_limit else (None, True)
+        return self._build_page(rows, position, total, total_is_exact)
+
+    async def aget_page(self, cursor=None):
+        """Async version of :meth:`get_page` using the async ORM."""
+        position, queryset = self._page_queryset(cursor)
+        rows = [row async for row in queryset]
+        total, total_is_exact = await self.acount() if self.count_limit else (None, True)
+        return self._build_page(rows, position, total, total_is_exact)
+
+    def count(self):
+        """
+        Count rows, stopping at ``count_limit``.
+
+        Returns:
+            tuple: ``(total, is_exact)``; when the limit is exceeded ``total``
+            is the limit and ``is_exact`` is False
+        """
+        return self._count_result(self.queryset.order_by()[:self.count_limit + 1].count())
+
+    async def acount(self):
+        """Async version of :meth:`count`."""
+        return self._count_result(await self.queryset.order_by()[:self.count_limit + 1].acount())
+
+    def _count_result(self, total):
+        if total > self.count_limit:
+            return self.count_limit, False
+        return total, True
+
+    def _page_queryset(self, cursor):
+        position = self.decode_cursor(cursor) if cursor else None
+        reverse = bool(position and position['r'])
+
+        queryset = self.queryset
+        if position is not None:
+            queryset = queryset.filter(self._seek(position['v'], position['id'], reverse))
+
+        # Fetch one extra row to learn whether another page exists without
+        # running a COUNT query.
+        return position, queryset.order_by(*self._ordering(reverse))[:self.per_page + 1]
+
+    def _build_page(self, rows, position, total, total_is_exact):
+        reverse = bool(position and position['r'])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if reverse:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, position is not None
+
+        next_cursor = previous_cursor = None
+        if rows and has_next:
+            next_cursor = self.encode_cursor(rows[-1], reverse=False)
+        if rows and has_previous:
+            previous_cursor = self.encode_cursor(rows[0], reverse=True)
+        return KeysetPage(rows, next_cursor, previous_cursor, total, total_is_exact)
+
+    def encode_cursor(self, obj, reverse):
+        """Build an opaque cursor pointing at ``obj``."""
+        value = getattr(obj, self.field_name)
+        if hasattr(value, 'isoformat'):
+            value = value.isoformat()
+        payload = json.dumps({'v': value, 'id': obj.pk, 'r': int(reverse)}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        """Decode a cursor produced by :meth:`encode_cursor`."""
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            position = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            value = position['v']
+            if value is None or isinstance(value, (dict, list)):
+                # Tampered: sort keys are never null or nested
+                raise InvalidCursor(cursor)
+            try:
+                field = self.queryset.model._meta.get_field(self.field_name)
+            except FieldDoesNotExist:
+                field = None
+            if field is not None:
+                value = field.to_python(value)
+            else:
+                # Annotated sort keys (search_rank) are numbers
+                value = float(value)
+            return {'v': value, 'id': int(position['id']), 'r': bool(position['r'])}
+        except (binascii.Error, ValueError, TypeError, KeyError, ValidationError):
+            raise InvalidCursor(cursor)
+
+    def _ordering(self, reverse):
+        if self.descending != reverse:
+            return ['-' + self.field_name, '-pk']
+        return [self.field_name, 'pk']
+
+    def _seek(self, value, pk, reverse):
+        lookup = 'lt' if self.descending != reverse else 'gt'
+        return (
+            Q(**{f'{self.field_name}__{lookup}': value})
+            | Q(**{self.field_name: value, f'pk__{lookup}': pk})
+        )
+
+
+class TaskCursorPagination(BasePagination):
+    """
+    DRF pagination class backed by :class:`KeysetPaginator`.
+
+    Query Parameters:
+        cursor (str): Opaque cursor taken from ``next``/``previous``
+        order_by (str): One of ``ORDERINGS`` (``relevance`` requires ``q``)
+        page_size (int): Rows per page, capped at ``max_page_size``
+        count (bool): Include an approximate ``count`` in the response
+    """
+    cursor_query_param = 'cursor'
+    ordering_query_param = 'order_by'
+    search_query_param = 'q'
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    count_query_param = 'count'
+    count_limit = 1000
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_ordering(self, request):
+        """Database ordering (e.g. ``-created_at``) requested by ``order_by``."""
+        ordering = resolve_ordering(
+            request.query_params.get(self.ordering_query_param),
+            searching=bool(request.query_params.get(self.search_query_param)),
+        )
+        return ORDERINGS[ordering]
+
+    def paginate_queryset(self, queryset, request, view=None):
+        paginator = self._get_paginator(queryset, request)
+        try:
+            self.page = paginator.get_page(request.query_params.get(self.cursor_query_param))
+        except InvalidCursor:
+            raise NotFound(self.invalid_cursor_message)
+        return list(self.page)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """Async version of :meth:`paginate_queryset` (see ``tasks.async_views``)."""
+        paginator = self._get_paginator(queryset, request)
+        try:
+            self.page = await paginator.aget_page(request.query_params.get(self.cursor_query_param))
+        except InvalidCursor:
+            raise NotFound(self.invalid_cursor_message)
+        return list(self.page)
+
+    def _get_paginator(self, queryset, request):
+        self.request = request
+        count_limit = self.count_limit if self._wants_count(request) else None
+        return KeysetPaginator(queryset, self.get_ordering(request), self.get_page_size(request), count_limit)
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_next_link(self):
+        return self._link(self.page.next_cursor)
+
+    def get_previous_link(self):
+        return self._link(self.page.previous_cursor)
+
+    def get_paginated_response(self, data):
+        payload = {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+        }
+        if self.page.total is not None:
+            payload['count'] = self.page.total
+            payload['count_is_exact'] = self.page.total_is_exact
+        payload['results'] = data
+        return Response(payload)
+
+    def _wants_count(self, request):
+        return request.query_params.get(self.count_query_param, '').lower() in ('1', 'true', 'yes')
+
+    def _link(self, cursor):
+        if cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, cursor)
@@ -0,0 +1,185 @@
+"""
+Due-date reminders without a broker or a table scan per run.
+
+:class:`ReminderScheduler` keeps every open task with a future due date in a
+heap ordered by ``(due_date, id)``. It is filled once from the partial index
+``task_open_due_idx`` and then fed incrementally from task writes: each tick
+reads the rows saved since the previous tick (the same ``(updated_at, id)``
+change feed as ``tasks.sync``) and the new tombstones, and moves, adds or drops
+their reminders. Reminders that come due are fired in batches through the
+``task_reminders_due`` signal, after re-reading the batch so tasks completed,
+rescheduled or deleted in the meantime are not reported.
+
+A tick therefore costs the tasks changed plus the tasks due, not the size of
+the table. Entries superseded by a reschedule stay in the heap until popped
+(or until the heap is compacted) instead of being searched for.
+
+Writes that bypass ``updated_at`` (a bare ``QuerySet.update(due_date=...)``)
+are only seen when the old reminder comes due, where it is re-checked.
+
+Run it with ``manage.py run_task_reminders``.
+"""
+
+import heapq
+import logging
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .models import Task, TaskTombstone
+from .signals import task_reminders_due
+from .sync import EPOCH, SAFETY_WINDOW, _read_stream
+
+logger = logging.getLogger(__name__)
+
+
+def batch_size():
+    """Tasks per ``task_reminders_due`` signal."""
+    return getattr(settings, 'TASK_REMINDER_BATCH_SIZE', 500)
+
+
+def poll_interval():
+    """Seconds between change-feed reads when no reminder is due sooner."""
+    return getattr(settings, 'TASK_REMINDER_POLL_INTERVAL', 10)
+
+
+class ReminderScheduler:
+    """
+    In-memory queue of upcoming due dates.
+
+    Args:
+        size (int): Tasks per ``task_reminders_due`` signal (defaults to
+            ``TASK_REMINDER_BATCH_SIZE``)
+    """
+
+    def __init__(self, size=None):
+        self.batch_size = size or batch_size()
+        self._heap = []
+        # Task id -> due date it is queued for; heap entries that disagree are stale
+        self._due = {}
+        # Reminders due at or before this have been fired (or skipped)
+        self.fired_until = None
+        self._tasks_position = (EPOCH, 0)
+        self._tombstones_position = (EPOCH, 0)
+
+    def __len__(self):
+        return len(self._due)
+
+    def load(self, since=None):
+        """
+        Queue every open task due after ``since`` (default: now).
+
+        Returns:
+            int: Number of reminders queued
+        """
+        now = timezone.now()
+        self.fired_until = since or now
+        # Writes racing with this read are picked up again by the first tick
+        self._tasks_position = self._tombstones_position = (now - SAFETY_WINDOW, 0)
+        rows = Task.objects.scheduled().filter(due_date__gt=self.fired_until).values_list('pk', 'due_date')
+        for task_id, due_date in rows.iterator(chunk_size=self.batch_size * 4):
+            self.schedule(task_id, due_date)
+        return len(self)
+
+    def schedule(self, task_id, due_date):
+        """Queue, move or (with ``due_date=None``) drop the reminder for a task."""
+        if due_date is None or due_date <= self.fired_until:
+            self._due.pop(task_id, None)
+            return
+        if self._due.get(task_id) == due_date:
+            return
+        self._due[task_id] = due_date
+        heapq.heappush(self._heap, (due_date, task_id))
+        if len(self._heap) > 2 * len(self._due) + 1000:
+            # Mostly stale entries: rebuild from the live ones
+            self._heap = [(due, pk) for pk, due in self._due.items()]
+            heapq.heapify(self._heap)
+
+    def next_due(self):
+        """Earliest queued due date (possibly of a stale entry), or None."""
+        return self._heap[0][0] if self._heap else None
+
+    def poll(self):
+        """Apply task writes and deletions since the last poll."""
+        horizon = timezone.now() - SAFETY_WINDOW
+        has_more = True
+        while has_more:
+            rows, has_more, self._tasks_position = _read_stream(
+                Task.objects.only('id', 'updated_at', 'due_date', 'status'),
+                'updated_at', self._tasks_position, self.batch_size, horizon,
+            )
+            for task in rows:
+                open_task = task.status != Task.Status.COMPLETED
+                self.schedule(task.pk, task.due_date if open_task else None)
+        has_more = True
+        while has_more:
+            rows, has_more, self._tombstones_position = _read_stream(
+                TaskTombstone.objects.only('id', 'deleted_at', 'task_id'),
+                'deleted_at', self._tombstones_position, self.batch_size, horizon,
+            )
+            for tombstone in rows:
+                self._due.pop(tombstone.task_id, None)
+
+    def tick(self, now=None):
+        """
+        Poll for changes and fire every reminder due at or before ``now``.
+
+        Returns:
+            int: Number of tasks reported through ``task_reminders_due``
+        """
+        if self.fired_until is None:
+            self.load()
+        now = now or timezone.now()
+        self.poll()
+        fired = 0
+        while self._heap and self._heap[0][0] <= now:
+            fired += self._fire(self._pop_due(now), now)
+        self.fired_until = max(self.fired_until, now)
+        return fired
+
+    def run(self, interval=None, stop=None):
+        """
+        Tick until ``stop`` (a ``threading.Event``) is set, sleeping until the
+        next reminder or for ``interval`` seconds, whichever comes first.
+        """
+        interval = interval or poll_interval()
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            # Long-running process: drop connections past CONN_MAX_AGE or broken
+            close_old_connections()
+            try:
+                self.tick()
+            except Exception:
+                logger.exception('Task reminder tick failed')
+            wait = interval
+            next_due = self.next_due()
+            if next_due is not None:
+                wait = min(wait, max((next_due - timezone.now()).total_seconds(), 0))
+            stop.wait(wait)
+
+    def _pop_due(self, now):
+        batch = {}
+        while self._heap and self._heap[0][0] <= now and len(batch) < self.batch_size:
+            due_date, task_id = heapq.heappop(self._heap)
+            if self._due.get(task_id) == due_date:
+                del self._due[task_id]
+                batch[task_id] = due_date
+        return batch
+
+    def _fire(self, batch, now):
+        if not batch:
+            return 0
+        # Re-check the batch: changes since the last poll must not fire stale reminders
+        tasks = []
+        for task in Task.objects.scheduled().filter(pk__in=batch).select_related('user').order_by('due_date', 'pk'):
+            if self.fired_until < task.due_date <= now:
+                tasks.append(task)
+            else:
+                self.schedule(task.pk, task.due_date)
+        if tasks:
+            for receiver, result in task_reminders_due.send_robust(sender=Task, tasks=tasks):
+                if isinstance(result, Exception):
+                    logger.error('Task reminder hook %r failed', receiver, exc_info=result)
+        return len(tasks)
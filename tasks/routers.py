@@ -0,0 +1,153 @@
+"""
+Read-replica routing.
+
+Replicas are the database aliases listed in ``TASK_READ_REPLICAS`` (see
+``DATABASE_REPLICA_URLS`` in the settings). Reads only go to a replica when
+all of these hold:
+
+* the request is a ``GET``/``HEAD`` to a view marked with :func:`replica_reads`
+  (or a DRF view class with ``replica_reads = True``)
+* the user has not written anything in the last ``TASK_REPLICA_PIN_SECONDS``
+  (:func:`pin` is called by ``tasks.signals`` on every task write), so users
+  see their own changes on every device, and per-user caches keyed on the
+  collection version (ETags, template fragments) are not filled from a replica
+  that has not caught up yet
+* the request has not written to the primary itself, and no transaction is
+  open on it
+
+Everything else, including management commands and background jobs, reads
+from and writes to ``default``. One replica is picked per request so all of a
+request's reads see the same snapshot.
+"""
+
+import random
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.urls import Resolver404, resolve
+
+SAFE_METHODS = ('GET', 'HEAD')
+
+_state = ContextVar('task_read_routing', default=None)
+
+
+def replicas():
+    """Aliases of the read replicas (empty without replicas)."""
+    return getattr(settings, 'TASK_READ_REPLICAS', [])
+
+
+def pin_seconds():
+    return getattr(settings, 'TASK_REPLICA_PIN_SECONDS', 10)
+
+
+def _pin_key(user_id):
+    return f'tasks:primary-pin:{user_id}'
+
+
+def pin(user_id):
+    """Send ``user_id``'s reads to the primary for ``TASK_REPLICA_PIN_SECONDS``."""
+    if user_id is not None and replicas():
+        cache.set(_pin_key(user_id), True, pin_seconds())
+
+
+def is_pinned(user_id):
+    return user_id is not None and bool(cache.get(_pin_key(user_id)))
+
+
+def replica_reads(view):
+    """Mark a view whose GET/HEAD requests may read from a replica."""
+    view.replica_reads = True
+    return view
+
+
+def _allows_replica(view):
+    return getattr(view, 'replica_reads', False) or getattr(getattr(view, 'cls', None), 'replica_reads', False)
+
+
+class _Routing:
+    def __init__(self, alias):
+        self.alias = alias
+        self.wrote = False
+
+
+class ReplicaRouter:
+    """Database router sending the reads of opted-in requests to a replica."""
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or state.alias is None or state.wrote:
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            # Reads inside a transaction must see its writes
+            return DEFAULT_DB_ALIAS
+        return state.alias
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get the schema through replication
+        return False if db in replicas() else None
+
+
+def _pinned(request):
+    user = getattr(request, 'user', None)
+    return user is not None and user.is_authenticated and is_pinned(user.pk)
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Decide per request whether reads may use a replica (see module docstring).
+
+    Must come after ``AuthenticationMiddleware``. Works with sync and async
+    views; the decision follows the request into ``sync_to_async`` threads.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        alias = random.choice(replicas()) if self._eligible(request) else None
+        if alias is not None and _pinned(request):
+            alias = None
+        token = _state.set(_Routing(alias))
+        try:
+            return self.get_response(request)
+        finally:
+            _state.reset(token)
+
+    async def __acall__(self, request):
+        alias = random.choice(replicas()) if self._eligible(request) else None
+        # Loading the user reads the session, which can't run in the event loop
+        if alias is not None and await sync_to_async(_pinned)(request):
+            alias = None
+        token = _state.set(_Routing(alias))
+        try:
+            return await self.get_response(request)
+        finally:
+            _state.reset(token)
+
+    def _eligible(self, request):
+        if request.method not in SAFE_METHODS or not replicas():
+            return False
+        try:
+            match = resolve(request.path_info, getattr(request, 'urlconf', None))
+        except Resolver404:
+            return False
+        return _allows_replica(match.func)
@@ -0,0 +1,134 @@
+"""
+Full-text search over task title and description.
+
+The search index is maintained by the database itself, so every write path
+(``save()``, ``QuerySet.update()``, ``bulk_create()``, raw SQL) stays in sync:
+
+* SQLite: an FTS5 external-content table, ``tasks_task_fts``, fed by
+  ``AFTER INSERT/UPDATE/DELETE`` triggers on ``tasks_task``.
+* PostgreSQL: a stored generated ``search_vector`` column on ``tasks_task``
+  with a GIN index.
+
+Both are created by migration ``0005_task_search_index``. On SQLite, a
+migration that rebuilds ``tasks_task`` (e.g. adding a NOT NULL column) drops
+its triggers, so such a migration must recreate them with
+:func:`create_sqlite_index`.
+
+Other database backends fall back to a case-insensitive substring match.
+"""
+
+import re
+
+from django.db import connections
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'tasks_task_fts'
+
+# Ordering key for results sorted by relevance (only valid while searching)
+RELEVANCE = 'relevance'
+
+_TOKEN_RE = re.compile(r'\w+')
+
+SQLITE_INDEX_SQL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, description,
+        content='tasks_task', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON tasks_task BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON tasks_task BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF title, description ON tasks_task BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+SQLITE_DROP_SQL = [
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ai',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ad',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_au',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+]
+
+POSTGRESQL_INDEX_SQL = [
+    """ALTER TABLE tasks_task ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', coalesce(title, '')), 'A')
+            || setweight(to_tsvector('english', coalesce(description, '')), 'B')
+        ) STORED""",
+    'CREATE INDEX IF NOT EXISTS task_search_vector_idx ON tasks_task USING GIN (search_vector)',
+]
+
+POSTGRESQL_DROP_SQL = [
+    'DROP INDEX IF EXISTS task_search_vector_idx',
+    'ALTER TABLE tasks_task DROP COLUMN IF EXISTS search_vector',
+]
+
+
+def create_sqlite_index(cursor):
+    """Create (or recreate) the FTS5 table and its triggers, then rebuild it."""
+    for sql in SQLITE_INDEX_SQL:
+        cursor.execute(sql)
+
+
+def tokenize(text):
+    """Split user input into plain word tokens, dropping query syntax."""
+    return _TOKEN_RE.findall(text or '')
+
+
+def search(queryset, text):
+    """
+    Restrict a Task queryset to rows matching ``text``.
+
+    Every word must match (as a prefix) in the title or description. Results
+    are annotated with ``search_rank``, where higher means more relevant and
+    title matches weigh more than description matches.
+
+    Args:
+        queryset: Task queryset, usually already scoped to one user
+        text (str): Raw search input
+
+    Returns:
+        QuerySet: Filtered queryset annotated with ``search_rank``
+    """
+    tokens = tokenize(text)
+    if not tokens:
+        return queryset.none()
+
+    vendor = connections[queryset.db].vendor
+    if vendor == 'sqlite':
+        match = ' '.join(f'"{token}"*' for token in tokens)
+        return queryset.filter(
+            id__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match]),
+        ).annotate(search_rank=RawSQL(
+            # bm25() is lower-is-better, so negate it; columns weigh 10:1
+            f'(SELECT -bm25({FTS_TABLE}, 10.0, 1.0) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s AND rowid = tasks_task.id)',
+            [match],
+            output_field=FloatField(),
+        ))
+
+    if vendor == 'postgresql':
+        tsquery = ' & '.join(f'{token}:*' for token in tokens)
+        return queryset.filter(
+            id__in=RawSQL(
+                "SELECT id FROM tasks_task WHERE search_vector @@ to_tsquery('english', %s)",
+                [tsquery],
+            ),
+        ).annotate(search_rank=RawSQL(
+            "ts_rank(tasks_task.search_vector, to_tsquery('english', %s))",
+            [tsquery],
+            output_field=FloatField(),
+        ))
+
+    for token in tokens:
+        queryset = queryset.filter(Q(title__icontains=token) | Q(description__icontains=token))
+    return queryset.annotate(search_rank=Value(0.0, output_field=FloatField()))
@@ -1,14 +1,74 @@
 from rest_framework import serializers
+from rest_framework.utils.serializer_helpers import ReturnDict
+from . import metrics
 from .models import Task
 
+
+def select_fields(available, fields=None, exclude=None):
+    """
+    Resolve ``fields=``/``exclude=`` query parameters (comma separated).
+    
+    Args:
+        available (list): Field names the serializer can render, in order
+        fields (str): Fields to keep, or None/empty for all
+        exclude (str): Fields to drop
+    
+    Returns:
+        list: Selected field names in serializer order
+    
+    Raises:
+        ValidationError: If a name is not an available field
+    """
+    wanted = [name.strip() for name in (fields or '').split(',') if name.strip()]
+    dropped = [name.strip() for name in (exclude or '').split(',') if name.strip()]
+    unknown = [name for name in wanted + dropped if name not in available]
+    if unknown:
+        raise serializers.ValidationError({'fields': [f'Unknown field: {name}' for name in unknown]})
+    return [name for name in available if (not wanted or name in wanted) and name not in dropped]
+
+
+class TaskColumnsSerializer(serializers.ListSerializer):
+    """
+    Representacion columnar de una lista de tareas:
+    {"columns": ["id", "title", ...], "rows": [[1, "..."], ...]}
+    Los nombres de campo van una sola vez en lugar de repetirse en cada fila.
+    """
+
+    def to_representation(self, data):
+        fields = list(self.child._readable_fields)
+        rows = []
+        for obj in data:
+            row = []
+            for field in fields:
+                attribute = field.get_attribute(obj)
+                row.append(None if attribute is None else field.to_representation(attribute))
+            rows.append(row)
+        return {'columns': [field.field_name for field in fields], 'rows': rows}
+
+    @property
+    def data(self):
+        with metrics.timed('serialize'):
+            return ReturnDict(self.to_representation(self.instance), serializer=self)
+
+
+class TaskListSerializer(serializers.ListSerializer):
+    """Lista de tareas; el tiempo de serializacion se mide (ver tasks.metrics)"""
+
+    @property
+    def data(self):
+        with metrics.timed('serialize'):
+            return super().data
+
+
 class TaskSerializer(serializers.ModelSerializer):
     """
     Serializer for Task Model
     Convierte entre instancias de Task y JSON
+    Acepta fields=[...] para serializar solo un subconjunto de campos
     """
     is_overdue = serializers.SerializerMethodField()
 
-    user = serializers.StringRelatedField(read_only=True)
+    user = serializers.SerializerMethodField()
 
     class Meta:
         model = Task
@@ -24,8 +84,30 @@ class TaskSerializer(serializers.ModelSerializer):
             'is_overdue'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at', 'user']
+        list_serializer_class = TaskListSerializer
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    @property
+    def data(self):
+        with metrics.timed('serialize'):
+            return super().data
+
+    def get_user(self, obj):
+        """Username del propietario; usa la anotacion de for_serialization() si existe"""
+        if hasattr(obj, 'owner_username'):
+            return obj.owner_username
+        return str(obj.user) if obj.user_id else None
+
     def get_is_overdue(self, obj):
-        return obj.due_date and obj.due_date < date.today()
+        """Calculado en la base de datos por for_serialization(), o en Python si no"""
+        if hasattr(obj, 'is_overdue_db'):
+            return obj.is_overdue_db
+        return bool(obj.is_overdue)
 
 class TaskCreateUpdateSerializer(serializers.ModelSerializer):
     """
@@ -45,6 +127,15 @@ class TaskCreateUpdateSerializer(serializers.ModelSerializer):
             'due_date'
         ]
         
+    def update(self, instance, validated_data):
+        """Guardar solo los campos que cambiaron (UPDATE parcial)"""
+        changed = [field for field, value in validated_data.items() if getattr(instance, field) != value]
+        for field in changed:
+            setattr(instance, field, validated_data[field])
+        if changed:
+            instance.save(update_fields=[*changed, 'updated_at'])
+        return instance
+        
     def validate_title(self, value):
         """Validación personalizada para título"""
         if not value or not value.strip():
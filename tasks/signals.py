@@ -0,0 +1,122 @@
+"""
+Signal handlers that keep derived task data in sync with Task writes.
+
+Connected from ``TasksConfig.ready()``.
+"""
+
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import Signal, receiver
+
+from . import conditional, events, routers, stats
+from .authentication import forget_user, token_cache
+from .models import APIToken, Task
+
+# Sent with ``user_id`` after writes that bypass model signals
+# (bulk_create, bulk_update, QuerySet.update) so derived data can catch up.
+bulk_tasks_changed = Signal()
+
+# Sent by ``TaskQuerySet.toggle_status()`` with ``task_id``, ``user_id``, the new
+# ``status`` and the ``old``/``new`` stats states.
+task_status_toggled = Signal()
+
+# Sent by ``tasks.reminders.ReminderScheduler`` with ``tasks``, a batch of open
+# tasks (``user`` loaded) whose due date has just passed.
+task_reminders_due = Signal()
+
+
+@receiver(post_init, sender=Task)
+def remember_loaded_state(sender, instance, **kwargs):
+    """Snapshot the state a task was loaded with so saves can be diffed."""
+    instance._stats_state = stats.state_of(instance) if instance.pk else None
+
+
+@receiver(post_save, sender=Task)
+def update_stats_on_save(sender, instance, created, **kwargs):
+    old = None if created else instance._stats_state
+    new = stats.state_of(instance)
+    if not created and (old is None or new is None):
+        # Loaded with deferred fields: we can't diff, so recompute later
+        stats.invalidate(instance.user_id)
+    else:
+        stats.apply_change(old, new)
+    instance._stats_state = new
+
+
+@receiver(post_delete, sender=Task)
+def update_stats_on_delete(sender, instance, **kwargs):
+    old = stats.state_of(instance)
+    if old is None:
+        stats.invalidate(instance.user_id)
+    else:
+        stats.apply_change(old, None)
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def bump_collection_version(sender, instance, **kwargs):
+    conditional.bump_version(instance.user_id)
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def pin_reads_to_primary(sender, instance, **kwargs):
+    routers.pin(instance.user_id)
+
+
+@receiver(post_save, sender=Task)
+def publish_task_saved(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        events.publish(instance.user_id, {
+            'type': 'created' if created else 'updated',
+            'id': instance.pk,
+            'status': instance.__dict__.get('status'),
+        })
+
+
+@receiver(post_delete, sender=Task)
+def publish_task_deleted(sender, instance, **kwargs):
+    events.publish(instance.user_id, {'type': 'deleted', 'id': instance.pk})
+
+
+@receiver(bulk_tasks_changed)
+def refresh_after_bulk_change(sender, user_id, **kwargs):
+    stats.invalidate(user_id)
+    conditional.bump_version(user_id)
+    routers.pin(user_id)
+    events.publish(user_id, {'type': 'changed'})
+
+
+@receiver(task_status_toggled)
+def apply_status_toggle(sender, task_id, user_id, status, old, new, **kwargs):
+    stats.apply_change(old, new)
+    conditional.bump_version(user_id)
+    routers.pin(user_id)
+    events.publish(user_id, {'type': 'updated', 'id': task_id, 'status': status})
+
+
+@receiver(task_reminders_due)
+def publish_task_reminders(sender, tasks, **kwargs):
+    for task in tasks:
+        events.publish(task.user_id, {'type': 'due', 'id': task.pk, 'status': task.status})
+
+
+@receiver(post_save, sender=APIToken)
+@receiver(post_delete, sender=APIToken)
+def evict_api_token(sender, instance, **kwargs):
+    """Revocations take effect at once in this process (others wait for the TTL)."""
+    token_cache.discard(instance.key_hash)
+
+
+@receiver(post_save, sender=User)
+def evict_inactive_user_tokens(sender, instance, **kwargs):
+    if not instance.is_active:
+        for key_hash in APIToken.objects.filter(user=instance).values_list('key_hash', flat=True):
+            token_cache.discard(key_hash)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_cached_user(sender, instance, **kwargs):
+    """Password, permission and is_active changes apply on the next request."""
+    forget_user(instance.pk)
@@ -0,0 +1,226 @@
+"""
+Per-user task statistics kept in Django's cache framework.
+
+The dashboard needs total/pending/in_progress/completed/overdue counts for the
+current user. Instead of aggregating over every task on each page load, the
+counts are computed once, stored in the cache and then adjusted incrementally
+by the Task signal handlers in ``tasks.signals``.
+
+Each counter lives under its own cache key so updates can use ``cache.incr``.
+The overdue count also depends on the clock, so alongside it we store
+``overdue_until``: the earliest future due date among open tasks. Until that
+moment no open task can become overdue on its own, so the cached count stays
+exact; once it passes, only the overdue count is recomputed.
+
+Writes that bypass model signals (``QuerySet.update``, ``bulk_create``) must
+call :func:`invalidate`; the ``reconcile_task_stats`` management command
+repairs any remaining drift.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Min, Q
+from django.utils import timezone
+
+from . import metrics
+
+STATUS_FIELDS = ('pending', 'in_progress', 'completed')
+STAT_FIELDS = ('total',) + STATUS_FIELDS + ('overdue',)
+OVERDUE_UNTIL = 'overdue_until'
+
+
+def _key(user_id, field):
+    return f'task_stats:{user_id}:{field}'
+
+
+def _keys(user_id):
+    return {field: _key(user_id, field) for field in STAT_FIELDS + (OVERDUE_UNTIL,)}
+
+
+def _timeout():
+    return getattr(settings, 'TASK_STATS_TIMEOUT', 60 * 60 * 24)
+
+
+def _timestamp(value):
+    return value.timestamp() if value else 0
+
+
+def is_overdue(state, now):
+    """Whether a ``(user_id, status, due_date)`` state counts as overdue."""
+    return bool(state and state[2] and state[2] < now and state[1] != 'completed')
+
+
+def state_of(task):
+    """
+    Snapshot the fields that affect statistics.
+
+    Reads straight from ``__dict__`` so deferred fields are never loaded.
+
+    Returns:
+        tuple: ``(user_id, status, due_date)`` or None if a field is deferred
+    """
+    values = task.__dict__
+    if 'status' not in values or 'due_date' not in values or 'user_id' not in values:
+        return None
+    return (values['user_id'], values['status'], values['due_date'])
+
+
+def _status_counts():
+    return {
+        'total': Count('id'),
+        **{status: Count('id', filter=Q(status=status)) for status in STATUS_FIELDS},
+    }
+
+
+def _overdue_fields(user_id, now):
+    from .models import Task
+
+    open_tasks = Task.objects.filter(user_id=user_id).scheduled()
+    overdue = open_tasks.overdue(now).count()
+    next_due = open_tasks.filter(due_date__gte=now).aggregate(next_due=Min('due_date'))['next_due']
+    return {'overdue': overdue, OVERDUE_UNTIL: _timestamp(next_due)}
+
+
+async def _aoverdue_fields(user_id, now):
+    from .models import Task
+
+    open_tasks = Task.objects.filter(user_id=user_id).scheduled()
+    overdue = await open_tasks.overdue(now).acount()
+    next_due = (await open_tasks.filter(due_date__gte=now).aaggregate(next_due=Min('due_date')))['next_due']
+    return {'overdue': overdue, OVERDUE_UNTIL: _timestamp(next_due)}
+
+
+def compute_stats(user_id):
+    """
+    Compute statistics for a user straight from the database.
+
+    Args:
+        user_id (int): Owner of the tasks
+
+    Returns:
+        dict: Counts for every field in ``STAT_FIELDS`` plus ``overdue_until``
+    """
+    from .models import Task
+
+    stats = Task.objects.filter(user_id=user_id).aggregate(**_status_counts())
+    stats.update(_overdue_fields(user_id, timezone.now()))
+    return stats
+
+
+def refresh(user_id):
+    """Recompute a user's statistics and store them in the cache."""
+    stats = compute_stats(user_id)
+    keys = _keys(user_id)
+    cache.set_many({keys[field]: value for field, value in stats.items()}, _timeout())
+    return stats
+
+
+def get_cached_stats(user_id):
+    """Return the cached statistics for a user, or None if any key is missing."""
+    keys = _keys(user_id)
+    cached = cache.get_many(keys.values())
+    if len(cached) != len(keys):
+        return None
+    return {field: cached[key] for field, key in keys.items()}
+
+
+def get_stats(user_id):
+    """
+    Return statistics for a user, served from the cache when possible.
+
+    Args:
+        user_id (int): Owner of the tasks
+
+    Returns:
+        dict: Counts for every field in ``STAT_FIELDS``
+    """
+    with metrics.timed('stats'):
+        stats = get_cached_stats(user_id)
+        if stats is None:
+            stats = refresh(user_id)
+        elif stats[OVERDUE_UNTIL] and timezone.now().timestamp() >= stats[OVERDUE_UNTIL]:
+            # A due date has passed since the count was taken
+            overdue = _overdue_fields(user_id, timezone.now())
+            keys = _keys(user_id)
+            cache.set_many({keys[field]: value for field, value in overdue.items()}, _timeout())
+            stats.update(overdue)
+    return {field: stats[field] for field in STAT_FIELDS}
+
+
+async def aget_stats(user_id):
+    """Async version of :func:`get_stats` (async cache API and ORM)."""
+    from .models import Task
+
+    with metrics.timed('stats'):
+        keys = _keys(user_id)
+        cached = await cache.aget_many(keys.values())
+        now = timezone.now()
+        if len(cached) != len(keys):
+            stats = await Task.objects.filter(user_id=user_id).aaggregate(**_status_counts())
+            stats.update(await _aoverdue_fields(user_id, now))
+            await cache.aset_many({keys[field]: value for field, value in stats.items()}, _timeout())
+        else:
+            stats = {field: cached[key] for field, key in keys.items()}
+            if stats[OVERDUE_UNTIL] and now.timestamp() >= stats[OVERDUE_UNTIL]:
+                overdue = await _aoverdue_fields(user_id, now)
+                await cache.aset_many({keys[field]: value for field, value in overdue.items()}, _timeout())
+                stats.update(overdue)
+    return {field: stats[field] for field in STAT_FIELDS}
+
+
+def invalidate(user_id):
+    """Drop a user's cached statistics so the next read recomputes them."""
+    cache.delete_many(list(_keys(user_id).values()))
+
+
+def apply_change(old, new):
+    """
+    Adjust cached statistics for a task going from ``old`` to ``new`` state.
+
+    Args:
+        old (tuple): State before the write (see :func:`state_of`), or None
+            for a newly created task
+        new (tuple): State after the write, or None for a deleted task
+    """
+    if old and new and old[0] != new[0]:
+        # Task moved to a different owner: remove from one, add to the other
+        apply_change(old, None)
+        apply_change(None, new)
+        return
+    user_id = (new or old)[0]
+    if user_id is None:
+        return
+
+    deltas = {}
+    if old is None:
+        deltas['total'] = 1
+    if new is None:
+        deltas['total'] = -1
+    if old:
+        deltas[old[1]] = deltas.get(old[1], 0) - 1
+    if new:
+        deltas[new[1]] = deltas.get(new[1], 0) + 1
+
+    keys = _keys(user_id)
+    overdue_until = cache.get(keys[OVERDUE_UNTIL])
+    if overdue_until is None:
+        # Nothing cached for this user; the next read computes from scratch
+        return
+
+    now = timezone.now()
+    recompute_overdue = overdue_until and now.timestamp() >= overdue_until
+    if not recompute_overdue:
+        deltas['overdue'] = int(is_overdue(new, now)) - int(is_overdue(old, now))
+        if new and new[2] and new[2] >= now and new[1] != 'completed':
+            due = new[2].timestamp()
+            if not overdue_until or due < overdue_until:
+                cache.set(keys[OVERDUE_UNTIL], due, _timeout())
+
+    try:
+        for field, delta in deltas.items():
+            if delta and field in keys:
+                cache.incr(keys[field], delta)
+    except ValueError:
+        # A key expired between reads; start over on the next request
+        invalidate(user_id)
+
@@ -1,7 +1,36 @@
-from django.test import TestCase
+import asyncio
+import base64
+import csv
+import json
+import re
+import tempfile
+import threading
+import time
+from io import StringIO
+from datetime import datetime, timedelta
+from unittest import mock
+
+from asgiref.sync import async_to_sync, sync_to_async
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import AsyncRequestFactory, Client, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth.models import User
+from django.contrib.messages.storage import default_storage
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, connections
 from django.urls import reverse
-from .models import Task
+from django.utils import timezone
+from django.utils.http import http_date
+from .models import APIToken, Task, TaskTombstone
+from .serializers import TaskSerializer
+from .reminders import ReminderScheduler
+from .signals import bulk_tasks_changed, task_reminders_due
+from . import async_views, authentication, coalescing, events, export, metrics, routers, stats, sync, throttling
 
 class TaskTestCase(TestCase):
     def setUp(self):
@@ -32,3 +61,1290 @@ class TaskTestCase(TestCase):
 
         
     
+
+
+class TaskPaginationTestCase(TestCase):
+    def setUp(self):
+        """Crea suficientes tareas para varias paginas"""
+        self.user = User.objects.create_user(username='pager', password='testpass123')
+        self.tasks = [
+            Task.objects.create(title=f'Task {i:02d}', user=self.user)
+            for i in range(15)
+        ]
+        self.client.force_login(self.user)
+
+    def test_api_cursor_walks_all_pages(self):
+        """Recorrer el API con cursores devuelve cada tarea una sola vez y en orden"""
+        url = reverse('task_list_api') + '?page_size=4&count=1'
+        seen = []
+        pages = []
+        while url:
+            data = self.client.get(url).json()
+            pages.append(data)
+            seen.extend(item['id'] for item in data['results'])
+            url = data['next']
+        expected = [task.id for task in sorted(self.tasks, key=lambda t: (t.created_at, t.id), reverse=True)]
+        self.assertEqual(seen, expected)
+        self.assertEqual(pages[0]['count'], 15)
+        self.assertIsNone(pages[0]['previous'])
+
+        # Volver atras desde la ultima pagina devuelve la penultima
+        previous = self.client.get(pages[-1]['previous']).json()
+        self.assertEqual(previous['results'], pages[-2]['results'])
+
+    def test_api_rejects_invalid_cursor(self):
+        """Un cursor corrupto devuelve 404"""
+        response = self.client.get(reverse('task_list_api') + '?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 404)
+
+    def test_tampered_cursor_payloads(self):
+        """Cursores con valores nulos o anidados dan 404 en el API y la primera pagina en HTML"""
+        def cursor(value):
+            payload = json.dumps({'v': value, 'id': 1, 'r': 0}).encode()
+            return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+        for value in (None, {'a': 1}, [1, 2], 'not-a-number'):
+            for query in ('', 'q=Task&'):
+                api = self.client.get(reverse('task_list_api') + f'?{query}cursor={cursor(value)}')
+                self.assertEqual(api.status_code, 404, (value, query))
+                page = self.client.get(reverse('tasks') + f'?{query}cursor={cursor(value)}')
+                self.assertEqual(page.status_code, 200, (value, query))
+
+    def test_html_view_paginates_by_cursor(self):
+        """La vista HTML muestra 6 tareas por pagina y enlaza a la siguiente"""
+        response = self.client.get(reverse('tasks') + '?order_by=title')
+        page = response.context['tasks']
+        self.assertEqual([task.title for task in page], [f'Task {i:02d}' for i in range(6)])
+        self.assertTrue(page.has_next())
+        self.assertFalse(page.has_previous())
+
+        response = self.client.get(reverse('tasks') + f'?order_by=title&cursor={page.next_cursor}')
+        page = response.context['tasks']
+        self.assertEqual([task.title for task in page], [f'Task {i:02d}' for i in range(6, 12)])
+        self.assertTrue(page.has_previous())
+
+
+class TaskQueryPlanTestCase(TestCase):
+    """
+    Ejecuta EXPLAIN sobre las consultas reales de las vistas y falla si alguna
+    recorre tasks_task de forma secuencial en lugar de usar un indice.
+    """
+    SEQ_SCAN_PATTERNS = {
+        'sqlite': re.compile(r'^SCAN tasks_task\b'),
+        'postgresql': re.compile(r'Seq Scan on tasks_task\b'),
+    }
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='planner', password='testpass123')
+        other = User.objects.create_user(username='other', password='testpass123')
+        now = timezone.now()
+        for owner in (self.user, other):
+            for i in range(30):
+                Task.objects.create(
+                    title=f'Task {i}',
+                    user=owner,
+                    priority=['low', 'medium', 'high'][i % 3],
+                    status=['pending', 'in_progress', 'completed'][i % 3],
+                    due_date=now + timedelta(days=i - 10) if i % 2 else None,
+                )
+        self.client.force_login(self.user)
+
+    def explain(self, sql):
+        """Devuelve las lineas del plan de ejecucion de una consulta"""
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                # Con tablas tan pequenas el planner siempre preferiria un Seq Scan;
+                # desactivarlo comprueba que existe un indice utilizable.
+                cursor.execute('SET LOCAL enable_seqscan = off')
+                cursor.execute('EXPLAIN ' + sql)
+                return [row[0] for row in cursor.fetchall()]
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assertViewUsesIndexes(self, url):
+        if connection.vendor not in self.SEQ_SCAN_PATTERNS:
+            self.skipTest(f'No plan checks for {connection.vendor}')
+        pattern = self.SEQ_SCAN_PATTERNS[connection.vendor]
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        task_queries = [
+            query['sql'] for query in ctx.captured_queries
+            if query['sql'].startswith('SELECT') and '"tasks_task"' in query['sql']
+        ]
+        self.assertTrue(task_queries, f'{url} ran no task queries')
+        for sql in task_queries:
+            plan = self.explain(sql)
+            scans = [line for line in plan if pattern.search(line.strip())]
+            self.assertFalse(scans, f'Sequential scan for {url}:\n{sql}\n' + '\n'.join(plan))
+
+    def test_tasks_view_uses_indexes(self):
+        """La lista HTML con filtros y ordenaciones usa indices"""
+        base = reverse('tasks')
+        for query in [
+            '',
+            '?order_by=created_at',
+            '?order_by=title',
+            '?order_by=-priority',
+            '?status=pending',
+            '?priority=high',
+            '?title=Task',
+            '?q=Task',
+        ]:
+            with self.subTest(query=query):
+                self.assertViewUsesIndexes(base + query)
+
+    def test_tasks_view_next_page_uses_indexes(self):
+        """La segunda pagina (con cursor) usa indices"""
+        page = self.client.get(reverse('tasks')).context['tasks']
+        self.assertViewUsesIndexes(reverse('tasks') + f'?cursor={page.next_cursor}')
+
+    def test_dashboard_uses_indexes(self):
+        """El dashboard agrega estadisticas usando indices"""
+        self.assertViewUsesIndexes(reverse('dashboard'))
+
+    def test_agenda_uses_partial_index(self):
+        """La agenda (HTML y API) usa el indice parcial de tareas abiertas"""
+        self.assertViewUsesIndexes(reverse('agenda'))
+        self.assertViewUsesIndexes(reverse('task_agenda_api') + '?days=14')
+        if connection.vendor == 'sqlite':
+            with CaptureQueriesContext(connection) as ctx:
+                list(Task.objects.filter(user=self.user).overdue())
+            plan = '\n'.join(self.explain(ctx.captured_queries[-1]['sql']))
+            self.assertIn('task_user_open_due_idx', plan)
+
+    def test_api_list_uses_indexes(self):
+        """El listado del API usa indices"""
+        self.assertViewUsesIndexes(reverse('task_list_api') + '?count=1')
+        self.assertViewUsesIndexes(reverse('task_list_api') + '?order_by=priority')
+
+
+class TaskPriorityRankTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='ranker', password='testpass123')
+        for priority in ['medium', 'low', 'high']:
+            Task.objects.create(title=priority, user=self.user, priority=priority)
+        self.client.force_login(self.user)
+
+    def test_rank_kept_in_sync(self):
+        """priority_rank se actualiza en save, update y bulk_update"""
+        task = Task.objects.get(title='low')
+        self.assertEqual(task.priority_rank, 1)
+
+        task.priority = 'high'
+        task.save(update_fields=['priority'])
+        self.assertEqual(Task.objects.get(pk=task.pk).priority_rank, 3)
+
+        Task.objects.filter(pk=task.pk).update(priority='medium')
+        self.assertEqual(Task.objects.get(pk=task.pk).priority_rank, 2)
+
+        task.priority = 'low'
+        Task.objects.bulk_update([task], ['priority'])
+        self.assertEqual(Task.objects.get(pk=task.pk).priority_rank, 1)
+
+    def test_priority_sort_is_semantic(self):
+        """Ordenar por prioridad sigue low < medium < high, no el orden alfabetico"""
+        response = self.client.get(reverse('tasks') + '?order_by=-priority')
+        self.assertEqual([task.title for task in response.context['tasks']], ['high', 'medium', 'low'])
+
+        data = self.client.get(reverse('task_list_api') + '?order_by=priority').json()
+        self.assertEqual([item['title'] for item in data['results']], ['low', 'medium', 'high'])
+
+        data = self.client.get(reverse('task_list_api') + '?priority=high').json()
+        self.assertEqual([item['title'] for item in data['results']], ['high'])
+
+
+class TaskStatsTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='stats', password='testpass123')
+        self.client.force_login(self.user)
+        now = timezone.now()
+        self.late = Task.objects.create(title='late', user=self.user, due_date=now - timedelta(days=1))
+        self.soon = Task.objects.create(title='soon', user=self.user, status='in_progress',
+                                        due_date=now + timedelta(days=1))
+        Task.objects.create(title='done', user=self.user, status='completed')
+
+    def assertStatsMatchDatabase(self):
+        cached = stats.get_stats(self.user.id)
+        actual = stats.compute_stats(self.user.id)
+        self.assertEqual(cached, {field: actual[field] for field in stats.STAT_FIELDS})
+        return cached
+
+    def test_stats_follow_writes(self):
+        """Las estadisticas en cache se actualizan al crear, editar, alternar y borrar"""
+        initial = self.assertStatsMatchDatabase()
+        self.assertEqual(initial, {'total': 3, 'pending': 1, 'in_progress': 1, 'completed': 1, 'overdue': 1})
+
+        Task.objects.create(title='new', user=self.user, due_date=timezone.now() - timedelta(hours=1))
+        self.assertStatsMatchDatabase()
+
+        self.client.get(reverse('toggle_task_status', args=[self.late.id]))
+        self.assertEqual(self.assertStatsMatchDatabase()['overdue'], 1)
+
+        self.soon.due_date = timezone.now() - timedelta(minutes=5)
+        self.soon.save()
+        self.assertStatsMatchDatabase()
+
+        self.soon.delete()
+        self.assertEqual(self.assertStatsMatchDatabase()['total'], 3)
+
+    def test_dashboard_served_from_cache(self):
+        """Con las estadisticas en cache el dashboard no agrega sobre las tareas"""
+        self.client.get(reverse('dashboard'))
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.context['overdue_tasks'], 1)
+        self.assertFalse([q for q in ctx.captured_queries if 'COUNT(' in q['sql']])
+
+    def test_reconcile_repairs_drift(self):
+        """reconcile_task_stats corrige escrituras que no pasan por las senales"""
+        stats.get_stats(self.user.id)
+        Task.objects.filter(user=self.user).update(status='completed')
+        call_command('reconcile_task_stats', stdout=StringIO())
+        self.assertEqual(stats.get_stats(self.user.id)['completed'], 3)
+
+
+class TaskSearchTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='searcher', password='testpass123')
+        other = User.objects.create_user(username='someone', password='testpass123')
+        self.in_title = Task.objects.create(title='Quarterly report', user=self.user)
+        self.in_description = Task.objects.create(
+            title='Email finance', description='Ask about the report numbers', user=self.user,
+        )
+        Task.objects.create(title='Buy groceries', user=self.user)
+        Task.objects.create(title='Quarterly report', user=other)
+        self.client.force_login(self.user)
+
+    def test_search_ranks_title_matches_first(self):
+        """La busqueda cubre titulo y descripcion, solo del usuario, con titulo primero"""
+        response = self.client.get(reverse('tasks') + '?q=report')
+        self.assertEqual(list(response.context['tasks']), [self.in_title, self.in_description])
+        self.assertEqual(response.context['current_order'], 'relevance')
+
+    def test_search_index_follows_writes(self):
+        """El indice se mantiene al actualizar y borrar tareas"""
+        Task.objects.filter(pk=self.in_title.pk).update(title='Annual summary')
+        self.in_description.delete()
+        data = self.client.get(reverse('task_list_api') + '?q=summ').json()
+        self.assertEqual([item['id'] for item in data['results']], [self.in_title.id])
+        data = self.client.get(reverse('task_list_api') + '?q=report').json()
+        self.assertEqual(data['results'], [])
+
+    def test_search_ignores_query_syntax(self):
+        """Caracteres especiales no provocan errores de sintaxis"""
+        response = self.client.get(reverse('tasks') + '?q=%22report%22+OR+(')
+        self.assertEqual(response.status_code, 200)
+
+
+class TaskBulkAPITestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='bulk', password='testpass123')
+        self.existing = [Task.objects.create(title=f'Old {i}', user=self.user) for i in range(3)]
+        self.client.force_login(self.user)
+        self.url = reverse('task_bulk_api')
+
+    def test_bulk_changes_in_few_queries(self):
+        """Crear, actualizar y borrar en lote usa un numero fijo de consultas"""
+        stats.get_stats(self.user.id)
+        payload = {
+            'create': [{'title': f'New {i}', 'priority': 'high'} for i in range(200)],
+            'update': [{'id': self.existing[0].id, 'status': 'completed', 'priority': 'medium'}],
+            'delete': [self.existing[1].id],
+        }
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(self.url, payload, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertLess(len(ctx.captured_queries), 20)
+
+        data = response.json()
+        self.assertEqual(len(data['create']), 200)
+        self.assertTrue(all(item['status'] == 'created' and item['id'] for item in data['create']))
+        updated = Task.objects.get(pk=self.existing[0].id)
+        self.assertEqual((updated.status, updated.priority_rank), ('completed', 2))
+        self.assertFalse(Task.objects.filter(pk=self.existing[1].id).exists())
+        self.assertEqual(stats.get_stats(self.user.id)['total'], 202)
+
+    def test_bulk_is_all_or_nothing(self):
+        """Un elemento invalido rechaza todo el lote sin escribir nada"""
+        payload = {
+            'create': [{'title': 'Fine'}, {'title': '   '}],
+            'update': [{'id': 999999, 'title': 'Missing'}],
+            'delete': [self.existing[2].id],
+        }
+        response = self.client.post(self.url, payload, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        data = response.json()
+        self.assertEqual([item['status'] for item in data['create']], ['created', 'error'])
+        self.assertEqual(data['update'][0]['errors'], {'id': ['Not found.']})
+        self.assertEqual(Task.objects.filter(user=self.user).count(), 3)
+
+    def test_boolean_ids_are_rejected(self):
+        """Los ids booleanos de JSON no se confunden con el id 1"""
+        Task.objects.filter(pk=1).delete()
+        Task.objects.create(pk=1, title='First', user=self.user)
+        payload = {'update': [{'id': True, 'title': 'Hijacked'}], 'delete': [True]}
+        response = self.client.post(self.url, payload, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        data = response.json()
+        self.assertEqual(data['update'][0]['errors'], {'id': ['Not found.']})
+        self.assertEqual(data['delete'][0]['errors'], {'id': ['Not found.']})
+        self.assertEqual(Task.objects.get(pk=1).title, 'First')
+
+
+class TaskConditionalGetTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='poller', password='testpass123')
+        self.task = Task.objects.create(title='Poll me', user=self.user)
+        self.client.force_login(self.user)
+
+    def assertRevalidates(self, url):
+        """La respuesta trae ETag y repetirla con If-None-Match da 304"""
+        # La primera visita fija la cookie CSRF, que forma parte del ETag HTML
+        self.client.get(url)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response.headers['ETag']
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse([q for q in ctx.captured_queries if '"tasks_task"' in q['sql'] and 'COUNT' in q['sql']])
+        return etag
+
+    def test_api_list_and_detail(self):
+        """El API responde 304 mientras nada cambia y 200 tras una escritura"""
+        list_url = reverse('task_list_api')
+        detail_url = reverse('task_detail_api', args=[self.task.id])
+        list_etag = self.assertRevalidates(list_url)
+        detail_etag = self.assertRevalidates(detail_url)
+
+        self.task.title = 'Changed'
+        self.task.save()
+        self.assertEqual(self.client.get(list_url, HTTP_IF_NONE_MATCH=list_etag).status_code, 200)
+        self.assertEqual(self.client.get(detail_url, HTTP_IF_NONE_MATCH=detail_etag).status_code, 200)
+
+    def test_bulk_changes_invalidate_list(self):
+        """Las escrituras en lote tambien cambian la version de la coleccion"""
+        list_url = reverse('task_list_api')
+        etag = self.assertRevalidates(list_url)
+        self.client.post(reverse('task_bulk_api'), {'create': [{'title': 'More'}]}, content_type='application/json')
+        self.assertEqual(self.client.get(list_url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_html_pages(self):
+        """Las paginas tasks y dashboard tambien se revalidan"""
+        self.assertRevalidates(reverse('tasks'))
+        self.assertRevalidates(reverse('dashboard'))
+
+    def test_passing_due_date_changes_etags(self):
+        """Una tarea que vence sin escrituras cambia los ETag de lista y detalle"""
+        now = timezone.now()
+        self.task.due_date = now + timedelta(hours=1)
+        self.task.save()
+        list_url = reverse('task_list_api')
+        detail_url = reverse('task_detail_api', args=[self.task.id])
+        etags = [self.assertRevalidates(url) for url in (list_url, detail_url)]
+        with mock.patch('django.utils.timezone.now', return_value=now + timedelta(hours=2)):
+            for url, etag in zip((list_url, detail_url), etags):
+                self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_if_modified_since_alone_never_gives_stale_304(self):
+        """Sin Last-Modified, un If-Modified-Since solo no da 304 aunque la tarea venza"""
+        now = timezone.now()
+        self.task.due_date = now + timedelta(hours=1)
+        self.task.save()
+        since = http_date((now + timedelta(days=1)).timestamp())
+        list_url = reverse('task_list_api')
+        detail_url = reverse('task_detail_api', args=[self.task.id])
+        request = AsyncRequestFactory().get(detail_url, headers={'If-Modified-Since': since})
+        request.user = self.user
+        with mock.patch('django.utils.timezone.now', return_value=now + timedelta(hours=2)):
+            for url in (list_url, detail_url):
+                response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=since)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotIn('Last-Modified', response.headers)
+            response = async_to_sync(async_views.task_detail_api)(request, id=self.task.id)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('Last-Modified', response.headers)
+
+
+@mock.patch.object(sync, 'SAFETY_WINDOW', timedelta(0))
+class TaskSyncAPITestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='syncer', password='testpass123')
+        self.tasks = [Task.objects.create(title=f'Task {i}', user=self.user) for i in range(5)]
+        self.client.force_login(self.user)
+        self.url = reverse('task_sync_api')
+
+    def sync(self, token=None, **params):
+        if token:
+            params['since'] = token
+        return self.client.get(self.url, params)
+
+    def test_full_then_delta_sync(self):
+        """Tras la sincronizacion completa solo se envian cambios y borrados"""
+        data = self.sync(limit=3).json()
+        self.assertTrue(data['has_more'])
+        data2 = self.sync(data['next_token'], limit=3).json()
+        self.assertFalse(data2['has_more'])
+        self.assertEqual(
+            [item['id'] for item in data['changes'] + data2['changes']],
+            [task.id for task in self.tasks],
+        )
+
+        deleted_ids = [self.tasks[1].id, self.tasks[2].id]
+        self.tasks[0].title = 'Renamed'
+        self.tasks[0].save()
+        self.tasks[1].delete()
+        Task.objects.filter(pk=self.tasks[2].pk).delete()
+        delta = self.sync(data2['next_token']).json()
+        self.assertEqual([item['title'] for item in delta['changes']], ['Renamed'])
+        self.assertEqual(sorted(delta['deleted']), deleted_ids)
+
+        empty = self.sync(delta['next_token']).json()
+        self.assertEqual((empty['changes'], empty['deleted']), ([], []))
+
+    def test_user_deletion_leaves_no_tombstones(self):
+        """Borrar el usuario elimina sus tareas sin crear marcas de borrado"""
+        self.user.delete()
+        self.assertFalse(TaskTombstone.objects.exists())
+
+    def test_bad_and_expired_tokens(self):
+        """Un token invalido da 400 y uno anterior a la retencion da 410"""
+        self.assertEqual(self.sync('garbage').status_code, 400)
+        naive = datetime.now()
+        self.assertEqual(self.sync(sync.encode_token((naive, 0), (naive, 0))).status_code, 400)
+        old = timezone.now() - timedelta(days=365)
+        expired = sync.encode_token((old, 0), (old, 0))
+        self.assertEqual(self.sync(expired).status_code, 410)
+
+
+class TaskSerializerQueryTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='lister', password='testpass123')
+        self.client.force_login(self.user)
+
+    def create_tasks(self, count):
+        now = timezone.now()
+        Task.objects.bulk_create(
+            Task(
+                title=f'Task {i}',
+                user=self.user,
+                status='completed' if i % 4 == 0 else 'pending',
+                due_date=now + timedelta(days=(i % 3) - 1),
+            )
+            for i in range(count)
+        )
+
+    def count_queries(self):
+        queryset = Task.objects.filter(user=self.user).for_serialization()
+        with CaptureQueriesContext(connection) as ctx:
+            data = TaskSerializer(queryset, many=True).data
+        with CaptureQueriesContext(connection) as api_ctx:
+            self.client.get(reverse('task_list_api') + '?page_size=100')
+        return len(ctx.captured_queries), len(api_ctx.captured_queries), data
+
+    def test_constant_queries_for_any_list_size(self):
+        """Serializar 10 o 10.000 tareas usa el mismo numero de consultas"""
+        self.create_tasks(10)
+        # Peticion de calentamiento: llena la cache del usuario de la sesion, la
+        # clave de version de la coleccion y la de estadisticas (conteos del ETag),
+        # para que ambas mediciones cuenten solo las consultas del listado
+        self.client.get(reverse('task_list_api'))
+        small = self.count_queries()
+        self.create_tasks(9990)
+        large = self.count_queries()
+        self.assertEqual(small[0], 1)
+        self.assertEqual(large[0], 1)
+        self.assertEqual(small[1], large[1])
+        self.assertEqual(len(large[2]), 10000)
+
+    def test_is_overdue_matches_model(self):
+        """is_overdue anotado coincide con la propiedad del modelo"""
+        self.create_tasks(12)
+        for task in Task.objects.filter(user=self.user).for_serialization():
+            data = TaskSerializer(task).data
+            self.assertEqual(data['is_overdue'], bool(task.is_overdue))
+            self.assertEqual(data['user'], 'lister')
+        self.assertEqual(TaskSerializer(Task.objects.filter(user=self.user).first()).data['user'], 'lister')
+
+
+class TaskSparseFieldsTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='sparse', password='testpass123')
+        for i in range(3):
+            Task.objects.create(title=f'Task {i}', description='x' * 500, user=self.user)
+        self.client.force_login(self.user)
+        self.url = reverse('task_list_api')
+
+    def test_fields_narrow_output_and_sql(self):
+        """fields= limita tanto el JSON como las columnas del SELECT"""
+        with CaptureQueriesContext(connection) as ctx:
+            data = self.client.get(self.url + '?fields=id,title,status,due_date').json()
+        self.assertEqual(list(data['results'][0]), ['id', 'title', 'status', 'due_date'])
+        task_sql = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('SELECT "tasks_task"')]
+        self.assertTrue(task_sql)
+        self.assertNotIn('"description"', task_sql[0])
+        self.assertNotIn('auth_user', task_sql[0])
+
+        data = self.client.get(self.url + '?exclude=description,user').json()
+        self.assertNotIn('description', data['results'][0])
+        self.assertIn('is_overdue', data['results'][0])
+
+        response = self.client.get(self.url + '?fields=title,bogus')
+        self.assertEqual(response.status_code, 400)
+
+    def test_columnar_layout(self):
+        """layout=columns envia los nombres una vez y filas como listas"""
+        regular = self.client.get(self.url + '?fields=id,title,created_at').json()
+        data = self.client.get(self.url + '?fields=id,title,created_at&layout=columns').json()
+        self.assertEqual(data['results']['columns'], ['id', 'title', 'created_at'])
+        self.assertEqual(
+            data['results']['rows'],
+            [[item['id'], item['title'], item['created_at']] for item in regular['results']],
+        )
+
+
+class TaskExportTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='exporter', password='testpass123')
+        other = User.objects.create_user(username='other', password='testpass123')
+        for i in range(250):
+            Task.objects.create(title=f'Task, "{i}"', description='línea\nnueva', user=self.user)
+        Task.objects.create(title='Not mine', user=other)
+        self.client.force_login(self.user)
+
+    def test_csv_and_ndjson_stream(self):
+        """El export se transmite en streaming con todas las tareas del usuario"""
+        response = self.client.get(reverse('task_export_api', args=['csv']))
+        self.assertTrue(response.streaming)
+        self.assertIn('attachment', response['Content-Disposition'])
+        rows = list(csv.reader(StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(tuple(rows[0]), export.EXPORT_FIELDS)
+        self.assertEqual(len(rows), 251)
+        self.assertEqual(rows[1][1:3], ['Task, "0"', 'línea\nnueva'])
+
+        response = self.client.get(reverse('task_export_api', args=['ndjson']))
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 250)
+        self.assertEqual(json.loads(lines[-1])['title'], 'Task, "249"')
+
+        response = self.client.get(reverse('task_export_api', args=['xml']))
+        self.assertEqual(response.status_code, 404)
+
+    def test_export_reads_in_chunks(self):
+        """Las filas se leen con iterator(chunk_size) y se emiten por lotes"""
+        with mock.patch('django.db.models.query.QuerySet.iterator', autospec=True,
+                        side_effect=lambda qs, chunk_size=None: iter(qs)) as iterator:
+            chunks = list(export.stream(Task.objects.filter(user=self.user), 'csv', size=50))
+        self.assertEqual(iterator.call_args.kwargs['chunk_size'], 50)
+        self.assertEqual(len(chunks), 3)
+
+        out = StringIO()
+        call_command('export_tasks', 'exporter', '--format', 'ndjson', stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 250)
+
+    async def test_asgi_export_streams_asynchronously(self):
+        """Bajo ASGI el export usa un iterador asincrono, sin acumularlo en memoria"""
+        await sync_to_async(self.async_client.force_login)(self.user)
+        response = await self.async_client.get(reverse('task_export_api', args=['csv']))
+        self.assertTrue(response.is_async)
+        chunks = [chunk async for chunk in response.streaming_content]
+        self.assertEqual(len(chunks), 3)
+        rows = list(csv.reader(StringIO(b''.join(chunks).decode())))
+        self.assertEqual((tuple(rows[0]), len(rows)), (export.EXPORT_FIELDS, 251))
+
+
+class TaskImportTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='importer', password='testpass123')
+        self.client.force_login(self.user)
+
+    def test_upload_csv_imports_valid_rows_in_batches(self):
+        """Las filas validas se insertan por lotes y las invalidas se reportan"""
+        lines = ['title,priority,status,due_date']
+        lines += [f'Task {i},high,,' for i in range(25)]
+        lines += [',low,,', 'Bad priority,urgent,,', 'Bad date,,,tomorrow']
+        upload = SimpleUploadedFile('tasks.csv', '\n'.join(lines).encode())
+        stats.get_stats(self.user.id)
+
+        with self.settings(TASK_IMPORT_BATCH_SIZE=10), \
+                mock.patch.object(Task.objects, 'bulk_create', wraps=Task.objects.bulk_create) as bulk_create:
+            response = self.client.post(reverse('task_import_api'), {'file': upload})
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 25)
+        self.assertEqual(response.data['rejected'], 3)
+        self.assertEqual([error['line'] for error in response.data['errors']], [27, 28, 29])
+        self.assertEqual(bulk_create.call_count, 3)
+        self.assertEqual(Task.objects.filter(user=self.user, priority='high', priority_rank=3).count(), 25)
+        self.assertEqual(stats.get_stats(self.user.id)['total'], 25)
+
+    def test_broken_file_reports_rows_already_written(self):
+        """Un archivo que se rompe a mitad da 207 con las filas ya creadas, o 400 si no se escribio nada"""
+        # Mas grande que el bufer de lectura, para que el error llegue tras varios lotes
+        content = '\n'.join(['title'] + [f'Task {i}' for i in range(3000)]).encode() + b'\nBroken \xff\n'
+        url = reverse('task_import_api')
+
+        with self.settings(TASK_IMPORT_BATCH_SIZE=500):
+            response = self.client.post(url, {'file': SimpleUploadedFile('tasks.csv', content)})
+        self.assertEqual(response.status_code, 207)
+        created = response.data['created']
+        self.assertTrue(created)
+        self.assertIn('error', response.data)
+        self.assertEqual(Task.objects.filter(user=self.user).count(), created)
+        self.assertEqual(stats.get_stats(self.user.id)['total'], created)
+
+        with self.settings(TASK_IMPORT_BATCH_SIZE=5000):
+            response = self.client.post(url, {'file': SimpleUploadedFile('tasks.csv', content)})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('file', response.data)
+        self.assertEqual(Task.objects.filter(user=self.user).count(), created)
+
+    def test_command_round_trips_export(self):
+        """Un archivo generado por export_tasks se puede volver a importar"""
+        for i in range(5):
+            Task.objects.create(title=f'Task {i}', priority='medium', user=self.user)
+        other = User.objects.create_user(username='copy', password='testpass123')
+        exported = ''.join(export.stream(Task.objects.filter(user=self.user), 'ndjson'))
+        with tempfile.NamedTemporaryFile(suffix='.ndjson') as handle:
+            handle.write(exported.encode())
+            handle.flush()
+            out = StringIO()
+            call_command('import_tasks', 'copy', handle.name, stdout=out)
+        self.assertIn('Imported 5 tasks, rejected 0 rows', out.getvalue())
+        self.assertEqual(Task.objects.filter(user=other, priority='medium').count(), 5)
+
+
+class TaskAsyncViewsTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='async', password='testpass123')
+        for i in range(5):
+            Task.objects.create(title=f'Task {i}', user=self.user)
+        self.task = Task.objects.filter(user=self.user).first()
+        self.factory = AsyncRequestFactory()
+
+    def _request(self, path, headers=None):
+        request = self.factory.get(path, headers=headers)
+        request.user = self.user
+        return request
+
+    async def test_list_and_detail_match_sync_views(self):
+        """Las vistas async devuelven lo mismo que las vistas DRF"""
+        await sync_to_async(self.client.force_login)(self.user)
+        for path in ['/api/tasks/?page_size=2&count=1', '/api/tasks/?fields=id,title&order_by=title',
+                     f'/api/tasks/{self.task.id}/']:
+            expected = (await sync_to_async(self.client.get)(path)).json()
+            if path.startswith('/api/tasks/?'):
+                response = await async_views.task_list_api(self._request(path))
+            else:
+                response = await async_views.task_detail_api(self._request(path), id=self.task.id)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(json.loads(response.content), expected)
+
+            again = self._request(path, headers={'If-None-Match': response['ETag']})
+            if path.startswith('/api/tasks/?'):
+                response = await async_views.task_list_api(again)
+            else:
+                response = await async_views.task_detail_api(again, id=self.task.id)
+            self.assertEqual(response.status_code, 304)
+
+        response = await async_views.task_list_api(self._request('/api/tasks/?fields=bogus'))
+        self.assertEqual(response.status_code, 400)
+
+    async def test_toggle_and_dashboard(self):
+        """toggle y dashboard async funcionan y el dashboard usa las stats async"""
+        sync_path = mock.Mock(side_effect=AssertionError('sync path used'))
+        response = await async_views.toggle_task_status(self._request('/'), id=self.task.id)
+        self.assertEqual(response.status_code, 302)
+        task = await Task.objects.aget(pk=self.task.id)
+        self.assertEqual(task.status, 'completed')
+
+        request = self._request('/dashboard/')
+        request.session = await sync_to_async(SessionStore)()
+        request._messages = default_storage(request)
+        with mock.patch.object(stats, 'get_stats', sync_path):
+            response = await async_views.dashboard(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Task 4')
+
+
+class TaskEventsTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='live', password='testpass123')
+
+    def _write(self, action):
+        with self.captureOnCommitCallbacks(execute=True):
+            return action()
+
+    async def _next(self, iterator, action):
+        """Start waiting on ``iterator``, run a sync write, return the next item"""
+        pending = asyncio.ensure_future(anext(iterator))
+        await asyncio.sleep(0)
+        result = await sync_to_async(self._write)(action)
+        return result, await pending
+
+    async def test_task_writes_reach_subscribers(self):
+        """Crear, actualizar y borrar publican eventos para el usuario"""
+        subscription = events.get_backend().subscribe(self.user.id, timeout=2)
+        try:
+            task, event = await self._next(
+                subscription, lambda: Task.objects.create(title='Live', user=self.user))
+            self.assertEqual(event, {'type': 'created', 'id': task.id, 'status': 'pending'})
+
+            task.status = 'completed'
+            _, event = await self._next(subscription, task.save)
+            self.assertEqual(event, {'type': 'updated', 'id': task.id, 'status': 'completed'})
+
+            task_id = task.id
+            _, event = await self._next(subscription, task.delete)
+            self.assertEqual(event, {'type': 'deleted', 'id': task_id})
+        finally:
+            await subscription.aclose()
+        self.assertEqual(events.get_backend().subscriber_count(self.user.id), 0)
+
+    @override_settings(TASK_EVENTS_HEARTBEAT=1)
+    async def test_sse_stream(self):
+        """El endpoint SSE envia ready, los eventos y keepalives"""
+        request = AsyncRequestFactory().get('/api/tasks/events/')
+        request.user = self.user
+        response = await async_views.task_events(request)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = response.streaming_content
+        try:
+            self.assertEqual(await anext(stream), b'retry: 3000\n\n')
+            self.assertEqual(await anext(stream), b'event: ready\ndata: {"type":"ready"}\n\n')
+            _, frame = await self._next(stream, lambda: Task.objects.bulk_create([Task(title='x', user=self.user)])
+                                        and bulk_tasks_changed.send(sender=Task, user_id=self.user.id))
+            self.assertEqual(frame, b'event: changed\ndata: {"type":"changed"}\n\n')
+            self.assertEqual(await anext(stream), b': keepalive\n\n')
+        finally:
+            await stream.aclose()
+
+        request = RequestFactory().get('/api/tasks/events/')
+        request.user = self.user
+        self.assertEqual((await async_views.task_events(request)).status_code, 501)
+
+
+class TaskToggleTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='toggler', password='testpass123')
+        self.task = Task.objects.create(title='Toggle me', description='keep', user=self.user)
+        self.client.force_login(self.user)
+
+    def test_toggle_is_one_scoped_update(self):
+        """toggle hace un solo UPDATE con CASE, limitado al usuario"""
+        stats.get_stats(self.user.id)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('toggle_task_status', args=[self.task.id]))
+        self.assertEqual(response.status_code, 302)
+        task_queries = [q['sql'] for q in ctx.captured_queries if '"tasks_task"' in q['sql']]
+        self.assertEqual(len(task_queries), 1)
+        self.assertTrue(task_queries[0].startswith('UPDATE'))
+        self.assertIn('RETURNING', task_queries[0])
+        self.assertIn('CASE', task_queries[0])
+        self.assertIn('"user_id" =', task_queries[0])
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.status, 'completed')
+        # Las stats se ajustan de forma incremental: no se vuelven a contar
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(stats.get_stats(self.user.id),
+                             {'total': 1, 'pending': 0, 'in_progress': 0, 'completed': 1, 'overdue': 0})
+        self.assertEqual(ctx.captured_queries, [])
+
+        other = User.objects.create_user(username='intruder', password='testpass123')
+        self.client.force_login(other)
+        response = self.client.get(reverse('toggle_task_status', args=[self.task.id]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_toggle_updates_stats_without_counting(self):
+        """toggle ajusta las stats (tambien vencidas y en curso) sin volver a contar"""
+        overdue = Task.objects.create(title='Late', description='x', user=self.user,
+                                      due_date=timezone.now() - timedelta(days=1))
+        started = Task.objects.create(title='Started', description='x', user=self.user, status='in_progress')
+        stats.get_stats(self.user.id)
+
+        for task, expected in ((overdue, 'completed'), (started, 'completed'), (overdue, 'pending')):
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertEqual(Task.objects.toggle_status(self.user, task.id), expected)
+            self.assertFalse([q for q in ctx.captured_queries if 'COUNT' in q['sql']])
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(stats.get_stats(self.user.id),
+                             {'total': 3, 'pending': 2, 'in_progress': 0, 'completed': 1, 'overdue': 1})
+        self.assertEqual(ctx.captured_queries, [])
+        cache.clear()
+        self.assertEqual(stats.get_stats(self.user.id)['overdue'], 1)
+
+    def test_edits_write_only_changed_fields(self):
+        """Las ediciones por formulario y API escriben solo los campos cambiados"""
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.patch(reverse('task_detail_api', args=[self.task.id]), {'title': 'Renamed'},
+                              content_type='application/json')
+        update = next(q['sql'] for q in ctx.captured_queries if q['sql'].startswith('UPDATE "tasks_task"'))
+        self.assertIn('"title"', update)
+        self.assertNotIn('"description"', update)
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.post(reverse('update_task', args=[self.task.id]), {
+                'title': 'Renamed', 'description': 'keep', 'priority': 'high', 'status': 'pending',
+            })
+        update = next(q['sql'] for q in ctx.captured_queries if q['sql'].startswith('UPDATE "tasks_task"'))
+        self.assertIn('"priority_rank"', update)
+        self.assertNotIn('"title"', update)
+        self.task.refresh_from_db()
+        self.assertEqual((self.task.title, self.task.priority_rank), ('Renamed', 3))
+
+
+class TaskToggleConcurrencyTestCase(TransactionTestCase):
+    def test_concurrent_toggles_are_not_lost(self):
+        """Muchos toggles concurrentes: ninguno se pierde y las stats cuadran"""
+        cache.clear()
+        user = User.objects.create_user(username='racer', password='testpass123')
+        task = Task.objects.create(title='Contended', user=user)
+        stats.get_stats(user.id)
+        threads, per_thread = 8, 25
+        toggled, errors = [], []
+
+        def worker():
+            try:
+                for _ in range(per_thread):
+                    toggled.append(Task.objects.toggle_status(user, task.id))
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connections.close_all()
+
+        workers = [threading.Thread(target=worker) for _ in range(threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(toggled), threads * per_thread)
+        task.refresh_from_db()
+        # An even number of flips brings the task back to where it started
+        self.assertEqual(task.status, 'pending')
+        self.assertEqual(toggled.count('completed'), toggled.count('pending'))
+        self.assertEqual(stats.get_stats(user.id), {
+            field: value for field, value in stats.compute_stats(user.id).items() if field in stats.STAT_FIELDS
+        })
+
+
+class TaskFragmentCacheTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='fragments', password='testpass123')
+        for i in range(3):
+            Task.objects.create(title=f'Cached {i}', user=self.user)
+        self.client.force_login(self.user)
+
+    def _task_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, [q['sql'] for q in ctx.captured_queries if '"tasks_task"' in q['sql']]
+
+    def test_cached_fragments_skip_task_queries(self):
+        """Con los fragmentos en cache no se consultan las tareas"""
+        for url in [reverse('tasks') + '?order_by=title', reverse('dashboard')]:
+            _, queries = self._task_queries(url)
+            self.assertTrue(queries)
+            response, queries = self._task_queries(url)
+            self.assertEqual(queries, [])
+            self.assertContains(response, 'Cached 2')
+
+    def test_fragments_invalidated_by_task_changes(self):
+        """Un cambio en las tareas del usuario invalida sus fragmentos"""
+        self.client.get(reverse('tasks'))
+        self.client.get(reverse('dashboard'))
+        Task.objects.create(title='Fresh task', user=self.user)
+        self.assertContains(self.client.get(reverse('tasks')), 'Fresh task')
+        response = self.client.get(reverse('dashboard'))
+        self.assertContains(response, 'Fresh task')
+        self.assertContains(response, '<div class="stat-number">4</div>', html=True)
+
+
+class TaskDatabaseSettingsTestCase(TestCase):
+    def test_sqlite_pragmas_applied(self):
+        """Las conexiones SQLite usan WAL, synchronous=NORMAL y busy_timeout"""
+        if connection.vendor != 'sqlite':
+            self.skipTest('SQLite only')
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 5000)
+
+
+class TaskAgendaTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='planner', password='testpass123')
+        self.client.force_login(self.user)
+        self.now = timezone.now()
+        self.today = timezone.localdate(self.now)
+
+    def _due(self, title, delta, status='pending'):
+        return Task.objects.create(title=title, user=self.user, status=status, due_date=self.now + delta)
+
+    def test_agenda_groups_open_tasks_by_day(self):
+        """Vencidas aparte; proximas agrupadas por dia; completadas excluidas"""
+        self._due('Late', timedelta(days=-2))
+        self._due('Late but done', timedelta(days=-1), status='completed')
+        self._due('Soon', timedelta(hours=1))
+        self._due('In three days', timedelta(days=3))
+        self._due('Next month', timedelta(days=40))
+
+        data = self.client.get(reverse('task_agenda_api') + '?days=7').json()
+        self.assertEqual(data['overdue_count'], 1)
+        self.assertEqual([task['title'] for task in data['overdue']], ['Late'])
+        self.assertEqual(len(data['days']), 7)
+        self.assertEqual(data['days'][0]['date'], self.today.isoformat())
+        titles = {day['date']: [task['title'] for task in day['tasks']] for day in data['days']}
+        self.assertEqual(titles[timezone.localdate(self.now + timedelta(days=3)).isoformat()], ['In three days'])
+        self.assertNotIn('Next month', str(titles))
+        self.assertNotIn('Late but done', str(data))
+
+        response = self.client.get(reverse('agenda'))
+        self.assertContains(response, 'Overdue (1)')
+        self.assertContains(response, 'In three days')
+
+
+class TaskReminderTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='reminded', password='testpass123')
+        self.now = timezone.now()
+        self.fired = []
+
+        def record(sender, tasks, **kwargs):
+            self.fired.append([task.title for task in tasks])
+
+        task_reminders_due.connect(record)
+        self.addCleanup(task_reminders_due.disconnect, record)
+
+    def _due(self, title, delta, status='pending'):
+        return Task.objects.create(title=title, user=self.user, status=status, due_date=self.now + delta)
+
+    def test_due_reminders_fire_once_in_batches(self):
+        """Los recordatorios vencidos se disparan una vez, en lotes, por orden"""
+        self._due('Already late', timedelta(hours=-1))
+        for minutes in (1, 2, 3):
+            self._due(f'Soon {minutes}', timedelta(minutes=minutes))
+        self._due('Tomorrow', timedelta(days=1))
+        self._due('Done', timedelta(minutes=1), status='completed')
+
+        scheduler = ReminderScheduler(size=2)
+        self.assertEqual(scheduler.load(since=self.now), 4)
+        self.assertEqual(scheduler.tick(self.now + timedelta(minutes=10)), 3)
+        self.assertEqual(self.fired, [['Soon 1', 'Soon 2'], ['Soon 3']])
+        self.assertEqual(scheduler.tick(self.now + timedelta(minutes=20)), 0)
+        self.assertEqual(len(scheduler), 1)
+
+    def test_scheduler_follows_task_writes(self):
+        """El planificador se alimenta de los cambios sin recorrer la tabla"""
+        moved = self._due('Moved', timedelta(minutes=5))
+        done = self._due('Done', timedelta(minutes=5))
+        deleted = self._due('Deleted', timedelta(minutes=5))
+        scheduler = ReminderScheduler()
+        scheduler.load(since=self.now)
+
+        self._due('New', timedelta(minutes=5))
+        moved.due_date = self.now + timedelta(hours=2)
+        moved.save()
+        Task.objects.toggle_status(self.user, done.pk)
+        deleted.delete()
+
+        self.assertEqual(scheduler.tick(self.now + timedelta(minutes=10)), 1)
+        self.assertEqual(self.fired, [['New']])
+        # Nothing due: a tick is just the two change-feed reads
+        with self.assertNumQueries(2):
+            scheduler.tick(self.now + timedelta(minutes=15))
+        scheduler.tick(self.now + timedelta(hours=3))
+        self.assertEqual(self.fired, [['New'], ['Moved']])
+
+    def test_command_catches_up_once(self):
+        """El comando con --catch-up dispara una vez los avisos atrasados"""
+        self._due('Missed', timedelta(minutes=-1))
+        out = StringIO()
+        call_command('run_task_reminders', '--once', '--catch-up', '3600', stdout=out)
+        self.assertIn('Fired 1 reminders.', out.getvalue())
+        self.assertEqual(self.fired, [['Missed']])
+
+
+class TaskMetricsTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+        self.addCleanup(metrics.reset)
+        self.user = User.objects.create_user(username='measured', password='testpass123')
+        Task.objects.create(title='Measured', user=self.user)
+        self.client.force_login(self.user)
+
+    def test_server_timing_and_prometheus_export(self):
+        """Cada peticion muestreada lleva Server-Timing y alimenta los histogramas"""
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('dashboard'))
+        timing = response['Server-Timing']
+        self.assertIn('db;dur=', timing)
+        self.assertIn(f'desc="{len(ctx.captured_queries)} queries"', timing)
+        for phase in ('stats;', 'render;', 'total;'):
+            self.assertIn(phase, timing)
+        self.assertIn('serialize;', self.client.get(reverse('task_list_api'))['Server-Timing'])
+
+        self.assertEqual(self.client.get(reverse('task_metrics')).status_code, 403)
+        self.user.is_staff = True
+        self.user.save()
+        body = self.client.get(reverse('task_metrics')).content.decode()
+        self.assertIn('task_request_duration_seconds_count{view="dashboard",method="GET"} 1', body)
+        self.assertIn('task_request_phase_seconds_count{view="task_list_api",phase="serialize"} 1', body)
+        self.assertIn('task_request_db_queries_bucket{view="dashboard",le="+Inf"} 1', body)
+
+    @override_settings(TASK_METRICS_SAMPLE_RATE=0)
+    def test_unsampled_requests_are_not_measured(self):
+        """Las peticiones fuera de la muestra no se miden"""
+        response = self.client.get(reverse('dashboard'))
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(metrics.REQUEST_SECONDS.snapshot(), {})
+
+    async def test_async_requests_count_queries_run_in_threads(self):
+        """Las consultas de vistas async en hilos tambien se cuentan"""
+        await sync_to_async(self.async_client.force_login)(self.user)
+        response = await self.async_client.get(reverse('tasks'))
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(response['Server-Timing'], r'db;dur=[\d.]+;desc="[1-9]\d* queries"')
+
+
+@override_settings(TASK_READ_REPLICAS=['replica'])
+class TaskReplicaRoutingTestCase(TransactionTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # A second connection to the test database stands in for a replica
+        connections.settings['replica'] = {**connections.settings['default'], 'TEST': {'MIRROR': 'default'}}
+
+    @classmethod
+    def tearDownClass(cls):
+        connections['replica'].close()
+        del connections['replica']
+        del connections.settings['replica']
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='replicated', password='testpass123')
+        self.task = Task.objects.create(title='Replicated', user=self.user)
+        self.client.force_login(self.user)
+        cache.clear()
+
+    def _task_queries(self, path, **kwargs):
+        """Consultas a tasks_task por conexion durante una peticion"""
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica']) as replica:
+            response = self.client.get(path, **kwargs)
+        self.assertLess(response.status_code, 400)
+        count = lambda ctx: sum('"tasks_task"' in query['sql'] for query in ctx.captured_queries)
+        return count(primary), count(replica)
+
+    def test_safe_reads_use_replica_until_the_user_writes(self):
+        """Lecturas seguras a la replica; tras una escritura, al primario"""
+        primary, replica = self._task_queries(reverse('tasks'))
+        self.assertEqual(primary, 0)
+        self.assertGreater(replica, 0)
+        self.assertEqual(self._task_queries(reverse('task_list_api'))[0], 0)
+        # Views that are not marked, like the detail page, stay on the primary
+        self.assertEqual(self._task_queries(reverse('task_details', args=[self.task.id]))[1], 0)
+
+        self.client.post(reverse('task_list_api'), {'title': 'Written'}, content_type='application/json')
+        self.assertTrue(routers.is_pinned(self.user.pk))
+        primary, replica = self._task_queries(reverse('tasks'))
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+    def test_router_sends_writes_and_migrations_to_primary(self):
+        """Escrituras y migraciones van siempre a la base principal"""
+        router = routers.ReplicaRouter()
+        self.assertEqual(router.db_for_write(Task), 'default')
+        self.assertEqual(router.db_for_read(Task), 'default')
+        self.assertFalse(router.allow_migrate('replica', 'tasks'))
+        self.assertIsNone(router.allow_migrate('default', 'tasks'))
+
+
+class TaskThrottleTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='hammer', password='testpass123')
+        self.task = Task.objects.create(title='Hammered', user=self.user)
+        self.client.force_login(self.user)
+
+    @override_settings(REST_FRAMEWORK={'DEFAULT_THROTTLE_RATES': {'user': '100/min', 'task_detail': '2/min'}})
+    def test_token_bucket_per_endpoint(self):
+        """El cubo de tokens limita por usuario y endpoint y se rellena con el tiempo"""
+        url = reverse('task_detail_api', args=[self.task.id])
+        now = timezone.now().timestamp()
+        with mock.patch.object(throttling.TokenBucketThrottle, 'timer', mock.Mock(return_value=now)):
+            self.assertEqual(self.client.get(url).status_code, 200)
+            self.assertEqual(self.client.get(url).status_code, 200)
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 429)
+            self.assertEqual(response['Retry-After'], '30')
+            # Other endpoints have their own bucket
+            self.assertEqual(self.client.get(reverse('task_list_api')).status_code, 200)
+        with mock.patch.object(throttling.TokenBucketThrottle, 'timer', mock.Mock(return_value=now + 30)):
+            self.assertEqual(self.client.get(url).status_code, 200)
+            self.assertEqual(self.client.get(url).status_code, 429)
+
+    def test_parse_rate(self):
+        """Las tasas "N/periodo" se convierten en capacidad y segundos"""
+        self.assertEqual(throttling.parse_rate('120/min'), (120, 60))
+        self.assertEqual(throttling.parse_rate('10/s'), (10, 1))
+
+
+class TaskCoalescingTestCase(TestCase):
+    def test_concurrent_identical_calls_share_one_result(self):
+        """Las llamadas simultaneas con la misma clave comparten un resultado"""
+        flight = coalescing.SingleFlight()
+        started, release = threading.Event(), threading.Event()
+        calls, results = [], []
+
+        def load():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return {'results': [1, 2, 3]}
+
+        def request():
+            results.append(flight.do('key', load))
+
+        threads = [threading.Thread(target=request)]
+        threads[0].start()
+        started.wait(5)
+        threads += [threading.Thread(target=request) for _ in range(3)]
+        for thread in threads[1:]:
+            thread.start()
+        time.sleep(0.2)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(shared for _, shared in results), [False, True, True, True])
+        self.assertTrue(all(result is results[0][0] for result, _ in results))
+        # Finished calls are not cached
+        self.assertEqual(flight.do('key', lambda: 'fresh'), ('fresh', False))
+
+    async def test_async_calls_share_one_result(self):
+        """Las corrutinas simultaneas con la misma clave comparten un resultado"""
+        flight = coalescing.SingleFlight()
+        calls = []
+
+        async def load():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return 'page'
+
+        results = await asyncio.gather(*(flight.ado('key', load) for _ in range(3)))
+        self.assertEqual(len(calls), 1)
+        self.assertEqual([result for result, _ in results], ['page'] * 3)
+
+
+class TaskAPITokenTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        authentication.token_cache.clear()
+        self.user = User.objects.create_user(username='robot', password='testpass123')
+        self.token, self.key = APIToken.issue(self.user, name='ci')
+        self.client = Client(enforce_csrf_checks=True, HTTP_AUTHORIZATION=f'Bearer {self.key}')
+
+    def test_cached_token_skips_session_and_token_queries(self):
+        """Con el token en cache la peticion no consulta ni sesion ni tokens"""
+        url = reverse('task_list_api')
+        self.assertEqual(self.client.get(url).status_code, 200)
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        tables = ' '.join(query['sql'] for query in ctx.captured_queries)
+        self.assertNotIn('tasks_apitoken', tables)
+        self.assertNotIn('django_session', tables)
+        self.assertNotIn('FROM "auth_user"', tables)
+
+    def test_writes_need_no_csrf_token(self):
+        """Con token se puede escribir sin token CSRF"""
+        response = self.client.post(reverse('task_list_api'), {'title': 'From CI'})
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(Task.objects.filter(user=self.user, title='From CI').exists())
+
+    def test_invalid_expired_and_revoked_tokens_are_rejected(self):
+        """Los tokens invalidos, caducados o revocados dan 401"""
+        url = reverse('task_list_api')
+        response = self.client.get(url, HTTP_AUTHORIZATION='Bearer tm_nope')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response['WWW-Authenticate'], 'Bearer realm="api"')
+
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.token.revoke()
+        self.assertEqual(self.client.get(url).status_code, 401)
+
+        _, key = APIToken.issue(self.user, expires_at=timezone.now() - timedelta(minutes=1))
+        self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION=f'Bearer {key}').status_code, 401)
+
+    def test_token_cache_is_bounded_lru(self):
+        """La cache de tokens es LRU con tamano maximo y TTL"""
+        tokens = authentication.TokenCache()
+        with override_settings(TASK_API_TOKEN_CACHE_SIZE=2):
+            tokens.set('a', self.user, None)
+            tokens.set('b', self.user, None)
+            tokens.get('a')
+            tokens.set('c', self.user, None)
+        self.assertIsNone(tokens.get('b'))
+        self.assertEqual(tokens.get('a'), self.user)
+        with override_settings(TASK_API_TOKEN_CACHE_TTL=0):
+            tokens.set('d', self.user, None)
+        self.assertIsNone(tokens.get('d'))
+
+
+class TaskCachedAuthTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='regular', password='testpass123')
+        Task.objects.create(title='Cached', user=self.user)
+
+    def _page_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('tasks'))
+        return response, ' '.join(query['sql'] for query in ctx.captured_queries)
+
+    def test_pages_skip_session_and_user_queries(self):
+        """Sesion y usuario salen de la cache tras la primera peticion"""
+        self.client.login(username='regular', password='testpass123')
+        self.client.get(reverse('tasks'))
+        response, sql = self._page_queries()
+        self.assertContains(response, 'Cached')
+        self.assertNotIn('FROM "django_session"', sql)
+        self.assertNotIn('FROM "auth_user"', sql)
+
+    def test_sessions_from_the_db_engine_stay_logged_in(self):
+        """Las sesiones creadas antes del cambio (db + ModelBackend) siguen validas"""
+        session = SessionStore()
+        session[SESSION_KEY] = str(self.user.pk)
+        session[BACKEND_SESSION_KEY] = 'django.contrib.auth.backends.ModelBackend'
+        session[HASH_SESSION_KEY] = self.user.get_session_auth_hash()
+        session.save()
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = session.session_key
+        response, _ = self._page_queries()
+        self.assertContains(response, 'Cached')
+
+    def test_password_change_drops_cached_user(self):
+        """Cambiar la contrasena invalida el usuario en cache y la sesion"""
+        self.client.login(username='regular', password='testpass123')
+        self.assertEqual(self.client.get(reverse('tasks')).status_code, 200)
+        self.user.set_password('changed-pass-456')
+        self.user.save()
+        self.assertEqual(self.client.get(reverse('tasks')).status_code, 302)
+        self.assertFalse(self.client.login(username='regular', password='testpass123'))
+        self.assertTrue(self.client.login(username='regular', password='changed-pass-456'))
@@ -0,0 +1,88 @@
+"""
+Token-bucket API throttles backed by Django's cache.
+
+A rate of ``"N/period"`` (DRF's syntax, e.g. ``"120/min"``) is a bucket that
+holds up to N tokens and refills at N per period: a client may burst N
+requests and then sustain the average rate, instead of being locked out until
+a fixed window ends. Each request takes one token; an empty bucket answers
+429 with ``Retry-After`` set to when the next token arrives.
+
+Buckets live in the default cache, so all workers share them when the cache
+is shared (see ``CACHES``). Concurrent requests from one client may race on
+the read-modify-write and let a few extra requests through; the limits are
+protection against runaway clients, not quotas.
+
+Rates come from ``REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']`` and are read on
+every request:
+
+* :class:`UserTokenBucketThrottle`: one bucket per user across the whole API
+  (``user`` rate; ``anon`` for anonymous clients, per IP)
+* :class:`ScopedTokenBucketThrottle`: one bucket per user and endpoint, for
+  views that set ``throttle_scope``
+"""
+
+import math
+import time
+
+from django.core.cache import cache
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 60 * 60 * 24}
+
+
+def parse_rate(rate):
+    """``"120/min"`` -> ``(120, 60)`` (capacity, period in seconds)."""
+    number, period = rate.split('/')
+    return int(number), PERIODS[period[0]]
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Base class: subclasses pick the scope (rate name) and bucket key."""
+    cache_format = 'tasks:throttle:{scope}:{ident}'
+    timer = time.time
+
+    def get_scope(self, request, view):
+        raise NotImplementedError
+
+    def get_cache_key(self, request, view, scope):
+        user = request.user
+        ident = user.pk if user and user.is_authenticated else f'anon-{self.get_ident(request)}'
+        return self.cache_format.format(scope=scope, ident=ident)
+
+    def allow_request(self, request, view):
+        self.wait_seconds = None
+        scope = self.get_scope(request, view)
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(scope) if scope else None
+        if not rate:
+            return True
+        capacity, period = parse_rate(rate)
+        refill = capacity / period
+        key = self.get_cache_key(request, view, scope)
+
+        now = self.timer()
+        tokens, updated = cache.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * refill)
+        if tokens < 1:
+            self.wait_seconds = (1 - tokens) / refill
+            return False
+        # Expires once the bucket would be full again (a missing bucket is full)
+        cache.set(key, (tokens - 1, now), math.ceil(period))
+        return True
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class UserTokenBucketThrottle(TokenBucketThrottle):
+    """One bucket per user (``user`` rate) or anonymous IP (``anon`` rate)."""
+
+    def get_scope(self, request, view):
+        return 'user' if request.user and request.user.is_authenticated else 'anon'
+
+
+class ScopedTokenBucketThrottle(TokenBucketThrottle):
+    """One bucket per user for each view ``throttle_scope``."""
+
+    def get_scope(self, request, view):
+        return getattr(view, 'throttle_scope', None)
@@ -1,20 +1,41 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
+
+if getattr(settings, 'TASK_ASYNC_VIEWS', False):
+    # ASGI deployments: async list/detail API, toggle and dashboard
+    dashboard_view = async_views.dashboard
+    toggle_view = async_views.toggle_task_status
+    task_list_api_view = async_views.task_list_api
+    task_detail_api_view = async_views.task_detail_api
+else:
+    dashboard_view = views.dashboard
+    toggle_view = views.toggle_task_status
+    task_list_api_view = views.TaskListAPIView.as_view()
+    task_detail_api_view = views.TaskDetailAPIView.as_view()
 
 urlpatterns = [
     path('', views.home, name='home'),
-    path('dashboard/', views.dashboard, name='dashboard'),
+    path('dashboard/', dashboard_view, name='dashboard'),
     path('signup/', views.signup, name='signup'),
     path('signin/', views.signin, name='signin'),
     path('signout/', views.signout, name='signout'),
     path('tasks/', views.tasks, name='tasks'),
+    path('tasks/agenda/', views.agenda, name='agenda'),
     path('tasks/create_task', views.create_task, name='create_task'),
     path('tasks/<int:id>', views.task_details, name='task_details'),
     path('tasks/<int:id>/update', views.update_task, name='update_task'),
     path('tasks/<int:id>/delete', views.delete_task, name='delete_task'),
-    path('tasks/<int:id>/toggle', views.toggle_task_status, name='toggle_task_status'),
+    path('tasks/<int:id>/toggle', toggle_view, name='toggle_task_status'),
+    path('metrics/', views.metrics, name='task_metrics'),
 
     # NUEVAS RUTAS API
-    path('api/tasks/', views.TaskListAPIView.as_view(), name='task_list_api'),
-    path('api/tasks/<int:id>/', views.TaskDetailAPIView.as_view(), name='task_detail_api')
+    path('api/tasks/', task_list_api_view, name='task_list_api'),
+    path('api/tasks/bulk/', views.TaskBulkAPIView.as_view(), name='task_bulk_api'),
+    path('api/tasks/agenda/', views.TaskAgendaAPIView.as_view(), name='task_agenda_api'),
+    path('api/tasks/sync/', views.TaskSyncAPIView.as_view(), name='task_sync_api'),
+    path('api/tasks/export/<str:export_format>/', views.TaskExportAPIView.as_view(), name='task_export_api'),
+    path('api/tasks/events/', async_views.task_events, name='task_events'),
+    path('api/tasks/import/', views.TaskImportAPIView.as_view(), name='task_import_api'),
+    path('api/tasks/<int:id>/', task_detail_api_view, name='task_detail_api')
 ]
\ No newline at end of file
@@ -7,21 +7,42 @@ error handling and user feedback through Django messages framework.
 """
 
 from rest_framework.permissions import IsAuthenticated
-from .serializers import TaskSerializer, TaskCreateUpdateSerializer
-from rest_framework import generics
+from .serializers import TaskSerializer, TaskCreateUpdateSerializer, TaskColumnsSerializer, select_fields
+from .search import search as search_tasks
+from .pagination import (
+    ORDERINGS, InvalidCursor, KeysetPaginator, TaskCursorPagination, resolve_ordering,
+)
+from rest_framework import generics, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
-from django.shortcuts import render, redirect, get_object_or_404
+from django.shortcuts import render, redirect
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from django.contrib import messages
 from django.contrib.auth import login, logout
 from django.contrib.auth.decorators import login_required
-from django.db import IntegrityError
-from django.db.models import ProtectedError, Count, Q
-from django.core.exceptions import ValidationError
-from django.core.paginator import Paginator
+from django.views.decorators.http import condition
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import ProtectedError
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
 import logging
 from .models import Task
 from .forms import TaskForm
+from . import stats as task_stats
+from .coalescing import CoalescedListMixin
+from .conditional import ConditionalGetMixin, dashboard_page_etag, get_version, tasks_page_etag
+from .signals import bulk_tasks_changed
+from . import sync as task_sync
+from . import export as task_export
+from . import importer as task_importer
+from . import metrics as task_metrics
+from .agenda import build_agenda
+from .routers import replica_reads
 
 logger = logging.getLogger(__name__)
 
@@ -37,12 +58,16 @@ def home(request):
     """
     return render(request, 'index.html')
 
+@replica_reads
+@condition(etag_func=dashboard_page_etag)
 def dashboard(request):
     """
     Render the dashboard with task statistics and recent tasks.
     
-    For authenticated users, displays aggregated task statistics by status
-    and the 5 most recent tasks. For anonymous users, displays basic dashboard.
+    For authenticated users, displays task statistics by status (served from
+    the per-user stats cache, see tasks.stats) and the 5 most recent tasks.
+    For anonymous users, displays basic dashboard. Unchanged pages are
+    answered with 304 Not Modified (see tasks.conditional).
     
     Args:
         request: HTTP request object
@@ -51,22 +76,20 @@ def dashboard(request):
         HttpResponse: Rendered dashboard.html template with context data
     """
     if request.user.is_authenticated:
-        # Aggregate task statistics by status for the current user
-        stats = Task.objects.filter(user=request.user).aggregate(
-            total=Count('id'),
-            pending=Count('id', filter=Q(status='pending')),
-            in_progress=Count('id', filter=Q(status='in_progress')),
-            completed=Count('id', filter=Q(status='completed'))
-        )
+        # Task statistics are cached per user and kept up to date on writes
+        stats = task_stats.get_stats(request.user.id)
         
-        # Get the 5 most recent tasks for quick overview
+        # Get the 5 most recent tasks for quick overview (lazy: not queried
+        # when the fragment is cached)
         recent_tasks = Task.objects.filter(user=request.user).order_by('-created_at')[:5]
         
         return render(request, 'dashboard.html', {
+            'fragment_version': get_version(request.user.pk)[0],
             'total_tasks': stats['total'],
             'pending_tasks': stats['pending'],
             'in_progress_tasks': stats['in_progress'],
             'completed_tasks': stats['completed'],
+            'overdue_tasks': stats['overdue'],
             'recent_tasks': recent_tasks,
         })
         
@@ -90,7 +113,7 @@ def signup(request):
         if form.is_valid():
             try:
                 user = form.save()
-                login(request, user)
+                login(request, user, backend=settings.AUTHENTICATION_BACKENDS[0])
                 messages.success(request, 'User created successfully!')
                 return redirect('dashboard')
             except Exception as e:
@@ -146,20 +169,27 @@ def signout(request):
     logout(request)
     return redirect('home')
 
+@replica_reads
 @login_required
+@condition(etag_func=tasks_page_etag)
 def tasks(request):
     """
     Display filtered and paginated list of user's tasks.
     
-    Supports filtering by title, status, and priority, with sorting options.
-    Results are paginated with 6 tasks per page.
+    Supports full-text search over title and description, filtering by title,
+    status, and priority, with sorting options. Results are paginated with 6
+    tasks per page using keyset pagination, so every page costs the same
+    indexed lookup regardless of how deep it is. Unchanged pages are answered
+    with 304 Not Modified (see tasks.conditional).
     
     Query Parameters:
+        q (str): Full-text search over title and description (ranked by relevance)
         title (str): Filter tasks by title (case-insensitive partial match)
         status (str): Filter by task status ('pending', 'in_progress', 'completed')
         priority (str): Filter by priority level ('low', 'medium', 'high')
-        order_by (str): Sort order ('-created_at', 'created_at', 'priority', '-priority', 'title')
-        page (int): Page number for pagination
+        order_by (str): Sort order ('-created_at', 'created_at', 'priority', '-priority', 'title',
+            or 'relevance' when searching)
+        cursor (str): Opaque pagination cursor from the previous/next links
     
     Args:
         request: HTTP request object
@@ -168,20 +198,21 @@ def tasks(request):
         HttpResponse: Rendered tasks.html template with filtered tasks and form
     """
     # Extract all URL parameters with default values
+    q = request.GET.get('q', '').strip()
     title = request.GET.get('title', '')
     status = request.GET.get('status', 'default')
     priority = request.GET.get('priority', 'default')
-    order_by = request.GET.get('order_by', '-created_at')
     
     # Validate sorting parameter to prevent injection
-    valid_orders = ['-created_at', 'created_at', 'priority', '-priority', 'title']
-    if order_by not in valid_orders:
-        order_by = '-created_at'
+    order_by = resolve_ordering(request.GET.get('order_by'), searching=bool(q))
     
     # Start with all user's tasks
     tasks_list = Task.objects.filter(user=request.user)
     
     # Apply filters only if they have valid values
+    if q:
+        tasks_list = search_tasks(tasks_list, q)
+        
     if title:
         tasks_list = tasks_list.filter(title__icontains=title)
         
@@ -189,21 +220,26 @@ def tasks(request):
         tasks_list = tasks_list.filter(status=status)
         
     if priority != 'default' and priority:
-        tasks_list = tasks_list.filter(priority=priority)
+        tasks_list = tasks_list.filter_priority(priority)
     
-    # Apply sorting
-    tasks_list = tasks_list.order_by(order_by)
+    # Paginate results (6 tasks per page), seeking on (sort key, id)
+    paginator = KeysetPaginator(tasks_list, ORDERINGS[order_by], per_page=6, count_limit=1000)
     
-    # Paginate results (6 tasks per page)
-    paginator = Paginator(tasks_list, 6)
-    page_number = request.GET.get('page')
-    tasks = paginator.get_page(page_number)
+    def load_page():
+        try:
+            return paginator.get_page(request.GET.get('cursor'))
+        except InvalidCursor:
+            # Stale or tampered cursor: fall back to the first page
+            return paginator.get_page()
     
     form = TaskForm()
     return render(request, 'tasks.html', {
-        'tasks': tasks,
+        # Loaded on first use, so a cached task-cards fragment skips the queries
+        'tasks': SimpleLazyObject(load_page),
+        'fragment_version': get_version(request.user.pk)[0],
         'form': form,
         'current_order': order_by,
+        'q': q,
         'title': title,
         'status': status,
         'priority': priority,
@@ -336,7 +372,9 @@ def update_task(request, id):
                 'form': form,
             })
         try:
-            form.save()
+            # Write only the fields that changed
+            if form.changed_data:
+                form.save(commit=False).save(update_fields=[*form.changed_data, 'updated_at'])
             messages.success(request, f'Task updated successfully!')
             return redirect('tasks')
         except IntegrityError:
@@ -419,27 +457,96 @@ def toggle_task_status(request, id):
     Returns:
         HttpResponseRedirect: Redirect to tasks list
     """
-    task = get_object_or_404(Task, pk=id, user=request.user)
-    # Simple toggle between completed and pending states
-    if task.status == 'completed':
-        task.status = 'pending'
-    else:
-        task.status = 'completed'
-    task.save()
+    # One conditional UPDATE scoped to the owner (see TaskQuerySet.toggle_status)
+    if not Task.objects.toggle_status(request.user, id):
+        raise Http404('No Task matches the given query.')
     return redirect('tasks')
 
+@replica_reads
+@login_required
+def agenda(request):
+    """
+    Display overdue tasks and the tasks due in the coming days, grouped by day.
+    
+    Query Parameters:
+        days (int): Number of days to show, starting today (default 7)
+    
+    Args:
+        request: HTTP request object
+        
+    Returns:
+        HttpResponse: Rendered agenda.html template
+    """
+    try:
+        days = int(request.GET.get('days', 7))
+    except ValueError:
+        days = 7
+    return render(request, 'agenda.html', build_agenda(Task.objects.filter(user=request.user), days))
+
+@login_required
+def metrics(request):
+    """
+    Export per-view request metrics in the Prometheus text format (staff only).
+    
+    Args:
+        request: HTTP request object
+        
+    Returns:
+        HttpResponse: Histograms collected by tasks.metrics in this process
+    """
+    if not request.user.is_staff:
+        raise PermissionDenied
+    return HttpResponse(task_metrics.render_prometheus(), content_type=task_metrics.CONTENT_TYPE)
+
 # NUEVAS VISTAS API
-class TaskListAPIView(generics.ListCreateAPIView):
+class TaskListAPIView(ConditionalGetMixin, CoalescedListMixin, generics.ListCreateAPIView):
     """
     API para listar tareas (GET) y crear nuevas tareas (POST)
+    El listado se pagina por cursor (ver tasks.pagination.TaskCursorPagination)
+    y responde 304 si la coleccion no cambio (ver tasks.conditional)
+    GET identicos y simultaneos comparten una sola consulta (ver tasks.coalescing)
+    
+    Query Parameters (GET):
+        fields / exclude (str): Campos a incluir / excluir, separados por comas;
+            tambien reducen las columnas leidas de la base de datos
+        layout (str): "columns" devuelve los resultados en formato columnar
     """
     permission_classes = [IsAuthenticated]
+    throttle_scope = 'task_list'
+    # GET puede leer de una replica (ver tasks.routers)
+    replica_reads = True
     # permission_classes = [AllowAny]
     serializer_class = TaskSerializer
+    pagination_class = TaskCursorPagination
+
+    def get_requested_fields(self):
+        """Campos pedidos con fields=/exclude= (None si se piden todos)"""
+        if not hasattr(self, '_requested_fields'):
+            params = self.request.query_params
+            self._requested_fields = None
+            if params.get('fields') or params.get('exclude'):
+                self._requested_fields = select_fields(
+                    TaskSerializer.Meta.fields, params.get('fields'), params.get('exclude'),
+                )
+        return self._requested_fields
 
     def get_queryset(self):
-        """Obtener lista de tareas de usuario"""
-        return Task.objects.filter(user=self.request.user).order_by('-created_at')
+        """Obtener lista de tareas de usuario (el orden lo aplica el paginador)"""
+        fields = self.get_requested_fields()
+        queryset = Task.objects.filter(user=self.request.user).for_serialization(fields)
+        if fields is not None:
+            # Leer solo las columnas necesarias, mas id y la clave de orden
+            ordering = self.paginator.get_ordering(self.request).lstrip('-')
+            model_fields = {field.name for field in Task._meta.concrete_fields}
+            columns = {name for name in fields if name in model_fields} | {'id', ordering}
+            queryset = queryset.only(*(columns & model_fields))
+        q = self.request.query_params.get('q', '').strip()
+        if q:
+            queryset = search_tasks(queryset, q)
+        priority = self.request.query_params.get('priority')
+        if priority:
+            queryset = queryset.filter_priority(priority)
+        return queryset
     
     def get_serializer_class(self):
         """Usar diferente serializer para crear vs listar"""
@@ -447,24 +554,40 @@ class TaskListAPIView(generics.ListCreateAPIView):
             return TaskCreateUpdateSerializer
         return TaskSerializer
     
+    def get_serializer(self, *args, **kwargs):
+        """Aplicar fields=/exclude= y el formato columnar al listar"""
+        if self.request.method != 'GET':
+            return super().get_serializer(*args, **kwargs)
+        kwargs.setdefault('context', self.get_serializer_context())
+        fields = self.get_requested_fields()
+        if kwargs.get('many') and self.request.query_params.get('layout') == 'columns':
+            kwargs.pop('many')
+            child = TaskSerializer(fields=fields, context=kwargs['context'])
+            return TaskColumnsSerializer(*args, child=child, **kwargs)
+        return TaskSerializer(*args, fields=fields, **kwargs)
+    
     def perform_create(self, serializer):
         """Asignar usuario al crear tarea"""
         serializer.save(user=self.request.user)
         # serializer.save(user=None)
 
 
-class TaskDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
+class TaskDetailAPIView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     API para obtener (GET), actualizar (PUT) o eliminar (DELETE) una tarea específica
+    GET responde 304 si la tarea no cambio desde el ETag del cliente
     """
     permission_classes = [IsAuthenticated]
+    throttle_scope = 'task_detail'
+    # GET puede leer de una replica (ver tasks.routers)
+    replica_reads = True
     # permission_classes = [AllowAny]
     serializer_class = TaskSerializer
     lookup_field = 'id'
     
     def get_queryset(self):
         """Solo tareas del usuario autenticado"""
-        return Task.objects.filter(user=self.request.user)
+        return Task.objects.filter(user=self.request.user).for_serialization()
     
     def get_serializer_class(self):
         """Usar diferente serializer para actualizar vs obtener"""
@@ -472,6 +595,241 @@ class TaskDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
             return TaskCreateUpdateSerializer
         return TaskSerializer
 
-            
 
+def _is_task_id(value):
+    # JSON true/false are ints to Python (True == 1)
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+class TaskBulkAPIView(APIView):
+    """
+    API para crear, actualizar y eliminar tareas en lote (POST)
+    
+    Cuerpo: {"create": [{...}], "update": [{"id": 1, ...}], "delete": [1, 2]}
+    
+    Cada elemento se valida con TaskCreateUpdateSerializer (las actualizaciones
+    son parciales). Si algun elemento es invalido no se escribe nada y se
+    responde 400; si todo es valido se aplica en una sola transaccion con
+    bulk_create, bulk_update y un unico DELETE filtrado.
+    """
+    permission_classes = [IsAuthenticated]
+    throttle_scope = 'task_bulk'
+    operations = ('create', 'update', 'delete')
+
+    def post(self, request):
+        payload = request.data
+        if not isinstance(payload, dict) or not all(
+            isinstance(payload.get(op, []), list) for op in self.operations
+        ):
+            return Response(
+                {'detail': 'Expected an object with "create", "update" and/or "delete" lists.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        max_items = getattr(settings, 'TASK_BULK_MAX_ITEMS', 1000)
+        if sum(len(payload.get(op, [])) for op in self.operations) > max_items:
+            return Response(
+                {'detail': f'At most {max_items} items per request.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        new_tasks, create_results = self._validate_creates(payload.get('create', []))
+        changed_tasks, update_fields, update_results = self._validate_updates(payload.get('update', []))
+        delete_ids, delete_results = self._validate_deletes(payload.get('delete', []))
+        results = {'create': create_results, 'update': update_results, 'delete': delete_results}
+
+        if any(item['status'] == 'error' for items in results.values() for item in items):
+            return Response(results, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            created = Task.objects.bulk_create(new_tasks)
+            if changed_tasks:
+                # bulk_update skips auto_now, so stamp updated_at explicitly
+                now = timezone.now()
+                for task in changed_tasks:
+                    task.updated_at = now
+                Task.objects.bulk_update(changed_tasks, [*update_fields, 'updated_at'])
+            if delete_ids:
+                Task.objects.filter(user=request.user, id__in=delete_ids).delete()
+
+        # bulk_create/bulk_update bypass the model signals
+        bulk_tasks_changed.send(sender=Task, user_id=request.user.id)
+
+        for result, task in zip(create_results, created):
+            result['id'] = task.id
+        return Response(results)
 
+    def _validate_creates(self, items):
+        tasks, results = [], []
+        for index, item in enumerate(items):
+            serializer = TaskCreateUpdateSerializer(data=item)
+            if serializer.is_valid():
+                tasks.append(Task(user=self.request.user, **serializer.validated_data))
+                results.append({'index': index, 'status': 'created'})
+            else:
+                results.append({'index': index, 'status': 'error', 'errors': serializer.errors})
+        return tasks, results
+
+    def _validate_updates(self, items):
+        ids = [item.get('id') for item in items if isinstance(item, dict)]
+        existing = Task.objects.filter(
+            user=self.request.user, id__in=[i for i in ids if _is_task_id(i)],
+        ).in_bulk()
+
+        tasks, fields, results, seen = [], set(), [], set()
+        for index, item in enumerate(items):
+            task_id = item.get('id') if isinstance(item, dict) else None
+            task = existing.get(task_id) if _is_task_id(task_id) else None
+            if task is None or task_id in seen:
+                error = 'Not found.' if task is None else 'Duplicate id.'
+                results.append({'index': index, 'id': task_id, 'status': 'error', 'errors': {'id': [error]}})
+                continue
+            seen.add(task_id)
+            serializer = TaskCreateUpdateSerializer(task, data=item, partial=True)
+            if not serializer.is_valid():
+                results.append({'index': index, 'id': task_id, 'status': 'error', 'errors': serializer.errors})
+                continue
+            for field, value in serializer.validated_data.items():
+                setattr(task, field, value)
+            fields.update(serializer.validated_data)
+            tasks.append(task)
+            results.append({'index': index, 'id': task_id, 'status': 'updated'})
+        return tasks, sorted(fields), results
+
+    def _validate_deletes(self, ids):
+        existing = set(Task.objects.filter(
+            user=self.request.user, id__in=[i for i in ids if _is_task_id(i)],
+        ).values_list('id', flat=True))
+
+        delete_ids, results = [], []
+        for index, task_id in enumerate(ids):
+            if _is_task_id(task_id) and task_id in existing and task_id not in delete_ids:
+                delete_ids.append(task_id)
+                results.append({'index': index, 'id': task_id, 'status': 'deleted'})
+            else:
+                results.append({'index': index, 'id': task_id, 'status': 'error', 'errors': {'id': ['Not found.']}})
+        return delete_ids, results
+
+
+class TaskSyncAPIView(APIView):
+    """
+    API de sincronizacion incremental (GET)
+    
+    Query Parameters:
+        since (str): Token devuelto por la sincronizacion anterior; sin token
+            se devuelven todas las tareas
+        limit (int): Maximo de cambios por respuesta (por defecto 500)
+    
+    Respuesta: {"changes": [...], "deleted": [ids], "next_token": "...", "has_more": bool}
+    El cliente aplica "changes" como upserts y luego "deleted"; si has_more es
+    true debe volver a pedir con next_token. Un token caducado responde 410 y
+    el cliente debe hacer una sincronizacion completa.
+    """
+    permission_classes = [IsAuthenticated]
+    throttle_scope = 'task_sync'
+    default_limit = 500
+    max_limit = 1000
+
+    def get(self, request):
+        try:
+            limit = min(max(int(request.query_params.get('limit', self.default_limit)), 1), self.max_limit)
+        except ValueError:
+            limit = self.default_limit
+        try:
+            result = task_sync.changes_since(request.user, request.query_params.get('since'), limit)
+        except task_sync.InvalidSyncToken:
+            return Response({'detail': 'Invalid sync token.'}, status=status.HTTP_400_BAD_REQUEST)
+        except task_sync.SyncTokenExpired:
+            return Response({'detail': 'Sync token expired; perform a full sync.'}, status=status.HTTP_410_GONE)
+        result['changes'] = TaskSerializer(result['changes'], many=True).data
+        return Response(result)
+
+
+class TaskExportAPIView(APIView):
+    """
+    API de exportacion de todas las tareas del usuario (GET)
+    
+    URL: api/tasks/export/<csv|ndjson>/
+    La respuesta se transmite en streaming (ver tasks.export): el primer byte
+    sale de inmediato y la memoria no crece con el numero de tareas.
+    """
+    permission_classes = [IsAuthenticated]
+    throttle_scope = 'task_export'
+
+    def get(self, request, export_format):
+        if export_format not in task_export.EXPORTERS:
+            return Response({'detail': f'Unknown export format "{export_format}".'}, status=status.HTTP_404_NOT_FOUND)
+        queryset = Task.objects.filter(user=request.user)
+        # Bajo ASGI Django acumula en memoria los iteradores sincronos
+        stream = task_export.astream if isinstance(request._request, ASGIRequest) else task_export.stream
+        response = StreamingHttpResponse(
+            stream(queryset, export_format),
+            content_type=task_export.CONTENT_TYPES[export_format],
+        )
+        filename = f'tasks-{timezone.localdate():%Y%m%d}.{export_format}'
+        response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
+class TaskImportAPIView(APIView):
+    """
+    API de importacion masiva de tareas desde un archivo (POST multipart)
+    
+    Campos: file (CSV con cabecera o NDJSON, segun la extension .csv/.ndjson/.jsonl)
+    Query Parameters:
+        dry_run (bool): Solo validar, sin escribir nada
+    
+    Las filas validas se insertan por lotes (ver tasks.importer) y las
+    invalidas se omiten. Respuesta: {"created", "rejected", "errors": [...],
+    "seconds", "rows_per_second"}
+    Si el archivo deja de ser CSV/UTF-8 valido a mitad de camino, responde 400
+    cuando no se escribio nada y 207 con el informe parcial y "error" cuando
+    ya se habian guardado lotes (esas filas quedan creadas)
+    """
+    permission_classes = [IsAuthenticated]
+    throttle_scope = 'task_import'
+
+    def post(self, request):
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'file': ['No file was submitted.']}, status=status.HTTP_400_BAD_REQUEST)
+        dry_run = request.query_params.get('dry_run', '').lower() in ('1', 'true', 'yes')
+        try:
+            report = task_importer.import_tasks(
+                request.user, upload.file, task_importer.guess_format(upload.name), dry_run=dry_run,
+            )
+        except task_importer.ImportFormatError as exc:
+            if dry_run or not exc.report or not exc.report['created']:
+                return Response({'file': [str(exc)]}, status=status.HTTP_400_BAD_REQUEST)
+            # Earlier batches are already committed: report them
+            return Response({**exc.report, 'error': str(exc)}, status=status.HTTP_207_MULTI_STATUS)
+        return Response(report, status=status.HTTP_200_OK if dry_run else status.HTTP_201_CREATED)
+
+
+class TaskAgendaAPIView(APIView):
+    """
+    API de agenda: tareas vencidas y proximas agrupadas por dia (GET)
+    
+    Query Parameters:
+        days (int): Dias a cubrir desde hoy (por defecto 7, maximo 31)
+    
+    Respuesta: {"overdue_count": n, "overdue": [...], "days": [{"date": "YYYY-MM-DD", "tasks": [...]}]}
+    Solo incluye tareas no completadas; las consultas usan el indice parcial
+    sobre (user, due_date).
+    """
+    permission_classes = [IsAuthenticated]
+    throttle_scope = 'task_agenda'
+    # GET puede leer de una replica (ver tasks.routers)
+    replica_reads = True
+
+    def get(self, request):
+        try:
+            days = int(request.query_params.get('days', 7))
+        except ValueError:
+            days = 7
+        result = build_agenda(Task.objects.filter(user=request.user).for_serialization(), days)
+        result['overdue'] = TaskSerializer(result['overdue'], many=True).data
+        result['days'] = [
+            {'date': day['date'].isoformat(), 'tasks': TaskSerializer(day['tasks'], many=True).data}
+            for day in result['days']
+        ]
+        return Response(result)